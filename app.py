@@ -1,7 +1,9 @@
 from flask import Flask, render_template
 from extensions import db, login_manager, migrate
-from models import User
+from models import User, Tenant
 from config import Config
+from services.sql_instrumentation_service import SQLInstrumentation
+from services.metrics_service import MetricsService
 from sqlalchemy import exc
 from functools import wraps
 import time
@@ -25,11 +27,13 @@ def create_app(config_class=Config):
     app.config['SESSION_COOKIE_SECURE'] = True
     app.config['SESSION_COOKIE_HTTPONLY'] = True
 
-    # Initialize extensions
+    # Initialize extensions (metrics first: it picks the connection pool class)
+    MetricsService.init_app(app)
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
     csrf = CSRFProtect(app)
+    SQLInstrumentation.init_app(app)
 
     # Register template filters
     def datetime_filter(value):
@@ -48,6 +52,7 @@ def create_app(config_class=Config):
     from routes.landing import landing
     from routes.webhook import webhook
     from routes.analytics import analytics
+    from routes.metrics import metrics
 
     # Exempt routes from CSRF protection
     csrf.exempt(webhook)  # External webhooks (email, payments)
@@ -65,6 +70,7 @@ def create_app(config_class=Config):
     app.register_blueprint(public, url_prefix='/public')
     app.register_blueprint(webhook)
     app.register_blueprint(analytics, url_prefix='/analytics')
+    app.register_blueprint(metrics)
 
     def retry_on_connection_error(max_retries=3, delay=1):
         def decorator(f):
@@ -89,7 +95,11 @@ def create_app(config_class=Config):
     @login_manager.user_loader
     @retry_on_connection_error()
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Users of a tenant being deleted are logged out at once
+        return User.query.outerjoin(Tenant, User.tenant_id == Tenant.id).filter(
+            User.id == int(user_id),
+            Tenant.deleted_at.is_(None)
+        ).first()
 
     return app
 
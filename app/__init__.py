@@ -1,24 +1,33 @@
 from flask import Flask
 from extensions import db, login_manager, migrate, csrf
+from models import User, Tenant
 from routes.auth import auth
 from routes.dashboard import dashboard
 from routes.admin import admin
 from routes.tickets import tickets
 from routes.public import public
 from routes.webhook import webhook
+from routes.metrics import metrics
 from datetime import datetime
 from commands.recalculate_sla import recalculate_sla
+from commands.backfill_ticket_sequences import backfill_ticket_sequences
+from commands.backfill_first_response import backfill_first_response
+from commands.refresh_analytics_rollup import refresh_analytics_rollup
 from flask_wtf.csrf import generate_csrf
+from services.sql_instrumentation_service import SQLInstrumentation
+from services.metrics_service import MetricsService
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object('config')
     
-    # Initialize extensions
+    # Initialize extensions (metrics first: it picks the connection pool class)
+    MetricsService.init_app(app)
     db.init_app(app)
     login_manager.init_app(app)
     migrate.init_app(app, db)
     csrf.init_app(app)
+    SQLInstrumentation.init_app(app)
     
     # Register filters FIRST - before any template rendering
     @app.template_filter()
@@ -61,6 +70,7 @@ def create_app():
     app.register_blueprint(tickets, url_prefix='/tickets')
     app.register_blueprint(public, url_prefix='/public')
     app.register_blueprint(webhook)
+    app.register_blueprint(metrics)
     
     # Context processor for template globals
     @app.context_processor
@@ -72,9 +82,16 @@ def create_app():
         return {'csrf_token': generate_csrf()}
     
     app.cli.add_command(recalculate_sla)
+    app.cli.add_command(backfill_ticket_sequences)
+    app.cli.add_command(backfill_first_response)
+    app.cli.add_command(refresh_analytics_rollup)
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Users of a tenant being deleted are logged out at once
+        return User.query.outerjoin(Tenant, User.tenant_id == Tenant.id).filter(
+            User.id == int(user_id),
+            Tenant.deleted_at.is_(None)
+        ).first()
     
     return app 
\ No newline at end of file
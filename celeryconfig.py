@@ -10,4 +10,56 @@ except:
 task_serializer = 'json'
 result_serializer = 'json'
 accept_content = ['json']
-enable_utc = True 
\ No newline at end of file
+enable_utc = True
+
+# Inbound email gets its own queue so a burst cannot starve other tasks;
+# bound its concurrency with e.g. `celery -A tasks worker -Q inbound_email --concurrency=4`
+task_routes = {
+    'tasks.process_inbound_email': {'queue': 'inbound_email'},
+    # Token buckets live in the worker process: run this queue with a single worker,
+    # e.g. `celery -A tasks worker -Q email_outbox --concurrency=1`
+    'tasks.drain_email_outbox': {'queue': 'email_outbox'}
+}
+# Take one task at a time so retries and slow payloads do not pile up on a single worker
+worker_prefetch_multiplier = 1
+
+# Fail fast when publishing from a web request while the broker is unreachable;
+# stored payloads are re-queued by requeue_stale_inbound_emails
+broker_transport_options = {
+    'max_retries': 1,
+    'interval_start': 0,
+    'interval_step': 0.2,
+    'interval_max': 0.5
+}
+
+beat_schedule = {
+    'requeue-stale-inbound-emails': {
+        'task': 'tasks.requeue_stale_inbound_emails',
+        'schedule': 300.0
+    },
+    'drain-email-outbox': {
+        'task': 'tasks.drain_email_outbox',
+        'schedule': 30.0
+    },
+    'check-new-emails': {
+        'task': 'tasks.check_new_emails',
+        'schedule': 60.0
+    },
+    # Analytics charts read the rollup as of the last run
+    'refresh-analytics-rollup': {
+        'task': 'tasks.refresh_analytics_rollup',
+        'schedule': 60.0
+    },
+    'scan-sla-breaches': {
+        'task': 'tasks.scan_sla_breaches',
+        'schedule': 60.0
+    },
+    'refresh-tenant-directory-snapshot': {
+        'task': 'tasks.refresh_tenant_directory_snapshot',
+        'schedule': 600.0
+    },
+    'resume-tenant-deletions': {
+        'task': 'tasks.resume_tenant_deletions',
+        'schedule': 300.0
+    }
+}
@@ -0,0 +1,54 @@
+from flask.cli import with_appcontext
+import click
+from sqlalchemy import func, update
+from models import db, Ticket, TicketComment
+from services.analytics_cache_service import AnalyticsCache
+from services.analytics_rollup_service import AnalyticsRollupService
+
+@click.command('backfill-first-response')
+@click.option('--batch-size', type=int, default=5000, show_default=True, help='Tickets per UPDATE and commit')
+@with_appcontext
+def backfill_first_response(batch_size):
+    """Stamp first_response_at from the earliest internal comment of each ticket."""
+    ranked = db.session.query(
+        TicketComment.ticket_id,
+        TicketComment.created_at,
+        func.row_number().over(
+            partition_by=TicketComment.ticket_id,
+            order_by=(TicketComment.created_at, TicketComment.id)
+        ).label('position')
+    ).filter(TicketComment.is_internal.is_(True)).subquery()
+
+    # One windowed query: the first internal comment of every ticket still missing a response
+    rows = db.session.query(
+        Ticket.id,
+        Ticket.tenant_id,
+        Ticket.sla_response_due_at,
+        Ticket.sla_response_met,
+        Ticket.updated_at,
+        ranked.c.created_at
+    ).join(ranked, ranked.c.ticket_id == Ticket.id).filter(
+        ranked.c.position == 1,
+        Ticket.first_response_at.is_(None)
+    ).all()
+
+    tenant_ids = set()
+    for start in range(0, len(rows), batch_size):
+        params = []
+        for ticket_id, tenant_id, due_at, met, updated_at, responded_at in rows[start:start + batch_size]:
+            params.append({
+                'id': ticket_id,
+                'first_response_at': responded_at,
+                'sla_response_met': responded_at <= due_at if due_at else met,
+                # A backfill is not an edit
+                'updated_at': updated_at
+            })
+            tenant_ids.add(tenant_id)
+        db.session.execute(update(Ticket), params)
+        db.session.commit()
+
+    # updated_at was kept, so the rollup has to be told explicitly
+    for tenant_id in tenant_ids:
+        AnalyticsCache.bump(tenant_id)
+        AnalyticsRollupService.mark_stale(tenant_id)
+    click.echo(f"Stamped first response on {len(rows)} tickets across {len(tenant_ids)} tenants")
@@ -0,0 +1,33 @@
+from flask.cli import with_appcontext
+import click
+from models import db, Ticket, TicketSequence
+
+@click.command('backfill-ticket-sequences')
+@with_appcontext
+def backfill_ticket_sequences():
+    """Seed per-tenant ticket number counters from existing tickets."""
+    highest = {}
+    numbers = db.session.query(Ticket.tenant_id, Ticket.ticket_number).filter(
+        Ticket.ticket_number.isnot(None)
+    ).execution_options(yield_per=5000)
+    
+    # One pass over the ticket table, comparing suffixes numerically
+    for tenant_id, ticket_number in numbers:
+        try:
+            number = int(ticket_number.rsplit('-', 1)[1])
+        except (IndexError, ValueError):
+            continue
+        if number > highest.get(tenant_id, 0):
+            highest[tenant_id] = number
+    
+    sequences = {s.tenant_id: s for s in TicketSequence.query.all()}
+    for tenant_id, number in highest.items():
+        sequence = sequences.get(tenant_id)
+        if sequence:
+            # Never move a counter backwards
+            sequence.last_number = max(sequence.last_number, number)
+        else:
+            db.session.add(TicketSequence(tenant_id=tenant_id, last_number=number))
+    
+    db.session.commit()
+    click.echo(f"Seeded ticket number counters for {len(highest)} tenants")
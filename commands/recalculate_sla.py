@@ -1,13 +1,22 @@
 from flask.cli import with_appcontext
 import click
-from models import db, Ticket
+import time
+from services.sla_recalculation_service import SLARecalculationService, SLA_CHUNK_SIZE
 
 @click.command('recalculate-sla')
+@click.option('--force', is_flag=True, help='Recompute every deadline from the current SLA configs, not only missing ones')
+@click.option('--tenant-id', type=int, help='Only recalculate this tenant')
+@click.option('--chunk-size', type=int, default=SLA_CHUNK_SIZE, show_default=True, help='Ticket ids per UPDATE and commit')
 @with_appcontext
-def recalculate_sla():
+def recalculate_sla(force, tenant_id, chunk_size):
     """Recalculate SLA for all tickets."""
-    tickets = Ticket.query.all()
-    for ticket in tickets:
-        ticket.calculate_sla_deadlines()
-    db.session.commit()
-    click.echo(f"Recalculated SLA for {len(tickets)} tickets") 
\ No newline at end of file
+    started = time.perf_counter()
+
+    def progress(tid, done, total, updated):
+        click.echo(f"  tenant {tid}: {done}/{total} ids scanned, {updated} tickets updated")
+
+    tenants, updated = SLARecalculationService.recalculate(
+        tenant_id, force=force, chunk_size=chunk_size, progress=progress
+    )
+    click.echo(f"Recalculated SLA for {updated} tickets across {tenants} tenants "
+               f"in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,11 @@
+from flask.cli import with_appcontext
+import click
+from services.analytics_rollup_service import AnalyticsRollupService
+
+@click.command('refresh-analytics-rollup')
+@click.option('--full', is_flag=True, help='Rebuild every day instead of only days touched since the last run')
+@with_appcontext
+def refresh_analytics_rollup(full):
+    """Refresh the per-tenant daily ticket rollup used by analytics."""
+    tenants, days = AnalyticsRollupService.refresh_all(full=full)
+    click.echo(f"Refreshed {days} rollup days across {tenants} tenants")
@@ -183,4 +183,79 @@ class Config:
     METABASE_URL = os.getenv('METABASE_URL')
     METABASE_SECRET_KEY = os.getenv('METABASE_SECRET_KEY')
 
-
+    # Ticket list pagination
+    TICKETS_PER_PAGE = int(os.getenv('TICKETS_PER_PAGE', 50))
+    TICKETS_MAX_PER_PAGE = 200
+
+    # Seconds to cache per-tenant ticket status counts (0 disables the cache)
+    TICKET_STATS_CACHE_TTL = int(os.getenv('TICKET_STATS_CACHE_TTL', 15))
+
+    # Analytics JSON response cache (0 disables); set a Redis URL to share it across workers
+    ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 300))
+    ANALYTICS_CACHE_SIZE = int(os.getenv('ANALYTICS_CACHE_SIZE', 512))
+    ANALYTICS_CACHE_REDIS_URL = os.getenv('ANALYTICS_CACHE_REDIS_URL')
+
+    # Inbound email webhooks store the payload and let a Celery worker create the ticket;
+    # set INBOUND_EMAIL_ASYNC=false to process inline when no worker is running
+    INBOUND_EMAIL_ASYNC = os.getenv('INBOUND_EMAIL_ASYNC', 'true').lower() == 'true'
+
+    # Attempts after which a failing inbound payload is no longer retried by the requeue sweep
+    INBOUND_EMAIL_MAX_ATTEMPTS = int(os.getenv('INBOUND_EMAIL_MAX_ATTEMPTS', 10))
+
+    # Base URL for links generated outside a web request (background workers)
+    APP_BASE_URL = os.getenv('APP_BASE_URL', 'https://easy-tix-gold.vercel.app')
+
+    # Seconds the inbound address -> tenant map is reused before it is reloaded
+    TENANT_RESOLVER_TTL = int(os.getenv('TENANT_RESOLVER_TTL', 300))
+
+    # Inbound HTML bodies are truncated to this many characters before conversion
+    INBOUND_EMAIL_MAX_HTML_CHARS = int(os.getenv('INBOUND_EMAIL_MAX_HTML_CHARS', 200000))
+
+    # IMAP mailbox polling (tasks.check_new_emails)
+    IMAP_POLL_CONCURRENCY = int(os.getenv('IMAP_POLL_CONCURRENCY', 8))  # mailboxes fetched in parallel
+    IMAP_FETCH_BATCH_SIZE = int(os.getenv('IMAP_FETCH_BATCH_SIZE', 50))  # messages per UID FETCH
+    IMAP_MAX_MESSAGES_PER_SWEEP = int(os.getenv('IMAP_MAX_MESSAGES_PER_SWEEP', 500))
+    IMAP_TIMEOUT = int(os.getenv('IMAP_TIMEOUT', 30))  # seconds
+
+    # Outbound email outbox (tasks.drain_email_outbox); set EMAIL_OUTBOX_ASYNC=false
+    # to send inline when no worker is running
+    EMAIL_OUTBOX_ASYNC = os.getenv('EMAIL_OUTBOX_ASYNC', 'true').lower() == 'true'
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 500))
+    EMAIL_OUTBOX_REQUESTS_PER_MINUTE = int(os.getenv('EMAIL_OUTBOX_REQUESTS_PER_MINUTE', 60))  # MailerSend API calls
+    EMAIL_OUTBOX_TENANT_MESSAGES_PER_MINUTE = int(os.getenv('EMAIL_OUTBOX_TENANT_MESSAGES_PER_MINUTE', 120))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
+
+    # Seconds a tenant's SLA targets are reused before SLAConfig is read again
+    SLA_CONFIG_CACHE_TTL = int(os.getenv('SLA_CONFIG_CACHE_TTL', 300))
+
+    # Tickets flagged per transaction by the SLA breach scanner (tasks.scan_sla_breaches)
+    SLA_BREACH_SCAN_BATCH_SIZE = int(os.getenv('SLA_BREACH_SCAN_BATCH_SIZE', 1000))
+
+    # Superadmin tenant list; with SUPERADMIN_DIRECTORY_SNAPSHOT the user/ticket counts are
+    # read from tenant_directory_snapshot (tasks.refresh_tenant_directory_snapshot) instead
+    SUPERADMIN_TENANTS_PER_PAGE = int(os.getenv('SUPERADMIN_TENANTS_PER_PAGE', 50))
+    SUPERADMIN_DIRECTORY_SNAPSHOT = os.getenv('SUPERADMIN_DIRECTORY_SNAPSHOT', 'false').lower() == 'true'
+
+    # Background tenant deletion (tasks.delete_tenant_data); set TENANT_DELETION_ASYNC=false
+    # to delete inline when no worker is running
+    TENANT_DELETION_ASYNC = os.getenv('TENANT_DELETION_ASYNC', 'true').lower() == 'true'
+    TENANT_DELETION_BATCH_SIZE = int(os.getenv('TENANT_DELETION_BATCH_SIZE', 1000))
+
+    # Per-request SQL instrumentation: requests slower than SLOW_REQUEST_MS or issuing at least
+    # SLOW_REQUEST_QUERIES statements are logged with their SLOW_REQUEST_STATEMENTS slowest ones
+    SQL_INSTRUMENTATION_ENABLED = os.getenv('SQL_INSTRUMENTATION_ENABLED', 'true').lower() == 'true'
+    SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 1000))
+    SLOW_REQUEST_QUERIES = int(os.getenv('SLOW_REQUEST_QUERIES', 50))
+    SLOW_REQUEST_STATEMENTS = int(os.getenv('SLOW_REQUEST_STATEMENTS', 5))
+    # Opt-in Server-Timing header (db time, query count), sent only to signed-in staff
+    SERVER_TIMING_HEADER = os.getenv('SERVER_TIMING_HEADER', 'false').lower() == 'true'
+
+    # /metrics (Prometheus text format), served only once METRICS_TOKEN is set. Set METRICS_DIR
+    # to a directory shared by the gunicorn workers (e.g. under /tmp) so every worker reports
+    # the totals of all of them. The email send/delivery series are recorded by the Celery
+    # worker and only reach /metrics when METRICS_DIR is shared with it as well
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    METRICS_DIR = os.getenv('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+    METRICS_STALE_AFTER = float(os.getenv('METRICS_STALE_AFTER', 300))
@@ -0,0 +1,22 @@
+"""Track the last fetched IMAP UID per email config
+
+Revision ID: add_email_config_last_uid
+Revises: add_tenant_address_lower_indexes
+Create Date: 2025-02-13 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_email_config_last_uid'
+down_revision = 'add_tenant_address_lower_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('email_config', sa.Column('last_uid', sa.BigInteger(), nullable=True))
+    op.add_column('email_config', sa.Column('uid_validity', sa.BigInteger(), nullable=True))
+
+def downgrade():
+    op.drop_column('email_config', 'uid_validity')
+    op.drop_column('email_config', 'last_uid')
@@ -0,0 +1,37 @@
+"""Add inbound email queue
+
+Revision ID: add_inbound_email
+Revises: add_ticket_daily_rollup
+Create Date: 2025-02-10 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_inbound_email'
+down_revision = 'add_ticket_daily_rollup'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('inbound_email',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('payload', sa.JSON(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('tenant_id', sa.Integer(), nullable=True),
+        sa.Column('ticket_id', sa.Integer(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ),
+        sa.ForeignKeyConstraint(['ticket_id'], ['ticket.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_inbound_email_status_received', 'inbound_email', ['status', 'received_at'])
+
+def downgrade():
+    op.drop_index('ix_inbound_email_status_received', table_name='inbound_email')
+    op.drop_table('inbound_email')
@@ -0,0 +1,22 @@
+"""Deduplicate inbound emails
+
+Revision ID: add_inbound_email_dedup
+Revises: add_inbound_email
+Create Date: 2025-02-11 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_inbound_email_dedup'
+down_revision = 'add_inbound_email'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('inbound_email', sa.Column('dedup_key', sa.String(length=64), nullable=True))
+    op.create_unique_constraint('uq_inbound_email_dedup_key', 'inbound_email', ['dedup_key'])
+
+def downgrade():
+    op.drop_constraint('uq_inbound_email_dedup_key', 'inbound_email', type_='unique')
+    op.drop_column('inbound_email', 'dedup_key')
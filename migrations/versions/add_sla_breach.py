@@ -0,0 +1,43 @@
+"""Add SLA breach events and open-deadline partial indexes
+
+Revision ID: add_sla_breach
+Revises: add_email_outbox
+Create Date: 2025-02-18 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_sla_breach'
+down_revision = 'add_email_outbox'
+branch_labels = None
+depends_on = None
+
+RESPONSE_OPEN = 'first_response_at IS NULL AND sla_response_met IS NULL'
+RESOLUTION_OPEN = 'resolved_at IS NULL AND sla_resolution_met IS NULL'
+
+def upgrade():
+    op.create_table('sla_breach',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('ticket_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('due_at', sa.DateTime(), nullable=False),
+        sa.Column('detected_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ),
+        sa.ForeignKeyConstraint(['ticket_id'], ['ticket.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('ticket_id', 'kind', 'due_at', name='uq_sla_breach_ticket_kind_due')
+    )
+    op.create_index('ix_sla_breach_tenant_detected', 'sla_breach', ['tenant_id', 'detected_at'])
+
+    op.create_index('ix_ticket_open_response_due', 'ticket', ['sla_response_due_at'],
+                    postgresql_where=sa.text(RESPONSE_OPEN), sqlite_where=sa.text(RESPONSE_OPEN))
+    op.create_index('ix_ticket_open_resolution_due', 'ticket', ['sla_resolution_due_at'],
+                    postgresql_where=sa.text(RESOLUTION_OPEN), sqlite_where=sa.text(RESOLUTION_OPEN))
+
+def downgrade():
+    op.drop_index('ix_ticket_open_resolution_due', table_name='ticket')
+    op.drop_index('ix_ticket_open_response_due', table_name='ticket')
+    op.drop_index('ix_sla_breach_tenant_detected', table_name='sla_breach')
+    op.drop_table('sla_breach')
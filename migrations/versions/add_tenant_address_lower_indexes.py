@@ -0,0 +1,24 @@
+"""Case-insensitive indexes on tenant inbound addresses
+
+Revision ID: add_tenant_address_lower_indexes
+Revises: add_inbound_email_dedup
+Create Date: 2025-02-12 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_tenant_address_lower_indexes'
+down_revision = 'add_inbound_email_dedup'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_tenant_lower_support_email', 'tenant', [sa.text('lower(support_email)')])
+    op.create_index('ix_tenant_lower_support_alias', 'tenant', [sa.text('lower(support_alias)')])
+    op.create_index('ix_tenant_lower_cloudmailin_address', 'tenant', [sa.text('lower(cloudmailin_address)')])
+
+def downgrade():
+    op.drop_index('ix_tenant_lower_cloudmailin_address', table_name='tenant')
+    op.drop_index('ix_tenant_lower_support_alias', table_name='tenant')
+    op.drop_index('ix_tenant_lower_support_email', table_name='tenant')
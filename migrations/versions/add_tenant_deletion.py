@@ -0,0 +1,36 @@
+"""Add soft-disable flag on tenant and background tenant deletion progress
+
+Revision ID: add_tenant_deletion
+Revises: add_tenant_directory_snapshot
+Create Date: 2025-02-22 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_tenant_deletion'
+down_revision = 'add_tenant_directory_snapshot'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('tenant', sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    op.create_table('tenant_deletion',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('tenant_name', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('step', sa.String(length=50), nullable=True),
+        sa.Column('rows_deleted', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('requested_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tenant_deletion_tenant_id', 'tenant_deletion', ['tenant_id'])
+
+def downgrade():
+    op.drop_index('ix_tenant_deletion_tenant_id', table_name='tenant_deletion')
+    op.drop_table('tenant_deletion')
+    op.drop_column('tenant', 'deleted_at')
@@ -0,0 +1,27 @@
+"""Add tenant directory snapshot for the superadmin tenant list
+
+Revision ID: add_tenant_directory_snapshot
+Revises: add_sla_breach
+Create Date: 2025-02-20 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_tenant_directory_snapshot'
+down_revision = 'add_sla_breach'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('tenant_directory_snapshot',
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('user_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('ticket_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ),
+        sa.PrimaryKeyConstraint('tenant_id')
+    )
+
+def downgrade():
+    op.drop_table('tenant_directory_snapshot')
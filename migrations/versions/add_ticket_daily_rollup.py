@@ -0,0 +1,49 @@
+"""Add daily ticket rollup for analytics
+
+Revision ID: add_ticket_daily_rollup
+Revises: add_ticket_sequence
+Create Date: 2025-02-06 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_ticket_daily_rollup'
+down_revision = 'add_ticket_sequence'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('ticket_daily_rollup',
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('priority', sa.String(length=20), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('ticket_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sla_tracked_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sla_fully_met_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sla_response_met_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sla_response_breached_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sla_resolution_met_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('sla_resolution_breached_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('response_time_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('response_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('resolution_time_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('resolution_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ),
+        sa.PrimaryKeyConstraint('tenant_id', 'day', 'status', 'priority', 'source')
+    )
+    op.create_table('job_watermark',
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('value', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_index('ix_ticket_tenant_updated', 'ticket', ['tenant_id', 'updated_at'])
+    # Run `flask refresh-analytics-rollup --full` afterwards to build the rollup
+
+def downgrade():
+    op.drop_index('ix_ticket_tenant_updated', table_name='ticket')
+    op.drop_table('job_watermark')
+    op.drop_table('ticket_daily_rollup')
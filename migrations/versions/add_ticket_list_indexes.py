@@ -0,0 +1,22 @@
+"""Add keyset pagination indexes for the ticket list
+
+Revision ID: add_ticket_list_indexes
+Revises: 2024_01_31_add_reset_token
+Create Date: 2025-02-03 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_ticket_list_indexes'
+down_revision = '2024_01_31_add_reset_token'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_ticket_tenant_created_id', 'ticket', ['tenant_id', 'created_at', 'id'])
+    op.create_index('ix_ticket_tenant_status_created_id', 'ticket', ['tenant_id', 'status', 'created_at', 'id'])
+
+def downgrade():
+    op.drop_index('ix_ticket_tenant_status_created_id', table_name='ticket')
+    op.drop_index('ix_ticket_tenant_created_id', table_name='ticket')
@@ -0,0 +1,27 @@
+"""Add per-tenant ticket number counters
+
+Revision ID: add_ticket_sequence
+Revises: add_ticket_list_indexes
+Create Date: 2025-02-04 10:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = 'add_ticket_sequence'
+down_revision = 'add_ticket_list_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('ticket_sequence',
+        sa.Column('tenant_id', sa.Integer(), nullable=False),
+        sa.Column('last_number', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenant.id'], ),
+        sa.PrimaryKeyConstraint('tenant_id')
+    )
+    # Run `flask backfill-ticket-sequences` afterwards to seed counters in one pass
+
+def downgrade():
+    op.drop_table('ticket_sequence')
@@ -3,10 +3,19 @@ from flask_login import UserMixin
 from datetime import datetime, timedelta
 from werkzeug.security import generate_password_hash, check_password_hash
 import uuid
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update, text
+from sqlalchemy.exc import IntegrityError
 import re
 from sqlalchemy.dialects.postgresql import JSONB
 
+# SLA targets in minutes (response, resolution) for priorities without an SLAConfig
+DEFAULT_SLA_MINUTES = {
+    'low': (24 * 60, 72 * 60),
+    'medium': (12 * 60, 48 * 60),
+    'high': (4 * 60, 24 * 60)
+}
+DEFAULT_SLA_FALLBACK = (24 * 60, 72 * 60)
+
 class Tenant(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -29,6 +38,7 @@ class Tenant(db.Model):
     trial_ends_at = db.Column(db.DateTime)
     auto_renew = db.Column(db.Boolean, default=False)
     subscription_status = db.Column(db.String(20), default='inactive')
+    deleted_at = db.Column(db.DateTime)  # set when deletion is requested; the tenant is disabled from then on
     
     def get_ticket_quota(self):
         """Return the maximum number of tickets allowed per month"""
@@ -55,7 +65,10 @@ class Tenant(db.Model):
     @property
     def recent_tickets(self):
         """Get the 5 most recent tickets"""
-        return self.tickets.order_by(Ticket.created_at.desc()).limit(5).all()
+        from services.ticket_query_service import TicketQueryService
+        return self.tickets.options(*TicketQueryService.list_options()).order_by(
+            Ticket.created_at.desc()
+        ).limit(5).all()
 
     def set_email_domain(self, domain):
         """Validate and set email domain"""
@@ -81,7 +94,7 @@ class Tenant(db.Model):
             
         # Check if email is already used
         existing = Tenant.query.filter(
-            Tenant.support_email == email,
+            func.lower(Tenant.support_email) == email.lower(),
             Tenant.id != self.id
         ).first()
         
@@ -89,11 +102,13 @@ class Tenant(db.Model):
             raise ValueError(f"Email {email} is already in use by another tenant")
             
         self.support_email = email.lower()
+        self._addresses_changed()
 
     def generate_support_alias(self):
         """Generate a unique support email alias for this tenant"""
         unique_id = str(uuid.uuid4())[:8]  # Use first 8 chars for shorter alias
         self.support_alias = f'support-{self.id}-{unique_id}@cloudmailin.net'
+        self._addresses_changed()
         return self.support_alias
 
     def generate_cloudmailin_address(self):
@@ -102,8 +117,14 @@ class Tenant(db.Model):
             from services.cloudmailin_service import CloudMailinService
             self.cloudmailin_address = CloudMailinService.create_address(self.id)
             db.session.commit()
+            self._addresses_changed()
         return self.cloudmailin_address
 
+    def _addresses_changed(self):
+        """Make inbound email routing pick up this tenant's new address"""
+        from services.tenant_resolver_service import TenantResolver
+        TenantResolver.invalidate()
+
     @property
     def is_trial(self):
         return (
@@ -148,6 +169,11 @@ class Tenant(db.Model):
             return True
         return False
 
+# Case-insensitive lookups of inbound addresses (TenantResolver cache misses)
+db.Index('ix_tenant_lower_support_email', func.lower(Tenant.support_email))
+db.Index('ix_tenant_lower_support_alias', func.lower(Tenant.support_alias))
+db.Index('ix_tenant_lower_cloudmailin_address', func.lower(Tenant.cloudmailin_address))
+
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -222,7 +248,27 @@ class Ticket(db.Model):
     sla_resolution_due_at = db.Column(db.DateTime)
     sla_response_met = db.Column(db.Boolean, default=None)
     sla_resolution_met = db.Column(db.Boolean, default=None)
-    
+
+    __table_args__ = (
+        # Keyset pagination of the ticket list walks (created_at, id) per tenant
+        db.Index('ix_ticket_tenant_created_id', 'tenant_id', 'created_at', 'id'),
+        db.Index('ix_ticket_tenant_status_created_id', 'tenant_id', 'status', 'created_at', 'id'),
+        # Incremental analytics refresh looks up tickets changed since a watermark
+        db.Index('ix_ticket_tenant_updated', 'tenant_id', 'updated_at'),
+        # The SLA breach scanner walks open, not yet judged deadlines by due time; tickets
+        # leave these indexes once responded/resolved or marked as breached
+        db.Index(
+            'ix_ticket_open_response_due', 'sla_response_due_at',
+            postgresql_where=text('first_response_at IS NULL AND sla_response_met IS NULL'),
+            sqlite_where=text('first_response_at IS NULL AND sla_response_met IS NULL')
+        ),
+        db.Index(
+            'ix_ticket_open_resolution_due', 'sla_resolution_due_at',
+            postgresql_where=text('resolved_at IS NULL AND sla_resolution_met IS NULL'),
+            sqlite_where=text('resolved_at IS NULL AND sla_resolution_met IS NULL')
+        ),
+    )
+
     @staticmethod
     def generate_ticket_number(tenant_id):
         """Generate a unique ticket number for the tenant"""
@@ -233,56 +279,20 @@ class Ticket(db.Model):
         # Use tenant ID and first 2 letters of name for unique prefix
         prefix = f"{tenant.name[:2].upper()}{tenant.id}"
         
-        # Find the highest ticket number for this tenant
-        latest_ticket = Ticket.query.filter(
-            Ticket.tenant_id == tenant_id,
-            Ticket.ticket_number.like(f'{prefix}-%')
-        ).order_by(Ticket.ticket_number.desc()).first()
+        # Allocate the next number from the tenant's counter row
+        new_num = TicketSequence.next_value(tenant.id)
         
-        if latest_ticket:
-            try:
-                # Extract number from ticket_number (e.g., 'FR5-001' -> 1)
-                last_num = int(latest_ticket.ticket_number.split('-')[1])
-                new_num = last_num + 1
-            except (IndexError, ValueError):
-                new_num = 1
-        else:
-            new_num = 1
-            
         # Generate new ticket number with padding
-        new_ticket_number = f"{prefix}-{new_num:03d}"
-        
-        # Double-check uniqueness
-        while Ticket.query.filter_by(ticket_number=new_ticket_number).first():
-            new_num += 1
-            new_ticket_number = f"{prefix}-{new_num:03d}"
-            
-        return new_ticket_number
+        return f"{prefix}-{new_num:03d}"
 
     def calculate_sla_deadlines(self):
         """Calculate SLA deadlines based on priority and tenant configuration"""
-        # Get tenant's SLA config for this priority
-        sla_config = SLAConfig.query.filter_by(
-            tenant_id=self.tenant_id,
-            priority=self.priority
-        ).first()
-        
-        if not sla_config:
-            # If no specific config found, use default values
-            response_time = {
-                'low': 24 * 60,     # 24 hours in minutes
-                'medium': 12 * 60,  # 12 hours in minutes
-                'high': 4 * 60      # 4 hours in minutes
-            }.get(self.priority, 24 * 60)  # Default to 24 hours
-            
-            resolution_time = {
-                'low': 72 * 60,     # 72 hours in minutes
-                'medium': 48 * 60,  # 48 hours in minutes
-                'high': 24 * 60     # 24 hours in minutes
-            }.get(self.priority, 72 * 60)  # Default to 72 hours
-        else:
-            response_time = sla_config.response_time
-            resolution_time = sla_config.resolution_time
+        from services.sla_config_cache_service import SLAConfigCache
+
+        # Tenant's SLA config for this priority (cached per tenant), or the default values
+        response_time, resolution_time = SLAConfigCache.table(self.tenant_id).get(
+            self.priority, DEFAULT_SLA_FALLBACK
+        )
         
         # Calculate deadlines from ticket creation time
         if not self.sla_response_due_at:
@@ -290,6 +300,18 @@ class Ticket(db.Model):
         if not self.sla_resolution_due_at:
             self.sla_resolution_due_at = self.created_at + timedelta(minutes=resolution_time)
 
+    def record_first_response(self, at):
+        """Stamp the first response once and judge the response SLA against it"""
+        if self.first_response_at:
+            return
+        self.first_response_at = at
+        # Tickets created before every source set deadlines get them here, so the
+        # response is still judged (the breach scanner skips responded tickets)
+        if not self.sla_response_due_at and self.created_at:
+            self.calculate_sla_deadlines()
+        if self.sla_response_due_at:
+            self.sla_response_met = at <= self.sla_response_due_at
+
     def check_sla_status(self):
         """Check and update SLA status"""
         now = datetime.utcnow()
@@ -298,19 +320,10 @@ class Ticket(db.Model):
         if not self.sla_response_due_at or not self.sla_resolution_due_at:
             self.calculate_sla_deadlines()
         
-        # Response SLA
-        if not self.first_response_at:
-            # Check for first response conditions
-            first_response = (
-                TicketComment.query.filter_by(
-                    ticket_id=self.id,
-                    is_internal=True
-                ).order_by(TicketComment.created_at.asc()).first()
-            )
-            
-            if first_response or (self.assigned_to_id and self.status != 'open'):
-                self.first_response_at = first_response.created_at if first_response else now
-                self.sla_response_met = self.first_response_at <= self.sla_response_due_at
+        # Response SLA: internal comments stamp first_response_at when they are added
+        # (record_first_response); picking the ticket up counts as a response too
+        if not self.first_response_at and self.assigned_to_id and self.status != 'open':
+            self.record_first_response(now)
         
         # Resolution SLA
         if self.status == 'resolved' and not self.resolved_at:
@@ -352,6 +365,138 @@ class Ticket(db.Model):
             'resolution': resolution_status
         }
 
+class TicketSequence(db.Model):
+    """Per-tenant ticket number counter, incremented atomically on each allocation"""
+    __tablename__ = 'ticket_sequence'
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), primary_key=True)
+    last_number = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def highest_ticket_number(tenant_id):
+        """Highest numeric suffix among the tenant's existing ticket numbers"""
+        highest = 0
+        numbers = db.session.query(Ticket.ticket_number).filter(
+            Ticket.tenant_id == tenant_id,
+            Ticket.ticket_number.isnot(None)
+        )
+        for (ticket_number,) in numbers:
+            try:
+                # Compare numerically so that -1000 ranks above -999
+                highest = max(highest, int(ticket_number.rsplit('-', 1)[1]))
+            except (IndexError, ValueError):
+                continue
+        return highest
+
+    @classmethod
+    def next_value(cls, tenant_id):
+        """
+        Atomically increment and return the tenant's counter.
+        The row lock taken by the UPDATE is held until the caller commits,
+        so concurrent allocations for the same tenant never share a number.
+        """
+        increment = update(cls).where(cls.tenant_id == tenant_id).values(
+            last_number=cls.last_number + 1,
+            updated_at=datetime.utcnow()
+        )
+
+        for _ in range(2):
+            if db.session.get_bind().dialect.update_returning:
+                value = db.session.execute(increment.returning(cls.last_number)).scalar()
+            else:
+                # Older SQLite: the write lock taken by the UPDATE keeps the follow-up read consistent
+                result = db.session.execute(increment)
+                value = None
+                if result.rowcount:
+                    value = db.session.query(cls.last_number).filter(cls.tenant_id == tenant_id).scalar()
+
+            if value is not None:
+                return value
+
+            # First ticket for this tenant since the counter table was introduced
+            try:
+                with db.session.begin_nested():
+                    db.session.add(cls(
+                        tenant_id=tenant_id,
+                        last_number=cls.highest_ticket_number(tenant_id)
+                    ))
+            except IntegrityError:
+                # Another request created the row first; retry the increment
+                pass
+
+        raise RuntimeError(f"Could not allocate a ticket number for tenant {tenant_id}")
+
+class TicketDailyRollup(db.Model):
+    """Pre-aggregated ticket counts and SLA/timing sums per tenant, day, status, priority and source"""
+    __tablename__ = 'ticket_daily_rollup'
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    source = db.Column(db.String(20), primary_key=True)
+    ticket_count = db.Column(db.Integer, nullable=False, default=0)
+    sla_tracked_count = db.Column(db.Integer, nullable=False, default=0)  # tickets with a response deadline
+    sla_fully_met_count = db.Column(db.Integer, nullable=False, default=0)  # response and resolution met
+    sla_response_met_count = db.Column(db.Integer, nullable=False, default=0)
+    sla_response_breached_count = db.Column(db.Integer, nullable=False, default=0)
+    sla_resolution_met_count = db.Column(db.Integer, nullable=False, default=0)
+    sla_resolution_breached_count = db.Column(db.Integer, nullable=False, default=0)
+    response_time_sum = db.Column(db.Float, nullable=False, default=0)  # seconds
+    response_count = db.Column(db.Integer, nullable=False, default=0)
+    resolution_time_sum = db.Column(db.Float, nullable=False, default=0)  # seconds
+    resolution_count = db.Column(db.Integer, nullable=False, default=0)
+
+class TenantDirectorySnapshot(db.Model):
+    """Periodically refreshed user/ticket counts per tenant for the superadmin tenant list"""
+    __tablename__ = 'tenant_directory_snapshot'
+
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), primary_key=True)
+    user_count = db.Column(db.Integer, nullable=False, default=0)
+    ticket_count = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+class TenantDeletion(db.Model):
+    """Progress of a background tenant deletion (tasks.delete_tenant_data)"""
+    __tablename__ = 'tenant_deletion'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, nullable=False, index=True)  # no FK: the tenant row is deleted last
+    tenant_name = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    step = db.Column(db.String(50))  # table currently being deleted from
+    rows_deleted = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    requested_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)  # last batch committed by a worker
+    finished_at = db.Column(db.DateTime)
+
+class JobWatermark(db.Model):
+    """Last processed position of an incremental background job"""
+    __tablename__ = 'job_watermark'
+
+    name = db.Column(db.String(100), primary_key=True)
+    value = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class SLABreach(db.Model):
+    """A response or resolution deadline that passed while the ticket was still waiting"""
+    __tablename__ = 'sla_breach'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'), nullable=False)
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # response, resolution
+    due_at = db.Column(db.DateTime, nullable=False)
+    detected_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_sla_breach_tenant_detected', 'tenant_id', 'detected_at'),
+        # A reopened ticket breaching the same deadline again is not a new event
+        db.UniqueConstraint('ticket_id', 'kind', 'due_at', name='uq_sla_breach_ticket_kind_due'),
+    )
+
 class TicketComment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'), nullable=False)
@@ -394,8 +539,56 @@ class EmailConfig(db.Model):
     enabled = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_check = db.Column(db.DateTime)
+    last_uid = db.Column(db.BigInteger)  # highest INBOX UID already turned into tickets
+    uid_validity = db.Column(db.BigInteger)  # UIDVALIDITY last_uid belongs to
     
-    tenant = db.relationship('Tenant', backref='email_config') 
+    tenant = db.relationship('Tenant', backref='email_config')
+
+class InboundEmail(db.Model):
+    """Raw inbound email webhook payload, stored on receipt and turned into a ticket by a worker"""
+    __tablename__ = 'inbound_email'
+
+    id = db.Column(db.Integer, primary_key=True)
+    source = db.Column(db.String(20), nullable=False)  # cloudmailin, forward
+    dedup_key = db.Column(db.String(64))  # sha256 of Message-ID (or content) and recipient
+    payload = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, processing, processed, rejected, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'))  # set once the recipient is resolved
+    ticket_id = db.Column(db.Integer, db.ForeignKey('ticket.id'))
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)  # when a worker claimed it
+    processed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Workers and the requeue sweep look for unfinished payloads oldest first
+        db.Index('ix_inbound_email_status_received', 'status', 'received_at'),
+        # Webhook retries and forwarded copies resolve to the row already stored
+        db.UniqueConstraint('dedup_key', name='uq_inbound_email_dedup_key'),
+    )
+
+class EmailOutbox(db.Model):
+    """Rendered outbound email waiting to be sent to MailerSend by the outbox worker"""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tenant_id = db.Column(db.Integer, db.ForeignKey('tenant.id'))
+    kind = db.Column(db.String(50), nullable=False)  # ticket_confirmation, ticket_notification
+    message = db.Column(db.JSON, nullable=False)  # MailerSend mail body
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    provider_id = db.Column(db.String(100))  # MailerSend bulk_email_id
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # The worker claims due messages in id order
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
 
 class SLAConfig(db.Model):
     id = db.Column(db.Integer, primary_key=True)
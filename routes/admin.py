@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, abort
 from flask_login import login_required, current_user
 from models import db, User, Tenant, SubscriptionPayment, SLAConfig, Ticket
+from services.sla_recalculation_service import SLARecalculationService
+from services.sla_config_cache_service import SLAConfigCache
 from werkzeug.security import generate_password_hash
 from functools import wraps
 import stripe  # Add stripe for payments
@@ -455,6 +457,7 @@ def update_sla_config():
                 db.session.add(sla_config)
         
         db.session.commit()
+        SLAConfigCache.invalidate(current_user.tenant_id)
         flash('SLA configuration updated successfully', 'success')
         
     except Exception as e:
@@ -469,12 +472,9 @@ def update_sla_config():
 def recalculate_sla():
     """Admin route to recalculate SLA for all tenant's tickets."""
     try:
-        # Only recalculate for tickets in the current tenant
-        tickets = Ticket.query.filter_by(tenant_id=current_user.tenant_id).all()
-        for ticket in tickets:
-            ticket.calculate_sla_deadlines()
-        db.session.commit()
-        flash(f'Successfully recalculated SLA for {len(tickets)} tickets', 'success')
+        # Only recalculate for tickets in the current tenant, applying the current SLA settings
+        _, updated = SLARecalculationService.recalculate(current_user.tenant_id, force=True)
+        flash(f'Successfully recalculated SLA for {updated} tickets', 'success')
     except Exception as e:
         db.session.rollback()
         flash('Error recalculating SLA settings', 'error')
@@ -1,6 +1,11 @@
-from flask import Blueprint, render_template, jsonify, current_app, request, send_file
+from flask import Blueprint, render_template, jsonify, current_app, request, send_file, Response, stream_with_context
 from flask_login import login_required, current_user
 from services.analytics_service import AnalyticsService
+from services.ticket_stats_service import TicketStats
+from services.analytics_rollup_service import AnalyticsRollupService
+from services.dashboard_data_service import DashboardDataService
+from services.analytics_cache_service import AnalyticsCache
+from services.ticket_export_service import TicketExportService, RAW_EXPORT_HEADER, FILTERED_EXPORT_HEADER
 from models import Dashboard, ReportConfig, AnalyticsDashboard, Ticket, User, TicketComment
 import csv
 from io import StringIO, BytesIO
@@ -24,16 +29,58 @@ def handle_analytics_errors(f):
             }), 500
     return decorated_function
 
+def cache_analytics_response(f):
+    """
+    Serve a JSON view from the tenant's analytics cache, with an ETag so unchanged
+    data is answered with 304 Not Modified.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_app.config.get('ANALYTICS_CACHE_TTL'):
+            return f(*args, **kwargs)
+
+        params = dict(request.args.items())
+        params.update(kwargs)
+        if 'dateRange' in params:
+            try:
+                start_date, end_date = parse_date_range(params['dateRange'])
+            except ValueError:
+                return f(*args, **kwargs)
+            params['dateRange'] = f"{start_date:%Y-%m-%d}..{end_date:%Y-%m-%d}"
+        # Relative ranges ("last 30 days") move with the calendar
+        params['_today'] = datetime.utcnow().strftime('%Y-%m-%d')
+
+        key = AnalyticsCache.make_key(current_user.tenant_id, request.endpoint, params)
+        cached = AnalyticsCache.get(key)
+        if cached:
+            etag, body = cached
+        else:
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code != 200 or not response.is_json:
+                return response
+            body = response.get_data()
+            if AnalyticsRollupService.is_current(current_user.tenant_id):
+                etag = AnalyticsCache.set(key, body)
+            else:
+                # Built before the rollup caught up with the latest write: serve, don't cache
+                etag = AnalyticsCache.etag(body)
+
+        response = current_app.response_class(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+    return decorated_function
+
 @analytics.route('/', methods=['GET', 'POST'])
 @login_required
 def index():
     """Analytics landing page"""
     # Calculate actual metrics
-    base_query = Ticket.query.filter_by(tenant_id=current_user.tenant_id)
+    status_counts = TicketStats.status_counts(current_user.tenant_id)
     
     metrics = {
-        'open_tickets': base_query.filter_by(status='open').count(),
-        'in_progress': base_query.filter_by(status='in_progress').count(),
+        'open_tickets': status_counts['open'],
+        'in_progress': status_counts['in_progress'],
         'avg_response_time': format_duration(
             db.session.query(
                 func.avg(
@@ -71,6 +118,7 @@ def index():
 
 @analytics.route('/data/<report_type>', methods=['GET'])
 @login_required
+@cache_analytics_response
 def get_analytics_data(report_type):
     try:
         days = request.args.get('days', 30, type=int)
@@ -397,8 +445,8 @@ def export_data():
     """Export analytics data to CSV"""
     days = request.args.get('days', 30, type=int)
     
-    # Create CSV file in binary mode
-    output = BytesIO()
+    # csv writes text; encoded for send_file below
+    output = StringIO()
     writer = csv.writer(output)
     
     # Write headers
@@ -429,9 +477,8 @@ def export_data():
         writer.writerow(['Agent Performance', datetime.utcnow().strftime('%Y-%m-%d'), f"{agent} - SLA", sla])
     
     # Prepare response
-    output.seek(0)
     return send_file(
-        output,
+        BytesIO(output.getvalue().encode('utf-8')),
         mimetype='text/csv',
         as_attachment=True,
         download_name=f'analytics_export_{datetime.utcnow().strftime("%Y%m%d")}.csv'
@@ -449,8 +496,8 @@ def export_raw_data():
         priority = request.args.getlist('priority')
         assigned_to = request.args.getlist('assigned_to')
         
-        # Get filtered data
-        tickets = AnalyticsService.get_filtered_tickets(
+        # Validate filters and build the query before the response starts streaming
+        query = AnalyticsService.filtered_tickets_query(
             tenant_id=current_user.tenant_id,
             start_date=start_date,
             end_date=end_date,
@@ -459,68 +506,18 @@ def export_raw_data():
             assigned_to=assigned_to
         )
         
-        # Create CSV file in memory
-        output = BytesIO()
-        
-        # Create a string buffer for CSV writing
-        string_buffer = StringIO()
-        writer = csv.writer(string_buffer)
-        
-        # Write headers
-        writer.writerow([
-            'Ticket Number',
-            'Title',
-            'Status',
-            'Priority',
-            'Created At',
-            'Updated At',
-            'Assigned To',
-            'Contact Name',
-            'Contact Email',
-            'First Response At',
-            'Resolved At',
-            'SLA Response Met',
-            'SLA Resolution Met'
-        ])
-        
-        # Write data
-        for ticket in tickets:
-            writer.writerow([
-                ticket.ticket_number,
-                ticket.title,
-                ticket.status,
-                ticket.priority,
-                ticket.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                ticket.updated_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else '',
-                ticket.assigned_to.email if ticket.assigned_to else '',
-                ticket.contact_name,
-                ticket.contact_email,
-                ticket.first_response_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.first_response_at else '',
-                ticket.resolved_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.resolved_at else '',
-                'Yes' if ticket.sla_response_met else 'No',
-                'Yes' if ticket.sla_resolution_met else 'No'
-            ])
-        
-        # Get the string value and encode it
-        csv_data = string_buffer.getvalue().encode('utf-8-sig')  # utf-8-sig for Excel compatibility
-        
-        # Write to bytes buffer
-        output.write(csv_data)
-        
-        # Prepare response
-        output.seek(0)
-        
         # Generate filename with date range
         if start_date and end_date:
             filename = f'tickets_{start_date}_to_{end_date}.csv'
         else:
             filename = f'tickets_export_{datetime.utcnow().strftime("%Y%m%d")}.csv'
         
-        return send_file(
-            output,
+        # utf-8 BOM for Excel compatibility
+        rows = TicketExportService.raw_export_rows(query)
+        return Response(
+            stream_with_context(TicketExportService.stream_csv(RAW_EXPORT_HEADER, rows, bom=True)),
             mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
         
     except Exception as e:
@@ -529,6 +526,7 @@ def export_raw_data():
 
 @analytics.route('/data/summary')
 @login_required
+@cache_analytics_response
 def get_summary_data():
     """Get summary metrics data"""
     days = request.args.get('days', 30, type=int)
@@ -572,54 +570,39 @@ def get_dashboard_config():
 
 @analytics.route('/api/custom/tickets-by-priority')
 @login_required
+@cache_analytics_response
 def tickets_by_priority():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
     
-    tickets = Ticket.query.filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).with_entities(
-        Ticket.priority,
-        func.count(Ticket.id)
-    ).group_by(Ticket.priority).all()
+    tickets = AnalyticsRollupService.aggregate(current_user.tenant_id, start_date, end_date, 'priority')
     
     return jsonify({
-        'labels': [t[0].capitalize() for t in tickets],
+        'labels': [t.key.capitalize() for t in tickets],
         'datasets': [{
-            'data': [t[1] for t in tickets],
+            'data': [int(t.ticket_count) for t in tickets],
             'backgroundColor': ['#4e73df', '#1cc88a', '#36b9cc']
         }]
     })
 
 @analytics.route('/api/custom/response-time-trend')
 @login_required
+@cache_analytics_response
 def response_time_trend():
+    # Same series as first_response_trend: the average time to the first agent response
+    # per creation day. The old query averaged the time to every non-customer comment
+    # (a Python `and` reduced its filter to ~is_customer), which grew with each reply.
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
     
-    response_times = db.session.query(
-        func.date(Ticket.created_at).label('date'),
-        func.avg(TicketComment.created_at - Ticket.created_at).label('avg_response')
-    ).join(
-        TicketComment,
-        Ticket.id == TicketComment.ticket_id
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date),
-        TicketComment.is_internal == True and ~TicketComment.is_customer
-    ).group_by(
-        func.date(Ticket.created_at)
-    ).order_by(
-        func.date(Ticket.created_at)
-    ).all()
+    response_times = AnalyticsRollupService.aggregate(current_user.tenant_id, start_date, end_date, 'day')
+    response_times = [rt for rt in response_times if rt.response_count]
     
     return jsonify({
-        'labels': [rt.date.strftime('%Y-%m-%d') for rt in response_times],
+        'labels': [rt.key.strftime('%Y-%m-%d') for rt in response_times],
         'datasets': [{
             'label': 'Average Response Time (hours)',
-            'data': [float(rt.avg_response.total_seconds() / 3600) if rt.avg_response else 0 
-                    for rt in response_times],
+            'data': [float(rt.response_time_sum) / rt.response_count / 3600 for rt in response_times],
             'borderColor': '#4e73df',
             'fill': False
         }]
@@ -627,28 +610,24 @@ def response_time_trend():
 
 @analytics.route('/api/custom/tickets-by-status')
 @login_required
+@cache_analytics_response
 def tickets_by_status():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
     
-    tickets = Ticket.query.filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).with_entities(
-        Ticket.status,
-        func.count(Ticket.id)
-    ).group_by(Ticket.status).all()
+    tickets = AnalyticsRollupService.aggregate(current_user.tenant_id, start_date, end_date, 'status')
     
     return jsonify({
-        'labels': [t[0].capitalize() for t in tickets],
+        'labels': [t.key.capitalize() for t in tickets],
         'datasets': [{
-            'data': [t[1] for t in tickets],
+            'data': [int(t.ticket_count) for t in tickets],
             'backgroundColor': ['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e']
         }]
     })
 
 @analytics.route('/api/custom/agent-performance')
 @login_required
+@cache_analytics_response
 def agent_performance():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
@@ -685,80 +664,55 @@ def agent_performance():
 
 @analytics.route('/api/custom/tickets-by-source')
 @login_required
+@cache_analytics_response
 def tickets_by_source():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
     
-    tickets = Ticket.query.filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).with_entities(
-        Ticket.source,
-        func.count(Ticket.id)
-    ).group_by(Ticket.source).all()
+    tickets = AnalyticsRollupService.aggregate(current_user.tenant_id, start_date, end_date, 'source')
     
     return jsonify({
-        'labels': [t[0].capitalize() for t in tickets],
+        'labels': [t.key.capitalize() for t in tickets],
         'datasets': [{
-            'data': [t[1] for t in tickets],
+            'data': [int(t.ticket_count) for t in tickets],
             'backgroundColor': ['#4e73df', '#1cc88a', '#36b9cc']
         }]
     })
 
 @analytics.route('/api/custom/resolution-time-by-priority')
 @login_required
+@cache_analytics_response
 def resolution_time_by_priority():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
     
-    resolution_times = db.session.query(
-        Ticket.priority,
-        func.avg(Ticket.resolved_at - Ticket.created_at).label('avg_resolution_time')
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date),
-        Ticket.resolved_at.isnot(None)
-    ).group_by(Ticket.priority).all()
+    resolution_times = AnalyticsRollupService.aggregate(current_user.tenant_id, start_date, end_date, 'priority')
+    resolution_times = [rt for rt in resolution_times if rt.resolution_count]
     
     return jsonify({
-        'labels': [rt.priority.capitalize() for rt in resolution_times],
+        'labels': [rt.key.capitalize() for rt in resolution_times],
         'datasets': [{
             'label': 'Average Resolution Time (hours)',
-            'data': [float(rt.avg_resolution_time.total_seconds() / 3600) if rt.avg_resolution_time else 0 
-                    for rt in resolution_times],
+            'data': [float(rt.resolution_time_sum) / rt.resolution_count / 3600 for rt in resolution_times],
             'backgroundColor': ['#4e73df', '#1cc88a', '#36b9cc']
         }]
     })
 
 @analytics.route('/api/custom/first-response-trend')
 @login_required
+@cache_analytics_response
 def first_response_trend():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
     
-    response_times = db.session.query(
-        func.date(Ticket.created_at).label('date'),
-        func.avg(TicketComment.created_at - Ticket.created_at).label('avg_first_response')
-    ).join(
-        TicketComment,
-        Ticket.id == TicketComment.ticket_id
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date),
-        TicketComment.is_internal == True,
-        ~TicketComment.is_customer
-    ).group_by(
-        func.date(Ticket.created_at)
-    ).order_by(
-        func.date(Ticket.created_at)
-    ).all()
+    response_times = AnalyticsRollupService.aggregate(current_user.tenant_id, start_date, end_date, 'day')
+    response_times = [rt for rt in response_times if rt.response_count]
     
     return jsonify({
-        'labels': [rt.date.strftime('%Y-%m-%d') for rt in response_times],
+        'labels': [rt.key.strftime('%Y-%m-%d') for rt in response_times],
         'datasets': [{
             'label': 'First Response Time (hours)',
-            'data': [float(rt.avg_first_response.total_seconds() / 3600) if rt.avg_first_response else 0 
-                    for rt in response_times],
+            'data': [float(rt.response_time_sum) / rt.response_count / 3600 for rt in response_times],
             'borderColor': '#4e73df',
             'fill': False
         }]
@@ -766,6 +720,7 @@ def first_response_trend():
 
 @analytics.route('/api/custom/open-tickets-age')
 @login_required
+@cache_analytics_response
 def open_tickets_age():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
@@ -796,6 +751,7 @@ def open_tickets_age():
 @analytics.route('/data/dashboard')
 @login_required
 @handle_analytics_errors
+@cache_analytics_response
 def get_dashboard_data():
     """Get all dashboard data in a single request"""
     try:
@@ -803,94 +759,13 @@ def get_dashboard_data():
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days)
 
-        # Get summary metrics
-        summary = get_summary_metrics(start_date, end_date)
-        
-        # Get chart data - remove categoryDistribution since category doesn't exist
-        charts = {
-            'ticketTrend': get_ticket_trend_data(start_date, end_date),
-            'agentPerformance': get_agent_performance_data(start_date, end_date),
-            'statusDistribution': get_status_distribution_data(start_date, end_date),
-            'priorityAnalysis': get_priority_analysis_data(start_date, end_date),
-            'responseTime': get_response_time_data(start_date, end_date)
-        }
-
-        return jsonify({
-            'summary': summary,
-            'charts': charts
-        })
+        # Summary and every chart series come from one pass over the date range
+        return jsonify(DashboardDataService.build(current_user.tenant_id, start_date, end_date))
 
     except Exception as e:
         current_app.logger.error(f"Error getting dashboard data: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
-def get_summary_metrics(start_date, end_date):
-    """Get summary metrics for dashboard"""
-    # Get open tickets count
-    open_tickets = db.session.query(func.count(Ticket.id)).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.status == 'open'
-    ).scalar() or 0
-
-    # Get in progress tickets count
-    in_progress = db.session.query(func.count(Ticket.id)).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.status == 'in_progress'
-    ).scalar() or 0
-
-    # Calculate average response time
-    avg_response = db.session.query(
-        func.avg(
-            func.extract('epoch', 
-                Ticket.first_response_at - Ticket.created_at
-            ) / 3600  # Convert to hours
-        )
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date),
-        Ticket.first_response_at.isnot(None)
-    ).scalar() or 0
-
-    # Calculate average resolution time
-    avg_resolution = db.session.query(
-        func.avg(
-            func.extract('epoch', 
-                Ticket.resolved_at - Ticket.created_at
-            ) / 3600  # Convert to hours
-        )
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date),
-        Ticket.resolved_at.isnot(None)
-    ).scalar() or 0
-
-    return {
-        'openTickets': open_tickets,
-        'inProgress': in_progress,
-        'avgResponseTime': round(avg_response, 1),
-        'avgResolutionTime': round(avg_resolution, 1)
-    }
-
-def get_ticket_trend_data(start_date, end_date):
-    """Get ticket trend data for line chart"""
-    daily_tickets = db.session.query(
-        func.date(Ticket.created_at).label('date'),
-        func.count(Ticket.id).label('count')
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).group_by(
-        func.date(Ticket.created_at)
-    ).order_by('date').all()
-
-    return {
-        'x': [dt.date.strftime('%Y-%m-%d') for dt in daily_tickets],
-        'y': [dt.count for dt in daily_tickets],
-        'type': 'scatter',
-        'mode': 'lines+markers',
-        'name': 'Daily Tickets'
-    }
-
 def parse_date_range(date_range):
     """Parse date range string into start and end dates"""
     if not date_range:
@@ -915,107 +790,6 @@ def parse_date_range(date_range):
         current_app.logger.error(f"Date parsing error: {str(e)}")
         raise ValueError(f"Invalid date format. Please use MM/DD/YYYY or YYYY-MM-DD. Error: {str(e)}")
 
-def get_agent_performance_data(start_date, end_date):
-    """Get agent performance data for bar chart"""
-    performance = db.session.query(
-        User.email.label('name'),
-        func.count(Ticket.id).label('tickets_handled'),
-        func.avg(
-            case(
-                (Ticket.status == 'closed', 1),
-                else_=0
-            )
-        ).label('resolution_rate')
-    ).join(
-        Ticket,
-        User.id == Ticket.assigned_to_id
-    ).filter(
-        User.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).group_by(User.id, User.email).all()
-
-    return {
-        'type': 'bar',
-        'x': [p.name for p in performance],
-        'y': [p.tickets_handled for p in performance],
-        'name': 'Tickets Handled',
-        'marker': {
-            'color': '#4e73df'
-        },
-        'textposition': 'auto',
-        'hovertemplate': '<b>%{x}</b><br>Tickets: %{y}<extra></extra>',
-        'texttemplate': '%{y}',
-        'textangle': 0
-    }
-
-def get_status_distribution_data(start_date, end_date):
-    """Get status distribution data for pie chart"""
-    status_counts = db.session.query(
-        Ticket.status,
-        func.count(Ticket.id).label('count')
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).group_by(Ticket.status).all()
-
-    return {
-        'type': 'pie',
-        'labels': [s.status.capitalize() for s in status_counts],
-        'values': [s.count for s in status_counts],
-        'marker': {
-            'colors': ['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e']
-        }
-    }
-
-def get_priority_analysis_data(start_date, end_date):
-    """Get priority analysis data for bar chart"""
-    priority_data = db.session.query(
-        Ticket.priority,
-        func.count(Ticket.id).label('count')
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).group_by(Ticket.priority).all()
-
-    return {
-        'type': 'bar',
-        'x': [p.priority.capitalize() for p in priority_data],
-        'y': [p.count for p in priority_data],
-        'marker': {
-            'color': ['#e74a3b', '#f6c23e', '#1cc88a']  # High, Medium, Low
-        }
-    }
-
-def get_response_time_data(start_date, end_date):
-    """Get response time analysis data for box plot"""
-    response_times = db.session.query(
-        Ticket.priority,
-        func.extract('epoch', 
-            Ticket.first_response_at - Ticket.created_at
-        ).label('response_time')
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date),
-        Ticket.first_response_at.isnot(None)
-    ).all()
-
-    # Organize data by priority
-    data_by_priority = {}
-    for rt in response_times:
-        if rt.priority not in data_by_priority:
-            data_by_priority[rt.priority] = []
-        if rt.response_time is not None:
-            data_by_priority[rt.priority].append(rt.response_time / 3600)  # Convert to hours
-
-    return {
-        'type': 'box',
-        'x': list(data_by_priority.keys()),
-        'y': list(data_by_priority.values()),
-        'marker': {
-            'color': '#4e73df'
-        }
-    }
-
 def calculate_resolution_rate(start_date, end_date):
     """Calculate ticket resolution rate"""
     total = db.session.query(func.count(Ticket.id)).filter(
@@ -1057,33 +831,18 @@ def export_filtered_data():
         except ValueError as e:
             return jsonify({'error': str(e)}), 400
         
-        tickets = Ticket.query.filter(
+        query = Ticket.query.filter(
             Ticket.tenant_id == current_user.tenant_id,
             Ticket.created_at.between(start_date, end_date),
             Ticket.status.in_(data['statuses']),
             Ticket.priority.in_(data['priorities'])
-        ).all()
-        
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(['ID', 'Title', 'Status', 'Priority', 'Created At', 'Resolved At'])
-        
-        for ticket in tickets:
-            writer.writerow([
-                ticket.id,
-                ticket.title,
-                ticket.status,
-                ticket.priority,
-                ticket.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                ticket.resolved_at.strftime('%Y-%m-%d %H:%M:%S') if ticket.resolved_at else ''
-            ])
+        )
         
-        output.seek(0)
-        return send_file(
-            BytesIO(output.getvalue().encode('utf-8')),
+        rows = TicketExportService.filtered_export_rows(query)
+        return Response(
+            stream_with_context(TicketExportService.stream_csv(FILTERED_EXPORT_HEADER, rows)),
             mimetype='text/csv',
-            as_attachment=True,
-            download_name='ticket_data.csv'
+            headers={'Content-Disposition': 'attachment; filename=ticket_data.csv'}
         )
     except Exception as e:
         current_app.logger.error(f"Export error: {str(e)}")
@@ -1091,36 +850,24 @@ def export_filtered_data():
 
 @analytics.route('/api/custom/sla-breach-priority')
 @login_required
+@cache_analytics_response
 def sla_breach_by_priority():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
     
-    breaches = db.session.query(
-        Ticket.priority,
-        func.count(Ticket.id).label('total'),
-        func.sum(case(
-            (Ticket.sla_response_met == False, 1),
-            else_=0
-        )).label('response_breaches'),
-        func.sum(case(
-            (Ticket.sla_resolution_met == False, 1),
-            else_=0
-        )).label('resolution_breaches')
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).group_by(Ticket.priority).all()
+    breaches = AnalyticsRollupService.aggregate(current_user.tenant_id, start_date, end_date, 'priority')
     
     return jsonify({
         'type': 'bar',
-        'x': [b.priority for b in breaches],
-        'y': [b.response_breaches for b in breaches],
+        'x': [b.key for b in breaches],
+        'y': [int(b.sla_response_breached_count) for b in breaches],
         'name': 'Response SLA Breaches',
         'marker': {'color': '#e74a3b'}
     })
 
 @analytics.route('/api/custom/first-response-sla')
 @login_required
+@cache_analytics_response
 def first_response_vs_sla():
     try:
         date_range = request.args.get('dateRange')
@@ -1176,22 +923,17 @@ def first_response_vs_sla():
 
 @analytics.route('/api/custom/source-distribution')
 @login_required
+@cache_analytics_response
 def source_distribution():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
     
-    sources = db.session.query(
-        Ticket.source,
-        func.count(Ticket.id).label('count')
-    ).filter(
-        Ticket.tenant_id == current_user.tenant_id,
-        Ticket.created_at.between(start_date, end_date)
-    ).group_by(Ticket.source).all()
+    sources = AnalyticsRollupService.aggregate(current_user.tenant_id, start_date, end_date, 'source')
     
     return jsonify({
         'type': 'pie',
-        'labels': [s.source for s in sources],
-        'values': [s.count for s in sources],
+        'labels': [s.key for s in sources],
+        'values': [int(s.ticket_count) for s in sources],
         'marker': {
             'colors': ['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e']
         }
@@ -1199,6 +941,7 @@ def source_distribution():
 
 @analytics.route('/api/custom/word-cloud')
 @login_required
+@cache_analytics_response
 def ticket_subjects_wordcloud():
     date_range = request.args.get('dateRange')
     start_date, end_date = parse_date_range(date_range)
@@ -1,6 +1,8 @@
 from flask import Blueprint, render_template, flash
 from flask_login import login_required, current_user
 from models import Ticket
+from services.ticket_query_service import TicketQueryService
+from services.ticket_stats_service import TicketStats
 
 dashboard = Blueprint('dashboard', __name__)
 
@@ -13,35 +15,17 @@ def index():
     if tenant.handle_subscription_expiry():
         flash('Your paid subscription has expired. Your account has been switched to the Free plan.')
     
-    # Get ticket counts for different statuses
-    open_tickets = Ticket.query.filter_by(
-        tenant_id=current_user.tenant_id,
-        status='open'
-    ).count()
-    
-    in_progress_tickets = Ticket.query.filter_by(
-        tenant_id=current_user.tenant_id,
-        status='in_progress'
-    ).count()
-    
-    on_hold_tickets = Ticket.query.filter_by(
-        tenant_id=current_user.tenant_id,
-        status='on_hold'
-    ).count()
-    
-    closed_tickets = Ticket.query.filter_by(
-        tenant_id=current_user.tenant_id,
-        status='closed'
-    ).count()
+    # Get ticket counts for every status in one grouped query
+    status_counts = TicketStats.status_counts(current_user.tenant_id)
     
     # Get recent tickets
-    recent_tickets = Ticket.query.filter_by(
+    recent_tickets = Ticket.query.options(*TicketQueryService.list_options()).filter_by(
         tenant_id=current_user.tenant_id
     ).order_by(Ticket.created_at.desc()).limit(5).all()
         
     return render_template('dashboard/index.html',
-                         open_tickets=open_tickets,
-                         in_progress_tickets=in_progress_tickets,
-                         on_hold_tickets=on_hold_tickets,
-                         closed_tickets=closed_tickets,
+                         open_tickets=status_counts['open'],
+                         in_progress_tickets=status_counts['in_progress'],
+                         on_hold_tickets=status_counts['on_hold'],
+                         closed_tickets=status_counts['closed'],
                          recent_tickets=recent_tickets) 
\ No newline at end of file
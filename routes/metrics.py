@@ -0,0 +1,16 @@
+import hmac
+from flask import Blueprint, Response, abort, current_app, request
+from services.metrics_service import MetricsService
+
+metrics = Blueprint('metrics', __name__)
+
+@metrics.route('/metrics')
+def index():
+    """Prometheus scrape endpoint; not served at all until METRICS_TOKEN (Bearer) is set"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if not token:
+        abort(404)
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not hmac.compare_digest(supplied, token):
+        abort(401)
+    return Response(MetricsService.render(), mimetype='text/plain; version=0.0.4')
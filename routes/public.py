@@ -1,14 +1,15 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash
 from models import db, Ticket, Tenant, User, TicketComment
 from datetime import datetime
-from services.mailersend_service import MailerSendService
+from services.email_outbox_service import EmailOutboxService
+from services.ticket_query_service import TicketQueryService
 from flask import current_app
 
 public = Blueprint('public', __name__)
 
 @public.route('/<portal_key>/submit', methods=['GET', 'POST'])
 def submit_ticket(portal_key):
-    tenant = Tenant.query.filter_by(portal_key=portal_key).first_or_404()
+    tenant = Tenant.query.filter_by(portal_key=portal_key, deleted_at=None).first_or_404()
     
     if request.method == 'POST':
         ticket = Ticket(
@@ -29,8 +30,7 @@ def submit_ticket(portal_key):
         
         # Send confirmation email
         try:
-            mailer = MailerSendService()
-            mailer.send_ticket_confirmation(ticket)
+            EmailOutboxService.queue_ticket_confirmation(ticket)
         except Exception as e:
             current_app.logger.error(f"Error sending confirmation: {str(e)}")
         
@@ -44,12 +44,12 @@ def submit_ticket(portal_key):
 
 @public.route('/<portal_key>/track', methods=['GET', 'POST'])
 def track_ticket(portal_key):
-    tenant = Tenant.query.filter_by(portal_key=portal_key).first_or_404()
+    tenant = Tenant.query.filter_by(portal_key=portal_key, deleted_at=None).first_or_404()
     
     if request.method == 'POST':
         email = request.form.get('email')
         if email:
-            tickets = Ticket.query.filter_by(
+            tickets = Ticket.query.options(*TicketQueryService.list_options()).filter_by(
                 tenant_id=tenant.id,
                 contact_email=email
             ).order_by(Ticket.created_at.desc()).all()
@@ -63,7 +63,7 @@ def track_ticket(portal_key):
 
 @public.route('/<portal_key>/status/<int:ticket_id>', methods=['GET', 'POST'])
 def view_ticket_status(portal_key, ticket_id):
-    tenant = Tenant.query.filter_by(portal_key=portal_key).first_or_404()
+    tenant = Tenant.query.filter_by(portal_key=portal_key, deleted_at=None).first_or_404()
     ticket = Ticket.query.filter_by(id=ticket_id, tenant_id=tenant.id).first_or_404()
     email = request.args.get('email')
     
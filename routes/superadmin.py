@@ -4,13 +4,13 @@ import os
 # Add the parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from flask import Blueprint, render_template, request, redirect, url_for, flash, Flask, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, Flask, current_app, jsonify
 from flask_login import login_required, current_user
 from models import db, User, Tenant
 from functools import wraps
-from sqlalchemy.orm import joinedload
-from sqlalchemy import text
 from werkzeug.security import generate_password_hash
+from services.tenant_directory_service import TenantDirectoryService
+from services.tenant_deletion_service import TenantDeletionService
 
 superadmin = Blueprint('superadmin', __name__)
 
@@ -28,11 +28,14 @@ def superadmin_required(f):
 @login_required
 @superadmin_required
 def index():
-    # Only eager load users since we're using count() for tickets
-    tenants = Tenant.query.options(
-        joinedload(Tenant.users)
-    ).all()
-    return render_template('superadmin/index.html', tenants=tenants)
+    per_page = request.args.get('per_page', current_app.config['SUPERADMIN_TENANTS_PER_PAGE'], type=int)
+    directory = TenantDirectoryService.page(
+        sort=request.args.get('sort', 'created'),
+        direction=request.args.get('direction', 'desc'),
+        page=request.args.get('page', 1, type=int),
+        per_page=max(1, min(per_page, 500))
+    )
+    return render_template('superadmin/index.html', directory=directory)
 
 @superadmin.route('/tenants/<int:tenant_id>')
 @superadmin_required
@@ -57,58 +60,12 @@ def update_tenant(tenant_id):
 @login_required
 @superadmin_required
 def delete_tenant(tenant_id):
+    tenant = Tenant.query.get_or_404(tenant_id)
     try:
-        tenant = Tenant.query.get_or_404(tenant_id)
         current_app.logger.info(f"Deleting tenant {tenant.id} ({tenant.name})")
-
-        # Delete in correct order to handle foreign key constraints
-        current_app.logger.info("Deleting subscription payments...")
-        db.session.execute(text("DELETE FROM subscription_payments WHERE tenant_id = :tenant_id"), 
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting analytics data...")
-        db.session.execute(text("DELETE FROM analytics_dashboard WHERE user_id IN (SELECT id FROM \"user\" WHERE tenant_id = :tenant_id)"),
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting saved views...")
-        db.session.execute(text("DELETE FROM saved_view WHERE tenant_id = :tenant_id"),
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting report configs...")
-        db.session.execute(text("DELETE FROM report_config WHERE tenant_id = :tenant_id"),
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting dashboards...")
-        db.session.execute(text("DELETE FROM dashboards WHERE tenant_id = :tenant_id"),
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting SLA configs...")
-        db.session.execute(text("DELETE FROM sla_config WHERE tenant_id = :tenant_id"),
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting tenant configurations...")
-        db.session.execute(text("DELETE FROM email_config WHERE tenant_id = :tenant_id"), 
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting tickets and related records...")
-        db.session.execute(text("DELETE FROM ticket_activity WHERE ticket_id IN (SELECT id FROM ticket WHERE tenant_id = :tenant_id)"),
-                         {"tenant_id": tenant_id})
-        db.session.execute(text("DELETE FROM ticket_comment WHERE ticket_id IN (SELECT id FROM ticket WHERE tenant_id = :tenant_id)"),
-                         {"tenant_id": tenant_id})
-        db.session.execute(text("DELETE FROM ticket WHERE tenant_id = :tenant_id"), 
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting users...")
-        db.session.execute(text("DELETE FROM \"user\" WHERE tenant_id = :tenant_id"), 
-                         {"tenant_id": tenant_id})
-
-        current_app.logger.info("Deleting tenant...")
-        db.session.execute(text("DELETE FROM tenant WHERE id = :tenant_id"), 
-                         {"tenant_id": tenant_id})
-
-        db.session.commit()
-        flash('Tenant deleted successfully', 'success')
-
+        # Disabled immediately; rows are deleted in batches by tasks.delete_tenant_data
+        TenantDeletionService.request(tenant)
+        flash('Tenant disabled. Its data is being deleted in the background.', 'success')
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Error deleting tenant: {str(e)}")
@@ -116,6 +73,14 @@ def delete_tenant(tenant_id):
 
     return redirect(url_for('superadmin.index'))
 
+@superadmin.route('/tenants/<int:tenant_id>/deletion')
+@superadmin_required
+def deletion_progress(tenant_id):
+    progress = TenantDeletionService.progress(tenant_id)
+    if not progress:
+        return jsonify({'error': 'No deletion requested for this tenant'}), 404
+    return jsonify(progress)
+
 @superadmin.route('/tenant/<int:tenant_id>/user/<int:user_id>/update', methods=['POST'])
 @superadmin_required
 def update_user(tenant_id, user_id):
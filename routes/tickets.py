@@ -2,8 +2,11 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from models import db, Ticket, TicketComment, User, Tenant, EmailConfig, SLAConfig, TicketActivity
 from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
 from services.email_service import EmailService
-from services.mailersend_service import MailerSendService
+from services.email_outbox_service import EmailOutboxService
+from services.ticket_query_service import TicketQueryService
 
 tickets = Blueprint('tickets', __name__)
 
@@ -22,24 +25,71 @@ def index():
     status_filter = request.args.get('status', '')
     priority_filter = request.args.get('priority', '')
     
-    query = Ticket.query.filter_by(tenant_id=current_user.tenant_id)
-    
-    if status_filter:
-        query = query.filter_by(status=status_filter)
-    if priority_filter:
-        query = query.filter_by(priority=priority_filter)
-        
-    tickets = query.order_by(Ticket.created_at.desc()).all()
-    agents = User.query.filter_by(tenant_id=current_user.tenant_id).all()
+    try:
+        page = get_ticket_page(status_filter, priority_filter)
+    except ValueError:
+        flash('Invalid page cursor', 'error')
+        return redirect(url_for('tickets.index', status=status_filter, priority=priority_filter))
     
     return render_template('tickets/index.html', 
-                         tickets=tickets,
-                         agents=agents,
+                         tickets=page['items'],
+                         next_cursor=page['next_cursor'],
+                         prev_cursor=page['prev_cursor'],
+                         per_page=page['per_page'],
                          status_filter=status_filter,
                          priority_filter=priority_filter,
                          now=datetime.utcnow(),
                          status_colors=status_colors)
 
+@tickets.route('/api')
+@login_required
+def index_json():
+    """JSON variant of the ticket list, paginated the same way as the HTML view"""
+    try:
+        page = get_ticket_page(request.args.get('status', ''), request.args.get('priority', ''))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'tickets': [{
+            'id': ticket.id,
+            'ticket_number': ticket.ticket_number,
+            'title': ticket.title,
+            'status': ticket.status,
+            'priority': ticket.priority,
+            'source': ticket.source,
+            'assigned_to_id': ticket.assigned_to_id,
+            'contact_email': ticket.contact_email,
+            'created_at': ticket.created_at.isoformat() if ticket.created_at else None,
+            'sla_response_due_at': ticket.sla_response_due_at.isoformat() if ticket.sla_response_due_at else None,
+            'sla_resolution_due_at': ticket.sla_resolution_due_at.isoformat() if ticket.sla_resolution_due_at else None
+        } for ticket in page['items']],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
+        'per_page': page['per_page']
+    })
+
+def get_ticket_page(status_filter, priority_filter):
+    """Build the filtered ticket query for the current tenant and fetch one keyset page"""
+    query = Ticket.query.options(*TicketQueryService.list_options()).filter_by(
+        tenant_id=current_user.tenant_id
+    )
+    
+    if status_filter:
+        query = query.filter_by(status=status_filter)
+    if priority_filter:
+        query = query.filter_by(priority=priority_filter)
+    
+    per_page = request.args.get('per_page', current_app.config['TICKETS_PER_PAGE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['TICKETS_MAX_PER_PAGE']))
+    
+    return TicketQueryService.paginate(
+        query,
+        after=request.args.get('after'),
+        before=request.args.get('before'),
+        per_page=per_page
+    )
+
 @tickets.route('/create', methods=['GET', 'POST'])
 @login_required
 def create():
@@ -61,20 +111,22 @@ def create():
             ticket.assigned_to_id = request.form['assigned_to_id']
             
         db.session.add(ticket)
-        db.session.commit()  # Commit first to get the ticket ID
+        db.session.flush()  # Assigns the ticket ID and created_at
         
         # Calculate SLA deadlines
         ticket.calculate_sla_deadlines()
-        db.session.commit()  # Commit again to save SLA deadlines
         
-        log_ticket_activity(ticket, 'created', f'Ticket created by {current_user.full_name}')
+        activities = [('created', f'Ticket created by {current_user.full_name}', None, None)]
         if ticket.sla_response_due_at:  # Check for SLA deadline instead
-            log_ticket_activity(ticket, 'sla_started', f'SLA timer started')
+            activities.append(('sla_started', 'SLA timer started', None, None))
+        log_ticket_activities(ticket, activities)
+        
+        # Ticket, deadlines and activities in one transaction
+        db.session.commit()
         
         # Send confirmation email
         try:
-            mailer = MailerSendService()
-            mailer.send_ticket_confirmation(ticket)
+            EmailOutboxService.queue_ticket_confirmation(ticket)
         except Exception as e:
             current_app.logger.error(f"Error sending confirmation: {str(e)}")
         
@@ -96,13 +148,15 @@ def view(ticket_id):
         'closed': 'secondary'
     }
 
-    ticket = Ticket.query.filter_by(
+    ticket = Ticket.query.options(*TicketQueryService.list_options()).filter_by(
         id=ticket_id,
         tenant_id=current_user.tenant_id
     ).first_or_404()
     
     agents = User.query.filter_by(tenant_id=current_user.tenant_id).all()
-    comments = ticket.comments.order_by(TicketComment.created_at.desc()).all()
+    comments = ticket.comments.options(joinedload(TicketComment.user)).order_by(
+        TicketComment.created_at.desc()
+    ).all()
     
     return render_template('tickets/view.html', 
                          ticket=ticket, 
@@ -141,17 +195,19 @@ def update_ticket(ticket_id):
     # Check SLA status after updates
     ticket.check_sla_status()
     
+    activities = []
+    
     # Log status change
     if ticket.status != old_status:
-        log_ticket_activity(ticket, 'status_changed', 
+        activities.append(('status_changed',
             f'Status changed from {old_status} to {ticket.status}',
-            old_status, ticket.status)
+            old_status, ticket.status))
     
     # Log priority change
     if ticket.priority != old_priority:
-        log_ticket_activity(ticket, 'priority_changed',
+        activities.append(('priority_changed',
             f'Priority changed from {old_priority} to {ticket.priority}',
-            old_priority, ticket.priority)
+            old_priority, ticket.priority))
     
     # Log assignment change
     if ticket.assigned_to_id != old_assignee_id:
@@ -161,13 +217,15 @@ def update_ticket(ticket_id):
             f"Ticket reassigned from {old_assignee_name} to {new_assignee_name} "
             f"by {current_user.full_name}"
         )
-        log_ticket_activity(ticket, 'assigned',
+        activities.append(('assigned',
             activity_description,
-            old_assignee_name, new_assignee_name)
+            old_assignee_name, new_assignee_name))
     
     # Debug logging
     current_app.logger.info(f"Updating ticket assignment: old={old_assignee_id}, new={ticket.assigned_to_id}")
     
+    # The update and its activity entries are written in one transaction
+    log_ticket_activities(ticket, activities)
     db.session.commit()
     flash('Ticket updated successfully', 'success')
     return redirect(url_for('tickets.view', ticket_id=ticket_id))
@@ -190,6 +248,8 @@ def add_comment(ticket_id):
     )
     
     db.session.add(comment)
+    if is_internal:
+        ticket.record_first_response(datetime.utcnow())
     
     # Check SLA status after adding comment
     ticket.check_sla_status()
@@ -199,8 +259,7 @@ def add_comment(ticket_id):
         
         # Only send email if requested and comment is not internal
         if send_email and not is_internal and ticket.contact_email:
-            mailer = MailerSendService()
-            mailer.send_ticket_notification(ticket, comment)
+            EmailOutboxService.queue_ticket_notification(ticket, comment)
             
         flash('Comment added successfully')
     except Exception as e:
@@ -211,7 +270,7 @@ def add_comment(ticket_id):
 
 @tickets.route('/track/<portal_key>/<ticket_id>', methods=['GET', 'POST'])
 def track(portal_key, ticket_id):
-    tenant = Tenant.query.filter_by(portal_key=portal_key).first_or_404()
+    tenant = Tenant.query.filter_by(portal_key=portal_key, deleted_at=None).first_or_404()
     ticket = Ticket.query.filter_by(id=ticket_id, tenant_id=tenant.id).first_or_404()
     
     if request.method == 'POST':
@@ -236,17 +295,24 @@ def track(portal_key, ticket_id):
     
     return render_template('tickets/track.html', ticket=ticket, comments=comments)
 
-def log_ticket_activity(ticket, activity_type, description, old_value=None, new_value=None):
-    # Get current user
+def _activity_row(ticket, user, activity_type, description, old_value=None, new_value=None):
+    return {
+        'ticket_id': ticket.id,
+        'user_id': user.id if user else None,
+        'activity_type': activity_type,
+        'description': description if user else f"System {description}",
+        'old_value': old_value,
+        'new_value': new_value
+    }
+
+def log_ticket_activities(ticket, activities):
+    """
+    Insert several (activity_type, description, old_value, new_value) entries with one
+    executemany in the current transaction. The ticket must already have an id (flushed).
+    """
+    if not activities:
+        return
     user = current_user if not current_user.is_anonymous else None
-    
-    activity = TicketActivity(
-        ticket_id=ticket.id,
-        user_id=user.id if user else None,
-        activity_type=activity_type,
-        description=description if user else f"System {description}",
-        old_value=old_value,
-        new_value=new_value
-    )
-    db.session.add(activity)
-    db.session.commit() 
\ No newline at end of file
+    db.session.execute(insert(TicketActivity), [
+        _activity_row(ticket, user, *activity) for activity in activities
+    ])
@@ -9,10 +9,12 @@ import re
 from email import message_from_string, policy
 from email.parser import Parser
 from email.policy import default
-from html2text import HTML2Text  # pip install html2text
 from bs4 import BeautifulSoup  # pip install beautifulsoup4
 from flask_wtf.csrf import CSRFProtect
 from services.mailersend_service import MailerSendService
+from services.inbound_email_service import InboundEmailService
+from services.email_content_service import EmailContentService
+from services.tenant_resolver_service import TenantResolver
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,118 +22,8 @@ logger = logging.getLogger(__name__)
 webhook = Blueprint('webhook', __name__)
 
 def extract_email_content(text_content, html_content):
-    """Extract clean email content from forwarded messages with improved parsing"""
-    try:
-        # Initialize HTML2Text with better config
-        h = HTML2Text()
-        h.ignore_links = False 
-        h.ignore_images = True
-        h.body_width = 0  # Don't wrap lines
-        h.unicode_snob = True
-        h.protect_links = True
-        h.single_line_break = True  # Change to True to reduce extra spacing
-        h.ul_item_mark = '-'
-        h.br_style = 'css'  # Use CSS style line breaks
-        
-        # Convert HTML to text if available
-        if html_content:
-            text_from_html = h.handle(html_content)
-            main_content = text_from_html if len(text_from_html) > len(text_content) else text_content
-        else:
-            main_content = text_content
-
-        # First try to find the forwarded content block
-        forwarding_headers = [
-            'From:',
-            'Sent:',
-            'To:',
-            'Subject:',
-            '---------- Forwarded message ---------',
-            '----- Forwarded Message -----',
-            'Begin forwarded message:'
-        ]
-
-        lines = main_content.split('\n')
-        content_lines = []
-        in_header = False
-        header_count = 0
-        last_line_empty = False
-        paragraph_break = False
-        
-        for line in lines:
-            line = line.rstrip()  # Keep leading whitespace but remove trailing
-            
-            # Check if this is a header line
-            if any(header in line for header in forwarding_headers):
-                in_header = True
-                header_count += 1
-                continue
-                
-            # After we've seen at least 3 headers, start capturing content
-            if header_count >= 3 and not any(marker in line.lower() for marker in [
-                'from:', 'to:', 'sent:', 'date:', 'subject:',
-                'cc:', 'bcc:', 'reply-to:', '>', '|',
-                'get outlook', 'thanks & regards',
-                'original message', '________________________________',
-                'forwarded message'
-            ]):
-                # Handle paragraph breaks
-                if not line:
-                    if not last_line_empty:
-                        content_lines.append('<br>')  # Add HTML line break
-                        last_line_empty = True
-                        paragraph_break = True
-                else:
-                    if paragraph_break:
-                        content_lines.append('<p>')  # Start new paragraph
-                        paragraph_break = False
-                    content_lines.append(line)
-                    last_line_empty = False
-                    
-        if content_lines:
-            # Clean up trailing breaks and join with proper spacing
-            while content_lines and content_lines[-1] in ['<br>', '<p>']:
-                content_lines.pop()
-            
-            # Close any open paragraphs
-            if not paragraph_break:
-                content_lines.append('</p>')
-                
-            return '\n'.join(content_lines)
-
-        # If the above method didn't work, try HTML parsing with better structure preservation
-        if html_content:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Remove script, style tags etc
-            for element in soup(['script', 'style', 'head', 'title', 'meta']):
-                element.decompose()
-
-            # Process paragraphs and line breaks
-            content_blocks = []
-            for element in soup.find_all(['p', 'div', 'br', 'ul', 'ol', 'li']):
-                if element.name == 'br':
-                    content_blocks.append('<br>')
-                elif element.name in ['p', 'div']:
-                    text = element.get_text().strip()
-                    if text:
-                        content_blocks.append(f'<p>{text}</p>')
-                elif element.name in ['ul', 'ol']:
-                    content_blocks.append('<ul>')
-                    for li in element.find_all('li'):
-                        content_blocks.append(f'<li>{li.get_text().strip()}</li>')
-                    content_blocks.append('</ul>')
-
-            # Clean up and join blocks
-            while content_blocks and not content_blocks[-1]:
-                content_blocks.pop()
-            return '\n'.join(content_blocks)
-
-        return main_content
-
-    except Exception as e:
-        current_app.logger.error(f"Error extracting email content: {e}")
-        return text_content
+    """Extract clean email content from forwarded messages"""
+    return EmailContentService.extract(text_content, html_content)
 
 def format_email_content(text_content):
     """Format the content with improved structure preservation and signature handling"""
@@ -237,9 +129,10 @@ def get_original_sender(email_content, support_email):
                         email = match.group(0).strip()
                         name = ''
                     
-                    # Skip system emails and support email
+                    # Skip system emails and tenant support addresses
                     if (not email.endswith(('.mlsender.net', '.mailersend.net', 'cloudmailin.net')) and 
-                        email.lower() != support_email.lower()):
+                        email.lower() != support_email.lower() and
+                        not TenantResolver.is_tenant_address(email)):
                         candidates.append((name, email))
             
             # Try to find the most likely original sender
@@ -254,6 +147,7 @@ def get_original_sender(email_content, support_email):
             for email in email_matches:
                 if (not email.endswith(('.mlsender.net', '.mailersend.net', 'cloudmailin.net')) and 
                     email.lower() != support_email.lower() and
+                    not TenantResolver.is_tenant_address(email) and
                     not any(skip in email.lower() for skip in ['noreply', 'no-reply', 'notification', 'alert'])):
                     name = email.split('@')[0]
                     current_app.logger.info(f"Found email in content: {name} <{email}>")
@@ -376,6 +270,10 @@ def extract_original_sender(plain_text, html_content, envelope_from, envelope_to
             if match:
                 original_sender = match.group(1)
 
+        # A forwarded copy of our own mail names a tenant address, not the customer
+        if original_sender and TenantResolver.is_tenant_address(original_sender):
+            original_sender = None
+
         # If no match found, try HTML content
         if not original_sender and html_content:
             soup = BeautifulSoup(html_content, 'html.parser')
@@ -384,7 +282,7 @@ def extract_original_sender(plain_text, html_content, envelope_from, envelope_to
             gmail_div = soup.find('div', class_='gmail_quote')
             if gmail_div:
                 email_match = re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', gmail_div.get_text())
-                if email_match:
+                if email_match and not TenantResolver.is_tenant_address(email_match.group(0)):
                     original_sender = email_match.group(0)
             
             # Try MS365 format
@@ -392,7 +290,7 @@ def extract_original_sender(plain_text, html_content, envelope_from, envelope_to
                 divRplyFwdMsg = soup.find('div', id='divRplyFwdMsg')
                 if divRplyFwdMsg:
                     email_match = re.search(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}', divRplyFwdMsg.get_text())
-                    if email_match:
+                    if email_match and not TenantResolver.is_tenant_address(email_match.group(0)):
                         original_sender = email_match.group(0)
 
         return {
@@ -513,6 +411,22 @@ def stripe_webhook():
         current_app.logger.error(f"Webhook error: {str(e)}")
         return jsonify({'error': str(e)}), 400 
 
+def inbound_email_response(inbound, created=True):
+    """Webhook response for a stored inbound email, depending on how far it got"""
+    if not created:
+        # Replay of a message we already have: answer with the original outcome
+        current_app.logger.info(f"Duplicate inbound email, original is {inbound.id}")
+        return jsonify({
+            'message': 'Duplicate email',
+            'inbound_email_id': inbound.id,
+            'ticket_id': inbound.ticket_id
+        }), 200
+    if inbound.status == 'processed':
+        return jsonify({'message': 'Ticket created successfully', 'ticket_id': inbound.ticket_id}), 201
+    if inbound.status == 'rejected':
+        return jsonify({'error': inbound.last_error}), 400
+    return jsonify({'message': 'Email queued', 'inbound_email_id': inbound.id}), 202
+
 @webhook.route('/api/email/incoming', methods=['POST'])
 def email_webhook():
     try:
@@ -528,7 +442,8 @@ def email_webhook():
                 },
                 'headers': {
                     'subject': request.form.get('headers[subject]', 'No Subject'),
-                    'from': request.form.get('headers[from]')
+                    'from': request.form.get('headers[from]'),
+                    'message_id': request.form.get('headers[message_id]')
                 },
                 'body': {
                     'html': request.form.get('html'),
@@ -539,71 +454,9 @@ def email_webhook():
         
         current_app.logger.info("Received email webhook data")
         
-        # Get envelope data (SMTP level information)
-        envelope = data.get('envelope', {})
-        envelope_from = envelope.get('from')
-        envelope_to = envelope.get('to')
-        
-        # Get header information
-        headers = data.get('headers', {})
-        subject = headers.get('subject', 'No Subject')
-        header_from = headers.get('from')
-        
-        # Get message body
-        body = data.get('body', {})
-        html_content = body.get('html')
-        text_content = body.get('plain')
-        content = html_content if html_content else text_content
-        
-        current_app.logger.info(f"Processing email from {envelope_from} to {envelope_to}")
-        current_app.logger.info(f"Subject: {subject}")
-        
-        # Extract sender information
-        sender_info = extract_original_sender(
-            text_content,
-            html_content,
-            envelope_from,
-            envelope_to
-        )
-
-        # Find tenant based on forwarding email
-        tenant = Tenant.query.filter(
-            db.or_(
-                Tenant.support_email == sender_info['tenant_email'],
-                Tenant.support_alias == sender_info['tenant_email'],
-                Tenant.cloudmailin_address == sender_info['tenant_email']
-            )
-        ).first()
-
-        if not tenant:
-            current_app.logger.error(f"No tenant found for email: {sender_info['tenant_email']}")
-            return jsonify({'error': 'Invalid tenant email'}), 400
-
-        # Extract clean content
-        content = extract_email_content(text_content, html_content)
-
-        # Create ticket
-        ticket = Ticket(
-            title=subject,
-            description=content,
-            status='open',
-            tenant_id=tenant.id,
-            contact_email=sender_info['original_sender'],
-            source='email',
-            ticket_number=Ticket.generate_ticket_number(tenant.id)
-        )
-
-        db.session.add(ticket)
-        db.session.commit()
-
-        # Send confirmation email
-        try:
-            mailer = MailerSendService()
-            mailer.send_ticket_confirmation(ticket)
-        except Exception as e:
-            current_app.logger.error(f"Error sending confirmation: {str(e)}")
-
-        return jsonify({'message': 'Ticket created successfully', 'ticket_id': ticket.id}), 201
+        # Store the payload and acknowledge; a worker creates the ticket
+        inbound, created = InboundEmailService.enqueue('cloudmailin', data)
+        return inbound_email_response(inbound, created)
 
     except Exception as e:
         current_app.logger.error(f"Error processing email: {str(e)}")
@@ -652,86 +505,9 @@ def handle_email():
     try:
         data = request.get_json()
         
-        # Extract email content and headers
-        html_body = data.get('html', '')
-        text_body = data.get('plain', '')
-        headers = data.get('headers', {})
-        
-        # Get sender information - try multiple possible header fields
-        from_email = None
-        possible_headers = ['from', 'From', 'Reply-To', 'reply-to', 'Return-Path', 'return-path']
-        
-        for header in possible_headers:
-            if header in headers:
-                from_header = headers[header]
-                # Extract email from various formats:
-                # "John Doe <john@example.com>" or just "john@example.com"
-                email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', from_header)
-                if email_match:
-                    from_email = email_match.group(0)
-                    break
-        
-        if not from_email:
-            # Try to find email in the forwarded message
-            email_pattern = r'From:.*?<([\w\.-]+@[\w\.-]+\.\w+)>'
-            forwarded_match = re.search(email_pattern, html_body, re.IGNORECASE | re.DOTALL)
-            if forwarded_match:
-                from_email = forwarded_match.group(1)
-        
-        if not from_email:
-            # Log the full email content for debugging
-            current_app.logger.error("Could not find original sender")
-            current_app.logger.error("Email headers:")
-            current_app.logger.error(headers)
-            current_app.logger.error("Email content:")
-            current_app.logger.error(html_body)
-            return jsonify({'error': 'Could not determine sender'}), 400
-        
-        # Extract subject
-        subject = headers.get('subject', '').strip()
-        if not subject:
-            # Try to extract subject from forwarded message
-            subject_match = re.search(r'Subject: (.*?)\n', html_body, re.IGNORECASE)
-            if subject_match:
-                subject = subject_match.group(1).strip()
-            else:
-                subject = "Email Ticket"
-        
-        # Get the tenant based on the support email
-        to_email = headers.get('to', '').lower()
-        tenant = Tenant.query.filter(
-            db.or_(
-                Tenant.support_email == to_email,
-                Tenant.support_alias == to_email,
-                Tenant.cloudmailin_address == to_email
-            )
-        ).first()
-        
-        if not tenant:
-            current_app.logger.error(f"No tenant found for support email: {to_email}")
-            return jsonify({'error': 'Invalid support email'}), 400
-            
-        # Create the ticket
-        ticket = Ticket(
-            title=subject,
-            description=html_body or text_body,
-            tenant_id=tenant.id,
-            contact_email=from_email,
-            source='email',
-            ticket_number=Ticket.generate_ticket_number(tenant.id)
-        )
-        
-        db.session.add(ticket)
-        db.session.commit()
-        
-        # Send confirmation email
-        try:
-            mailer = MailerSendService()
-            mailer.send_ticket_confirmation(ticket)
-        except Exception as e:
-            current_app.logger.error(f"Error sending confirmation: {str(e)}")
-        
-        return jsonify({'message': 'Ticket created successfully', 'ticket_id': ticket.id}), 201
+        # Store the payload and acknowledge; a worker creates the ticket
+        inbound, created = InboundEmailService.enqueue('forward', data)
+        return inbound_email_response(inbound, created)
         
     except Exception as e:
         current_app.logger.error(f"Error processing email: {str(e)}")
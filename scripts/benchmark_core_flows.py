@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import uuid
+from datetime import datetime, timedelta
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FLOWS = ['create_ticket', 'list_tickets', 'add_comment', 'email_webhook', 'analytics_dashboard', 'csv_export']
+
+def load_app(database_url):
+    """The deployed app from app.py, pointed at the benchmark database"""
+    os.environ['DATABASE_URL'] = database_url
+    from sqlalchemy.dialects.postgresql import JSONB
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(JSONB, 'sqlite')
+    def _jsonb_on_sqlite(element, compiler, **kw):
+        # ReportConfig/Dashboard use JSONB; SQLite stores it as JSON
+        return 'JSON'
+
+    from tasks import get_flask_app
+    app = get_flask_app()
+    app.config.update(
+        WTF_CSRF_ENABLED=False,
+        SESSION_COOKIE_SECURE=False,
+        # Inbound email is processed inside the webhook request, so the flow includes ticket creation.
+        # Outbound email stays queued: without a reachable broker the drain is not published
+        # (logged, fails fast) and nothing is sent to MailerSend
+        INBOUND_EMAIL_ASYNC=False
+    )
+    return app
+
+def seed(db, tenants, tickets, comments, activities, days):
+    """Bulk-insert `tenants` tenants with users, SLA configs and `tickets` tickets each"""
+    from sqlalchemy import insert
+    from models import Tenant, User, Ticket, TicketComment, TicketActivity, TicketSequence, SLAConfig, DEFAULT_SLA_MINUTES
+
+    now = datetime.utcnow()
+    rng = random.Random(42)
+    seeded = []
+    for _ in range(tenants):
+        key = uuid.uuid4().hex[:8]
+        tenant = Tenant(name=f'Bench {key}', support_email=f'support-{key}@bench.example.com', subscription_plan='enterprise')
+        db.session.add(tenant)
+        db.session.flush()
+
+        users = []
+        for role in ('admin', 'agent', 'agent'):
+            user = User(email=f'{role}-{uuid.uuid4().hex[:8]}@bench.example.com', first_name='Bench',
+                        last_name=role.title(), role=role, tenant_id=tenant.id)
+            user.set_password(uuid.uuid4().hex)
+            db.session.add(user)
+            users.append(user)
+        db.session.flush()
+        user_ids = [user.id for user in users]
+
+        db.session.add_all([
+            SLAConfig(tenant_id=tenant.id, priority=priority, response_time=response, resolution_time=resolution)
+            for priority, (response, resolution) in DEFAULT_SLA_MINUTES.items()
+        ])
+        db.session.add(TicketSequence(tenant_id=tenant.id, last_number=tickets))
+
+        prefix = f"{tenant.name[:2].upper()}{tenant.id}"
+        rows = []
+        for n in range(tickets):
+            created = now - timedelta(minutes=rng.randint(0, days * 1440))
+            priority = rng.choice(['low', 'medium', 'high'])
+            response, resolution = DEFAULT_SLA_MINUTES[priority]
+            status = rng.choice(['open', 'in_progress', 'on_hold', 'resolved', 'closed'])
+            responded = created + timedelta(minutes=rng.randint(5, response * 2)) if status != 'open' else None
+            resolved = created + timedelta(minutes=rng.randint(60, resolution * 2)) if status in ('resolved', 'closed') else None
+            rows.append({
+                'ticket_number': f'{prefix}-{n + 1:03d}',
+                'title': f'Bench ticket {n + 1}: {rng.choice(["printer", "vpn", "login", "email", "laptop"])} issue',
+                'description': 'Synthetic ticket created by the benchmark suite',
+                'status': status,
+                'priority': priority,
+                'source': rng.choice(['portal', 'email']),
+                'tenant_id': tenant.id,
+                'created_by_id': user_ids[0],
+                'assigned_to_id': rng.choice([None] + user_ids),
+                'contact_email': f'customer{n % 50}@example.com',
+                'created_at': created,
+                'updated_at': resolved or responded or created,
+                'first_response_at': responded,
+                'resolved_at': resolved,
+                'sla_response_due_at': created + timedelta(minutes=response),
+                'sla_resolution_due_at': created + timedelta(minutes=resolution),
+                'sla_response_met': responded <= created + timedelta(minutes=response) if responded else None,
+                'sla_resolution_met': resolved <= created + timedelta(minutes=resolution) if resolved else None
+            })
+        db.session.execute(insert(Ticket), rows)
+
+        ticket_ids = [ticket_id for (ticket_id,) in db.session.query(Ticket.id).filter(Ticket.tenant_id == tenant.id)]
+        comment_rows, activity_rows = [], []
+        for ticket_id in ticket_ids:
+            for c in range(comments):
+                comment_rows.append({'ticket_id': ticket_id, 'user_id': rng.choice(user_ids),
+                                     'content': f'Synthetic comment {c + 1}', 'is_internal': c % 2 == 0,
+                                     'created_at': now - timedelta(minutes=rng.randint(0, days * 1440))})
+            for a in range(activities):
+                activity_rows.append({'ticket_id': ticket_id, 'user_id': rng.choice(user_ids),
+                                      'activity_type': 'status_changed', 'description': 'Status changed from open to in_progress',
+                                      'old_value': 'open', 'new_value': 'in_progress',
+                                      'created_at': now - timedelta(minutes=rng.randint(0, days * 1440))})
+        if comment_rows:
+            db.session.execute(insert(TicketComment), comment_rows)
+        if activity_rows:
+            db.session.execute(insert(TicketActivity), activity_rows)
+        db.session.commit()
+        seeded.append({'id': tenant.id, 'support_email': tenant.support_email,
+                       'admin_id': user_ids[0], 'ticket_ids': ticket_ids})
+    return seeded
+
+class Flows:
+    """One request per call for a tenant; returns the response"""
+    def __init__(self, clients):
+        self.clients = clients
+        self.rng = random.Random(7)
+
+    def create_ticket(self, tenant):
+        return self.clients[tenant['id']].post('/tickets/create', data={
+            'title': 'Benchmark ticket', 'description': 'Created by the benchmark', 'priority': self.rng.choice(['low', 'medium', 'high'])
+        })
+
+    def list_tickets(self, tenant):
+        return self.clients[tenant['id']].get('/tickets/')
+
+    def add_comment(self, tenant):
+        return self.clients[tenant['id']].post(f"/tickets/{self.rng.choice(tenant['ticket_ids'])}/comment", data={
+            'content': 'Benchmark reply', 'is_internal': 'y'
+        })
+
+    def email_webhook(self, tenant):
+        return self.clients[tenant['id']].post('/api/email/incoming', json={
+            'envelope': {'from': tenant['support_email'], 'to': 'inbound@cloudmailin.net'},
+            'headers': {'subject': 'Benchmark email', 'from': 'Customer <customer@example.com>',
+                        'message_id': f'<{uuid.uuid4().hex}@bench.example.com>'},
+            'body': {'plain': 'Hello,\n\nMy laptop does not start.\n\nThanks'}
+        })
+
+    def analytics_dashboard(self, tenant):
+        return self.clients[tenant['id']].get('/analytics/data/dashboard?days=30')
+
+    def csv_export(self, tenant):
+        today = datetime.utcnow().date()
+        return self.clients[tenant['id']].get('/analytics/raw-export', query_string={
+            'start_date': (today - timedelta(days=90)).isoformat(),
+            'end_date': today.isoformat(),
+            'status': ['open', 'in_progress', 'on_hold', 'resolved', 'closed'],
+            'priority': ['low', 'medium', 'high']
+        })
+
+def percentile(values, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(round(p / 100.0 * len(values) + 0.5)) - 1))]
+
+def summarize(samples):
+    timings = sorted(ms for ms, _, _ in samples)
+    queries = [count for _, count, _ in samples]
+    return {
+        'runs': len(samples),
+        'errors': sum(1 for _, _, status in samples if status >= 400),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'mean_ms': round(sum(timings) / len(timings), 2),
+        'max_ms': round(timings[-1], 2),
+        'queries_mean': round(sum(queries) / len(queries), 1),
+        'queries_max': max(queries)
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\n=== Compared with {baseline_path} ({baseline['meta'].get('commit')}) ===\n")
+    print(f"{'flow':<22} {'p95 ms':>10} {'before':>10} {'change':>8} {'queries':>8} {'before':>8}")
+    for flow, current in results['flows'].items():
+        before = baseline['flows'].get(flow)
+        if not before:
+            continue
+        change = (current['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+        print(f"{flow:<22} {current['p95_ms']:10.2f} {before['p95_ms']:10.2f} {change:+7.1f}% "
+              f"{current['queries_mean']:8.1f} {before['queries_mean']:8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Seed synthetic tenants and benchmark the core request flows')
+    parser.add_argument('--database-url', default='sqlite:///' + os.path.abspath('benchmark.db'),
+                        help='Database to seed and benchmark (default: ./benchmark.db)')
+    parser.add_argument('--tenants', type=int, default=5)
+    parser.add_argument('--tickets', type=int, default=2000, help='Tickets per tenant')
+    parser.add_argument('--comments', type=int, default=3, help='Comments per ticket')
+    parser.add_argument('--activities', type=int, default=2, help='Activity entries per ticket')
+    parser.add_argument('--days', type=int, default=180, help='Spread of ticket creation dates')
+    parser.add_argument('--runs', type=int, default=50, help='Requests per flow')
+    parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per flow')
+    parser.add_argument('--flows', default=','.join(FLOWS), help='Comma-separated subset of: ' + ', '.join(FLOWS))
+    parser.add_argument('--reset', action='store_true', help='Drop and recreate every table first (destroys all data!)')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='Earlier results file to compare p95 latency and query counts against')
+    args = parser.parse_args()
+
+    flows = [flow.strip() for flow in args.flows.split(',') if flow.strip()]
+    unknown = set(flows) - set(FLOWS)
+    if unknown:
+        parser.error(f"Unknown flows: {', '.join(sorted(unknown))}")
+
+    app = load_app(args.database_url)
+    from extensions import db
+    from sqlalchemy import event
+
+    with app.app_context():
+        if args.reset:
+            db.drop_all()
+        db.create_all()
+
+        started = time.perf_counter()
+        tenants = seed(db, args.tenants, args.tickets, args.comments, args.activities, args.days)
+        print(f"Seeded {args.tenants} tenants x {args.tickets} tickets in {time.perf_counter() - started:.1f}s")
+        dialect = db.engine.dialect.name
+        engine = db.engine
+
+    clients = {}
+    for tenant in tenants:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(tenant['admin_id'])
+            session['_fresh'] = True
+        clients[tenant['id']] = client
+
+    queries = []
+    event.listen(engine, 'before_cursor_execute', lambda *a: queries.append(1))
+    runner = Flows(clients)
+    samples = {flow: [] for flow in flows}
+
+    # Flows are interleaved and rotate over tenants, so cached analytics are invalidated by
+    # the writes in between as they would be in production
+    for i in range(args.warmup + args.runs):
+        tenant = tenants[i % len(tenants)]
+        for flow in flows:
+            del queries[:]
+            started = time.perf_counter()
+            response = getattr(runner, flow)(tenant)
+            # Streamed responses (the CSV export) only run their queries while the body is read
+            response.get_data()
+            elapsed = (time.perf_counter() - started) * 1000
+            if i >= args.warmup:
+                samples[flow].append((elapsed, len(queries), response.status_code))
+
+    results = {
+        'meta': {
+            'timestamp': datetime.utcnow().isoformat(),
+            'commit': git_commit(),
+            'database': dialect,
+            'tenants': args.tenants,
+            'tickets_per_tenant': args.tickets,
+            'comments_per_ticket': args.comments,
+            'activities_per_ticket': args.activities,
+            'runs': args.runs,
+            'warmup': args.warmup
+        },
+        'flows': {flow: summarize(flow_samples) for flow, flow_samples in samples.items()}
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n=== {args.runs} requests per flow, {dialect}, {args.tenants} tenants x {args.tickets} tickets ===\n")
+    print(f"{'flow':<22} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}")
+    for flow, r in results['flows'].items():
+        print(f"{flow:<22} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} {r['queries_mean']:8.1f} {r['errors']:7d}")
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import os
+import sys
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tasks import get_flask_app
+from extensions import db
+from models import User, Ticket
+from flask_login import login_user, current_user
+from sqlalchemy import event, func, case
+from datetime import datetime, timedelta
+from services.ticket_stats_service import TicketStats
+from services.dashboard_data_service import DashboardDataService
+
+# Per-chart queries the dashboard used before DashboardDataService (previously in
+# routes/analytics.py), kept here as the baseline. Like the production code they
+# replaced they need PostgreSQL (extract('epoch'), func.date() returning dates)
+def get_summary_metrics(start_date, end_date):
+    """Get summary metrics for dashboard"""
+    # Get open and in progress counts from one grouped query
+    status_counts = TicketStats.status_counts(current_user.tenant_id)
+    open_tickets = status_counts['open']
+    in_progress = status_counts['in_progress']
+
+    # Calculate average response time
+    avg_response = db.session.query(
+        func.avg(
+            func.extract('epoch', 
+                Ticket.first_response_at - Ticket.created_at
+            ) / 3600  # Convert to hours
+        )
+    ).filter(
+        Ticket.tenant_id == current_user.tenant_id,
+        Ticket.created_at.between(start_date, end_date),
+        Ticket.first_response_at.isnot(None)
+    ).scalar() or 0
+
+    # Calculate average resolution time
+    avg_resolution = db.session.query(
+        func.avg(
+            func.extract('epoch', 
+                Ticket.resolved_at - Ticket.created_at
+            ) / 3600  # Convert to hours
+        )
+    ).filter(
+        Ticket.tenant_id == current_user.tenant_id,
+        Ticket.created_at.between(start_date, end_date),
+        Ticket.resolved_at.isnot(None)
+    ).scalar() or 0
+
+    return {
+        'openTickets': open_tickets,
+        'inProgress': in_progress,
+        'avgResponseTime': round(avg_response, 1),
+        'avgResolutionTime': round(avg_resolution, 1)
+    }
+
+def get_ticket_trend_data(start_date, end_date):
+    """Get ticket trend data for line chart"""
+    daily_tickets = db.session.query(
+        func.date(Ticket.created_at).label('date'),
+        func.count(Ticket.id).label('count')
+    ).filter(
+        Ticket.tenant_id == current_user.tenant_id,
+        Ticket.created_at.between(start_date, end_date)
+    ).group_by(
+        func.date(Ticket.created_at)
+    ).order_by('date').all()
+
+    return {
+        'x': [dt.date.strftime('%Y-%m-%d') for dt in daily_tickets],
+        'y': [dt.count for dt in daily_tickets],
+        'type': 'scatter',
+        'mode': 'lines+markers',
+        'name': 'Daily Tickets'
+    }
+
+def get_agent_performance_data(start_date, end_date):
+    """Get agent performance data for bar chart"""
+    performance = db.session.query(
+        User.email.label('name'),
+        func.count(Ticket.id).label('tickets_handled'),
+        func.avg(
+            case(
+                (Ticket.status == 'closed', 1),
+                else_=0
+            )
+        ).label('resolution_rate')
+    ).join(
+        Ticket,
+        User.id == Ticket.assigned_to_id
+    ).filter(
+        User.tenant_id == current_user.tenant_id,
+        Ticket.created_at.between(start_date, end_date)
+    ).group_by(User.id, User.email).all()
+
+    return {
+        'type': 'bar',
+        'x': [p.name for p in performance],
+        'y': [p.tickets_handled for p in performance],
+        'name': 'Tickets Handled',
+        'marker': {
+            'color': '#4e73df'
+        },
+        'textposition': 'auto',
+        'hovertemplate': '<b>%{x}</b><br>Tickets: %{y}<extra></extra>',
+        'texttemplate': '%{y}',
+        'textangle': 0
+    }
+
+def get_status_distribution_data(start_date, end_date):
+    """Get status distribution data for pie chart"""
+    status_counts = db.session.query(
+        Ticket.status,
+        func.count(Ticket.id).label('count')
+    ).filter(
+        Ticket.tenant_id == current_user.tenant_id,
+        Ticket.created_at.between(start_date, end_date)
+    ).group_by(Ticket.status).all()
+
+    return {
+        'type': 'pie',
+        'labels': [s.status.capitalize() for s in status_counts],
+        'values': [s.count for s in status_counts],
+        'marker': {
+            'colors': ['#4e73df', '#1cc88a', '#36b9cc', '#f6c23e']
+        }
+    }
+
+def get_priority_analysis_data(start_date, end_date):
+    """Get priority analysis data for bar chart"""
+    priority_data = db.session.query(
+        Ticket.priority,
+        func.count(Ticket.id).label('count')
+    ).filter(
+        Ticket.tenant_id == current_user.tenant_id,
+        Ticket.created_at.between(start_date, end_date)
+    ).group_by(Ticket.priority).all()
+
+    return {
+        'type': 'bar',
+        'x': [p.priority.capitalize() for p in priority_data],
+        'y': [p.count for p in priority_data],
+        'marker': {
+            'color': ['#e74a3b', '#f6c23e', '#1cc88a']  # High, Medium, Low
+        }
+    }
+
+def get_response_time_data(start_date, end_date):
+    """Get response time analysis data for box plot"""
+    response_times = db.session.query(
+        Ticket.priority,
+        func.extract('epoch', 
+            Ticket.first_response_at - Ticket.created_at
+        ).label('response_time')
+    ).filter(
+        Ticket.tenant_id == current_user.tenant_id,
+        Ticket.created_at.between(start_date, end_date),
+        Ticket.first_response_at.isnot(None)
+    ).all()
+
+    # Organize data by priority
+    data_by_priority = {}
+    for rt in response_times:
+        if rt.priority not in data_by_priority:
+            data_by_priority[rt.priority] = []
+        if rt.response_time is not None:
+            data_by_priority[rt.priority].append(rt.response_time / 3600)  # Convert to hours
+
+    return {
+        'type': 'box',
+        'x': list(data_by_priority.keys()),
+        'y': list(data_by_priority.values()),
+        'marker': {
+            'color': '#4e73df'
+        }
+    }
+
+def legacy_dashboard(tenant_id, start_date, end_date):
+    return {
+        'summary': get_summary_metrics(start_date, end_date),
+        'charts': {
+            'ticketTrend': get_ticket_trend_data(start_date, end_date),
+            'agentPerformance': get_agent_performance_data(start_date, end_date),
+            'statusDistribution': get_status_distribution_data(start_date, end_date),
+            'priorityAnalysis': get_priority_analysis_data(start_date, end_date),
+            'responseTime': get_response_time_data(start_date, end_date)
+        }
+    }
+
+def one_pass_dashboard(tenant_id, start_date, end_date):
+    return DashboardDataService.build(tenant_id, start_date, end_date)
+
+def measure(fn, tenant_id, start_date, end_date, runs):
+    queries = []
+    listener = lambda *args: queries.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            fn(tenant_id, start_date, end_date)
+            timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    timings.sort()
+    return {
+        'median_ms': timings[len(timings) // 2],
+        'min_ms': timings[0],
+        'queries_per_run': len(queries) / runs
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the per-chart and one-pass dashboard data paths')
+    parser.add_argument('email', help='User whose tenant is benchmarked')
+    parser.add_argument('--days', type=int, default=30)
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    app = get_flask_app()
+    with app.test_request_context():
+        user = User.query.filter_by(email=args.email).first()
+        if not user:
+            print(f"No user with email {args.email}")
+            return
+        login_user(user)
+
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=args.days)
+        print(f"\n=== Dashboard data for tenant {user.tenant_id}, last {args.days} days ===\n")
+
+        # Status counts are cached per tenant; measure both paths with the cache warm
+        legacy_dashboard(user.tenant_id, start_date, end_date)
+        results = {
+            'per-chart queries': measure(legacy_dashboard, user.tenant_id, start_date, end_date, args.runs),
+            'one pass': measure(one_pass_dashboard, user.tenant_id, start_date, end_date, args.runs)
+        }
+        for name, r in results.items():
+            print(f"{name:<18} median {r['median_ms']:8.2f} ms   min {r['min_ms']:8.2f} ms   "
+                  f"{r['queries_per_run']:.0f} queries")
+
+        speedup = results['per-chart queries']['median_ms'] / results['one pass']['median_ms']
+        print(f"\nSpeedup: {speedup:.2f}x")
+
+if __name__ == '__main__':
+    main()
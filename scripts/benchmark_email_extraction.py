@@ -0,0 +1,234 @@
+import os
+import sys
+import time
+import argparse
+from email import policy
+from email.parser import BytesParser
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import current_app
+from html2text import HTML2Text
+from bs4 import BeautifulSoup
+from tasks import get_flask_app
+from services.email_content_service import EmailContentService
+
+# Previous extractor from routes/webhook.py (HTML2Text on every message, then
+# BeautifulSoup as a fallback), kept here as the baseline
+def legacy_extract_email_content(text_content, html_content):
+    """Extract clean email content from forwarded messages with improved parsing"""
+    try:
+        # Initialize HTML2Text with better config
+        h = HTML2Text()
+        h.ignore_links = False 
+        h.ignore_images = True
+        h.body_width = 0  # Don't wrap lines
+        h.unicode_snob = True
+        h.protect_links = True
+        h.single_line_break = True  # Change to True to reduce extra spacing
+        h.ul_item_mark = '-'
+        h.br_style = 'css'  # Use CSS style line breaks
+        
+        # Convert HTML to text if available
+        if html_content:
+            text_from_html = h.handle(html_content)
+            main_content = text_from_html if len(text_from_html) > len(text_content) else text_content
+        else:
+            main_content = text_content
+
+        # First try to find the forwarded content block
+        forwarding_headers = [
+            'From:',
+            'Sent:',
+            'To:',
+            'Subject:',
+            '---------- Forwarded message ---------',
+            '----- Forwarded Message -----',
+            'Begin forwarded message:'
+        ]
+
+        lines = main_content.split('\n')
+        content_lines = []
+        in_header = False
+        header_count = 0
+        last_line_empty = False
+        paragraph_break = False
+        
+        for line in lines:
+            line = line.rstrip()  # Keep leading whitespace but remove trailing
+            
+            # Check if this is a header line
+            if any(header in line for header in forwarding_headers):
+                in_header = True
+                header_count += 1
+                continue
+                
+            # After we've seen at least 3 headers, start capturing content
+            if header_count >= 3 and not any(marker in line.lower() for marker in [
+                'from:', 'to:', 'sent:', 'date:', 'subject:',
+                'cc:', 'bcc:', 'reply-to:', '>', '|',
+                'get outlook', 'thanks & regards',
+                'original message', '________________________________',
+                'forwarded message'
+            ]):
+                # Handle paragraph breaks
+                if not line:
+                    if not last_line_empty:
+                        content_lines.append('<br>')  # Add HTML line break
+                        last_line_empty = True
+                        paragraph_break = True
+                else:
+                    if paragraph_break:
+                        content_lines.append('<p>')  # Start new paragraph
+                        paragraph_break = False
+                    content_lines.append(line)
+                    last_line_empty = False
+                    
+        if content_lines:
+            # Clean up trailing breaks and join with proper spacing
+            while content_lines and content_lines[-1] in ['<br>', '<p>']:
+                content_lines.pop()
+            
+            # Close any open paragraphs
+            if not paragraph_break:
+                content_lines.append('</p>')
+                
+            return '\n'.join(content_lines)
+
+        # If the above method didn't work, try HTML parsing with better structure preservation
+        if html_content:
+            soup = BeautifulSoup(html_content, 'html.parser')
+            
+            # Remove script, style tags etc
+            for element in soup(['script', 'style', 'head', 'title', 'meta']):
+                element.decompose()
+
+            # Process paragraphs and line breaks
+            content_blocks = []
+            for element in soup.find_all(['p', 'div', 'br', 'ul', 'ol', 'li']):
+                if element.name == 'br':
+                    content_blocks.append('<br>')
+                elif element.name in ['p', 'div']:
+                    text = element.get_text().strip()
+                    if text:
+                        content_blocks.append(f'<p>{text}</p>')
+                elif element.name in ['ul', 'ol']:
+                    content_blocks.append('<ul>')
+                    for li in element.find_all('li'):
+                        content_blocks.append(f'<li>{li.get_text().strip()}</li>')
+                    content_blocks.append('</ul>')
+
+            # Clean up and join blocks
+            while content_blocks and not content_blocks[-1]:
+                content_blocks.pop()
+            return '\n'.join(content_blocks)
+
+        return main_content
+
+    except Exception as e:
+        current_app.logger.error(f"Error extracting email content: {e}")
+        return text_content
+
+GMAIL_FORWARD = """Hi team, please see below.
+
+---------- Forwarded message ---------
+From: Jane Customer <jane@example.com>
+Date: Mon, 3 Feb 2025 at 09:12
+Subject: Printer on floor 3 is jammed
+To: <support@acme.com>
+
+Hello,
+
+The printer on floor 3 has been jammed since this morning.
+Could someone take a look?
+
+Thanks & Regards,
+Jane
+"""
+
+OUTLOOK_FORWARD = """
+
+________________________________
+From: John Smith <john@example.com>
+Sent: Tuesday, February 4, 2025 10:01 AM
+To: Support <support@acme.com>
+Subject: VPN access
+
+Hi,
+
+I cannot connect to the VPN since the last update.
+
+Get Outlook for iOS
+"""
+
+def marketing_html(sections):
+    """Newsletter-style HTML: inline styles, nested tables, tracking images"""
+    head = '<html><head><style>' + ('.c{color:#333;font-family:Arial}' * 200) + '</style></head><body>'
+    body = ''.join(
+        f'<table width="600" style="border:0"><tr><td style="padding:10px">'
+        f'<h2>Offer {i}</h2><p>Save {i}% on <a href="https://shop.example.com/p/{i}?utm=mail">product {i}</a>'
+        f' this week only.</p><img src="https://t.example.com/o/{i}.gif" width="1" height="1">'
+        f'<ul><li>Free shipping</li><li>30 day returns</li></ul></td></tr></table>'
+        for i in range(sections)
+    )
+    return head + body + '</body></html>'
+
+def synthetic_corpus():
+    gmail_html = '<div dir="ltr">' + GMAIL_FORWARD.replace('\n', '<br>') + '</div>'
+    return [
+        ('gmail forward, text + html', GMAIL_FORWARD, gmail_html),
+        ('outlook forward, text only', OUTLOOK_FORWARD, None),
+        ('gmail forward, html only', '', gmail_html),
+        ('newsletter 40 KB, html only', '', marketing_html(100)),
+        ('newsletter 400 KB, html only', '', marketing_html(1000)),
+        ('newsletter 400 KB, text + html', 'Our weekly offers are below.\n', marketing_html(1000)),
+    ]
+
+def eml_corpus(directory):
+    """(name, plain, html) for every .eml file in a directory"""
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.eml'):
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            message = BytesParser(policy=policy.default).parse(f)
+        plain = message.get_body(preferencelist=('plain',))
+        html = message.get_body(preferencelist=('html',))
+        samples.append((
+            name,
+            plain.get_content() if plain else '',
+            html.get_content() if html else None
+        ))
+    return samples
+
+def measure(fn, plain, html, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn(plain, html)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings[len(timings) // 2]
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the legacy and single-pass email body extractors')
+    parser.add_argument('--corpus', help='Directory of .eml files (default: built-in synthetic samples)')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    samples = eml_corpus(args.corpus) if args.corpus else synthetic_corpus()
+
+    app = get_flask_app()
+    with app.app_context():
+        print(f"\n=== Email body extraction, median of {args.runs} runs ===\n")
+        print(f"{'sample':<34} {'legacy ms':>10} {'fast ms':>10} {'speedup':>8}")
+        legacy_total = fast_total = 0
+        for name, plain, html in samples:
+            legacy = measure(legacy_extract_email_content, plain, html, args.runs)
+            fast = max(measure(EmailContentService.extract, plain, html, args.runs), 0.001)
+            legacy_total += legacy
+            fast_total += fast
+            print(f"{name[:34]:<34} {legacy:10.2f} {fast:10.2f} {legacy / fast:7.1f}x")
+        print(f"\n{'total':<34} {legacy_total:10.2f} {fast_total:10.2f} {legacy_total / max(fast_total, 0.001):7.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from benchmark_core_flows import load_app, seed
+
+URLS = ['/tickets/', '/tickets/api']
+
+def count_queries(client, engine, url):
+    """Statements executed while serving one GET of url"""
+    queries = []
+    listener = lambda *args: queries.append(1)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    assert response.status_code == 200, f"{url} returned {response.status_code}"
+    return len(queries)
+
+def spread_users(db, tenant):
+    """
+    Give every ticket its own assignee and creator. Related rows already in the session
+    are not loaded again, so only distinct users make a lazy load show up as extra queries.
+    """
+    from sqlalchemy import insert, update
+    from models import User, Ticket
+
+    ticket_ids = tenant['ticket_ids']
+    db.session.execute(insert(User), [
+        {'email': f'agent{n}@list.example.com', 'first_name': 'List', 'last_name': f'Agent {n}',
+         'role': 'agent', 'tenant_id': tenant['id'], 'password_hash': 'x'}
+        for n in range(2 * len(ticket_ids))
+    ])
+    user_ids = [user_id for (user_id,) in db.session.query(User.id).filter(
+        User.email.like('%@list.example.com')
+    ).order_by(User.id)]
+    db.session.execute(update(Ticket), [
+        {'id': ticket_id, 'assigned_to_id': user_ids[2 * n], 'created_by_id': user_ids[2 * n + 1]}
+        for n, ticket_id in enumerate(ticket_ids)
+    ])
+    db.session.commit()
+
+def test_ticket_list_query_counts():
+    """A 100-row page of the ticket list costs the same number of queries as a 10-row page"""
+    with tempfile.TemporaryDirectory() as directory:
+        app = load_app('sqlite:///' + os.path.join(directory, 'ticket_list.db'))
+        from extensions import db
+
+        with app.app_context():
+            db.create_all()
+            tenant = seed(db, 1, 150, 0, 0, 30)[0]
+            spread_users(db, tenant)
+            engine = db.engine
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(tenant['admin_id'])
+            session['_fresh'] = True
+
+        print("\n=== Ticket list query counts ===\n")
+        failures = []
+        for url in URLS:
+            counts = {}
+            for per_page in (10, 100):
+                page_url = f'{url}?per_page={per_page}'
+                client.get(page_url)  # warm per-tenant caches (status counts)
+                counts[per_page] = count_queries(client, engine, page_url)
+            print(f"{url:<14} 10 rows: {counts[10]} queries   100 rows: {counts[100]} queries")
+            if counts[10] != counts[100]:
+                failures.append(url)
+
+        assert not failures, f"Query count grows with page size for {', '.join(failures)}"
+        print("\n✓ Query count is independent of page size")
+
+if __name__ == '__main__':
+    test_ticket_list_query_counts()
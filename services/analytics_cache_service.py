@@ -0,0 +1,148 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from models import Ticket
+
+class AnalyticsCache:
+    """
+    Per-tenant cache for analytics JSON responses.
+
+    Entries live in an in-process LRU and, when ANALYTICS_CACHE_REDIS_URL is set,
+    in Redis so every worker shares them. Keys embed the tenant's ticket data
+    version, which is bumped whenever a transaction writing that tenant's tickets
+    commits, so old entries are never served again and simply age out.
+    """
+    _entries = OrderedDict()
+    _versions = {}
+    _lock = threading.Lock()
+    _redis = None
+    _redis_url = None
+    hits = 0
+    misses = 0
+
+    @classmethod
+    def _redis_client(cls):
+        if not has_app_context():
+            return None
+        url = current_app.config.get('ANALYTICS_CACHE_REDIS_URL')
+        if not url:
+            return None
+        if cls._redis is None or cls._redis_url != url:
+            try:
+                import redis
+                cls._redis = redis.Redis.from_url(url, socket_timeout=0.5)
+                cls._redis_url = url
+            except ImportError:
+                current_app.logger.warning("redis is not installed; analytics cache is in-process only")
+                return None
+        return cls._redis
+
+    @classmethod
+    def version(cls, tenant_id):
+        """Current ticket data version for a tenant"""
+        client = cls._redis_client()
+        if client is not None:
+            try:
+                return int(client.get(f'analytics:version:{tenant_id}') or 0)
+            except Exception as e:
+                current_app.logger.warning(f"Analytics cache Redis read failed: {str(e)}")
+        with cls._lock:
+            return cls._versions.get(tenant_id, 0)
+
+    @classmethod
+    def bump(cls, tenant_id):
+        """Invalidate every cached response for a tenant by moving its data version on"""
+        with cls._lock:
+            cls._versions[tenant_id] = cls._versions.get(tenant_id, 0) + 1
+        client = cls._redis_client()
+        if client is not None:
+            try:
+                client.incr(f'analytics:version:{tenant_id}')
+            except Exception as e:
+                current_app.logger.warning(f"Analytics cache Redis bump failed: {str(e)}")
+
+    @classmethod
+    def make_key(cls, tenant_id, endpoint, params):
+        """Build a cache key from the tenant's data version, the endpoint and normalized params"""
+        digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+        return f'analytics:{tenant_id}:{cls.version(tenant_id)}:{endpoint}:{digest}'
+
+    @classmethod
+    def get(cls, key):
+        """Return a cached (etag, body) tuple or None"""
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry and entry[0] > now:
+                cls._entries.move_to_end(key)
+                cls.hits += 1
+                return entry[1], entry[2]
+        client = cls._redis_client()
+        if client is not None:
+            try:
+                cached = client.get(key)
+                if cached is not None:
+                    etag, body = cached.split(b'\n', 1)
+                    cls._store_local(key, etag.decode(), body)
+                    cls.hits += 1
+                    return etag.decode(), body
+            except Exception as e:
+                current_app.logger.warning(f"Analytics cache Redis read failed: {str(e)}")
+        cls.misses += 1
+        return None
+
+    @staticmethod
+    def etag(body):
+        return hashlib.sha1(body).hexdigest()
+
+    @classmethod
+    def set(cls, key, body):
+        """Cache a response body and return its ETag"""
+        etag = cls.etag(body)
+        cls._store_local(key, etag, body)
+        client = cls._redis_client()
+        if client is not None:
+            try:
+                client.setex(key, current_app.config.get('ANALYTICS_CACHE_TTL', 300), etag.encode() + b'\n' + body)
+            except Exception as e:
+                current_app.logger.warning(f"Analytics cache Redis write failed: {str(e)}")
+        return etag
+
+    @classmethod
+    def _store_local(cls, key, etag, body):
+        expires = time.monotonic() + current_app.config.get('ANALYTICS_CACHE_TTL', 300)
+        max_entries = current_app.config.get('ANALYTICS_CACHE_SIZE', 512)
+        with cls._lock:
+            cls._entries[key] = (expires, etag, body)
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > max_entries:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
+
+@event.listens_for(Session, 'before_flush')
+def _track_ticket_writes(session, flush_context, instances):
+    """Remember tenants whose tickets are written in this transaction"""
+    changed = session.info.setdefault('analytics_cache_tenants', set())
+    for obj in session.new:
+        if isinstance(obj, Ticket):
+            changed.add(obj.tenant_id)
+    for obj in session.deleted:
+        if isinstance(obj, Ticket):
+            changed.add(obj.tenant_id)
+    for obj in session.dirty:
+        if isinstance(obj, Ticket) and session.is_modified(obj):
+            changed.add(obj.tenant_id)
+
+@event.listens_for(Session, 'after_commit')
+def _bump_changed_tenants(session):
+    for tenant_id in session.info.pop('analytics_cache_tenants', ()):
+        AnalyticsCache.bump(tenant_id)
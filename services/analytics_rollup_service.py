@@ -0,0 +1,227 @@
+from models import db, Ticket, Tenant, TicketDailyRollup, JobWatermark
+from sqlalchemy import event, func, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from services.analytics_cache_service import AnalyticsCache
+
+# Re-read tickets updated slightly before the watermark to catch transactions
+# that flushed before the last run started but committed after it
+WATERMARK_SLACK = timedelta(minutes=5)
+
+# Number of days recomputed per query when a refresh touches many days
+DAY_CHUNK_SIZE = 60
+
+MEASURES = [
+    'ticket_count',
+    'sla_tracked_count',
+    'sla_fully_met_count',
+    'sla_response_met_count',
+    'sla_response_breached_count',
+    'sla_resolution_met_count',
+    'sla_resolution_breached_count',
+    'response_time_sum',
+    'response_count',
+    'resolution_time_sum',
+    'resolution_count'
+]
+
+class AnalyticsRollupService:
+    @staticmethod
+    def watermark_name(tenant_id):
+        return f'ticket_daily_rollup:{tenant_id}'
+
+    @classmethod
+    def refresh_tenant(cls, tenant_id, full=False):
+        """
+        Recompute the rollup rows for every day touched since the tenant's last refresh.
+        Without a watermark (first run, or after mark_stale()) every row is rebuilt.
+        """
+        started_at = datetime.utcnow()
+        watermark = db.session.get(JobWatermark, cls.watermark_name(tenant_id))
+
+        touched = db.session.query(func.date(Ticket.created_at)).filter(
+            Ticket.tenant_id == tenant_id,
+            Ticket.created_at.isnot(None)
+        )
+        if watermark and watermark.value and not full:
+            since = watermark.value - WATERMARK_SLACK
+            touched = touched.filter(or_(Ticket.updated_at > since, Ticket.created_at > since))
+        else:
+            # Also drops days whose tickets were all deleted
+            TicketDailyRollup.query.filter_by(tenant_id=tenant_id).delete(synchronize_session=False)
+
+        days = sorted({cls._as_date(d) for (d,) in touched.distinct()})
+        for i in range(0, len(days), DAY_CHUNK_SIZE):
+            cls._rebuild_days(tenant_id, days[i:i + DAY_CHUNK_SIZE])
+
+        if not watermark:
+            watermark = JobWatermark(name=cls.watermark_name(tenant_id))
+            db.session.add(watermark)
+        watermark.value = started_at
+        db.session.commit()
+        if days:
+            # Charts cached between the ticket write and this refresh hold the old rollup
+            AnalyticsCache.bump(tenant_id)
+        return len(days)
+
+    @classmethod
+    def refresh_all(cls, full=False):
+        """
+        Incrementally refresh the rollup for every tenant. Runs in the Celery beat job
+        tasks.refresh_analytics_rollup; analytics reads never write the rollup.
+        """
+        tenant_ids = [tenant_id for (tenant_id,) in db.session.query(Tenant.id).filter(Tenant.deleted_at.is_(None))]
+        touched = 0
+        for tenant_id in tenant_ids:
+            try:
+                touched += cls.refresh_tenant(tenant_id, full=full)
+            except IntegrityError:
+                # Another job (e.g. the SLA breach scan) rebuilt the same days first;
+                # the watermark was not advanced, so the next run picks them up again
+                db.session.rollback()
+        return len(tenant_ids), touched
+
+    @classmethod
+    def is_current(cls, tenant_id):
+        """
+        False while a ticket write (or delete) is not in the rollup yet. Analytics
+        responses built then are not cached: the refresh runs in the Celery worker, and
+        its cache version bump does not reach web processes without a shared Redis.
+        """
+        watermark = db.session.get(JobWatermark, cls.watermark_name(tenant_id))
+        if not watermark or not watermark.value:
+            return False
+        # Single probe of ix_ticket_tenant_updated
+        return not db.session.query(
+            db.session.query(Ticket.id).filter(
+                Ticket.tenant_id == tenant_id,
+                Ticket.updated_at > watermark.value
+            ).exists()
+        ).scalar()
+
+    @classmethod
+    def mark_stale(cls, tenant_id):
+        """Make the next refresh rebuild every day, for writes that keep updated_at"""
+        watermark = db.session.get(JobWatermark, cls.watermark_name(tenant_id))
+        if watermark:
+            watermark.value = None
+            db.session.commit()
+
+    @classmethod
+    def refresh_days(cls, tenant_id, days):
+        """Rebuild the given days now, for writes that keep updated_at"""
+        days = sorted(set(days))
+        try:
+            for i in range(0, len(days), DAY_CHUNK_SIZE):
+                cls._rebuild_days(tenant_id, days[i:i + DAY_CHUNK_SIZE])
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent refresh wrote the same days, possibly from older data
+            db.session.rollback()
+            cls.mark_stale(tenant_id)
+
+    @classmethod
+    def _rebuild_days(cls, tenant_id, days):
+        """Replace the rollup rows for the given days with fresh aggregates"""
+        day_ranges = [
+            and_(
+                Ticket.created_at >= datetime.combine(day, datetime.min.time()),
+                Ticket.created_at < datetime.combine(day + timedelta(days=1), datetime.min.time())
+            )
+            for day in days
+        ]
+        tickets = db.session.query(
+            Ticket.created_at,
+            Ticket.status,
+            Ticket.priority,
+            Ticket.source,
+            Ticket.sla_response_due_at,
+            Ticket.sla_response_met,
+            Ticket.sla_resolution_met,
+            Ticket.first_response_at,
+            Ticket.resolved_at
+        ).filter(
+            Ticket.tenant_id == tenant_id,
+            or_(*day_ranges)
+        )
+
+        groups = {}
+        for t in tickets:
+            key = (t.created_at.date(), t.status or '', t.priority or '', t.source or '')
+            row = groups.get(key)
+            if row is None:
+                row = groups[key] = dict.fromkeys(MEASURES, 0)
+            row['ticket_count'] += 1
+            if t.sla_response_due_at is not None:
+                row['sla_tracked_count'] += 1
+            if t.sla_response_met and t.sla_resolution_met:
+                row['sla_fully_met_count'] += 1
+            if t.sla_response_met is True:
+                row['sla_response_met_count'] += 1
+            elif t.sla_response_met is False:
+                row['sla_response_breached_count'] += 1
+            if t.sla_resolution_met is True:
+                row['sla_resolution_met_count'] += 1
+            elif t.sla_resolution_met is False:
+                row['sla_resolution_breached_count'] += 1
+            if t.first_response_at:
+                row['response_time_sum'] += (t.first_response_at - t.created_at).total_seconds()
+                row['response_count'] += 1
+            if t.resolved_at:
+                row['resolution_time_sum'] += (t.resolved_at - t.created_at).total_seconds()
+                row['resolution_count'] += 1
+
+        TicketDailyRollup.query.filter(
+            TicketDailyRollup.tenant_id == tenant_id,
+            TicketDailyRollup.day.in_(days)
+        ).delete(synchronize_session=False)
+
+        if groups:
+            db.session.execute(TicketDailyRollup.__table__.insert(), [
+                dict(tenant_id=tenant_id, day=day, status=status, priority=priority, source=source, **measures)
+                for (day, status, priority, source), measures in groups.items()
+            ])
+
+    @staticmethod
+    def _as_date(value):
+        # SQLite returns func.date() as a string, PostgreSQL as a date
+        if isinstance(value, str):
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        return value
+
+    @classmethod
+    def aggregate(cls, tenant_id, start_date, end_date, group_by, **filters):
+        """
+        Sum every rollup measure for the tenant's tickets created between the two
+        dates, grouped by one of day/status/priority/source. Reads only: the rollup is
+        kept current by tasks.refresh_analytics_rollup.
+        """
+        column = getattr(TicketDailyRollup, group_by)
+        query = db.session.query(
+            column.label('key'),
+            *[func.sum(getattr(TicketDailyRollup, m)).label(m) for m in MEASURES]
+        ).filter(
+            TicketDailyRollup.tenant_id == tenant_id,
+            TicketDailyRollup.day >= cls._day(start_date),
+            TicketDailyRollup.day <= cls._day(end_date)
+        )
+        for name, value in filters.items():
+            query = query.filter(getattr(TicketDailyRollup, name) == value)
+        return query.group_by(column).order_by(column).all()
+
+    @staticmethod
+    def _day(value):
+        return value.date() if isinstance(value, datetime) else value
+
+@event.listens_for(Session, 'before_flush')
+def _mark_deleted_ticket_tenants_stale(session, flush_context, instances):
+    """
+    A deleted ticket leaves no updated_at for the incremental refresh to find, so the
+    next refresh rebuilds its tenant's rollup. Tenant deletion clears the rollup itself.
+    """
+    tenant_ids = {obj.tenant_id for obj in session.deleted if isinstance(obj, Ticket)}
+    for tenant_id in tenant_ids:
+        watermark = session.get(JobWatermark, AnalyticsRollupService.watermark_name(tenant_id))
+        if watermark:
+            watermark.value = None
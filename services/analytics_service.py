@@ -1,5 +1,6 @@
 from flask import current_app
 from models import db, Ticket, User, TicketActivity
+from services.analytics_rollup_service import AnalyticsRollupService
 from sqlalchemy import func, case
 from datetime import datetime, timedelta
 
@@ -10,18 +11,12 @@ class AnalyticsService:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        result = db.session.query(
-            Ticket.status,
-            func.count(Ticket.id)
-        ).filter(
-            Ticket.tenant_id == tenant_id,
-            Ticket.created_at >= start_date
-        ).group_by(Ticket.status).all()
+        result = AnalyticsRollupService.aggregate(tenant_id, start_date, end_date, 'status')
         
         return {
-            'labels': [r[0] for r in result],
+            'labels': [r.key for r in result],
             'datasets': [{
-                'data': [r[1] for r in result],
+                'data': [int(r.ticket_count) for r in result],
                 'backgroundColor': [
                     '#FF6384',  # red for open
                     '#36A2EB',  # blue for in_progress
@@ -37,26 +32,16 @@ class AnalyticsService:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        result = db.session.query(
-            func.date(Ticket.created_at),
-            func.avg(
-                func.extract('epoch', Ticket.first_response_at - Ticket.created_at) / 3600
-            )
-        ).filter(
-            Ticket.tenant_id == tenant_id,
-            Ticket.created_at >= start_date,
-            Ticket.first_response_at.isnot(None)
-        ).group_by(
-            func.date(Ticket.created_at)
-        ).order_by(
-            func.date(Ticket.created_at)
-        ).all()
+        result = [
+            r for r in AnalyticsRollupService.aggregate(tenant_id, start_date, end_date, 'day')
+            if r.response_count
+        ]
         
         return {
-            'labels': [r[0].strftime('%Y-%m-%d') for r in result],
+            'labels': [r.key.strftime('%Y-%m-%d') for r in result],
             'datasets': [{
                 'label': 'Average Response Time (hours)',
-                'data': [float(r[1]) if r[1] else 0 for r in result],
+                'data': [float(r.response_time_sum) / r.response_count / 3600 for r in result],
                 'borderColor': '#36A2EB',
                 'fill': False
             }]
@@ -68,24 +53,11 @@ class AnalyticsService:
         end_date = datetime.utcnow()
         start_date = end_date - timedelta(days=days)
         
-        result = db.session.query(
-            func.date(Ticket.created_at),
-            func.count(Ticket.id).label('total'),
-            func.sum(
-                case(
-                    (Ticket.sla_response_met.is_(True), 1),
-                    else_=0
-                )
-            ).label('met')
-        ).filter(
-            Ticket.tenant_id == tenant_id,
-            Ticket.created_at >= start_date,
-            Ticket.sla_response_met.isnot(None)
-        ).group_by(
-            func.date(Ticket.created_at)
-        ).order_by(
-            func.date(Ticket.created_at)
-        ).all()
+        result = [
+            (r.key, r.sla_response_met_count + r.sla_response_breached_count, r.sla_response_met_count)
+            for r in AnalyticsRollupService.aggregate(tenant_id, start_date, end_date, 'day')
+            if r.sla_response_met_count or r.sla_response_breached_count
+        ]
         
         return {
             'labels': [r[0].strftime('%Y-%m-%d') for r in result],
@@ -142,14 +114,11 @@ class AnalyticsService:
             end_date = datetime.utcnow()
             start_date = end_date - timedelta(days=days)
             
-            # Get tickets in date range
-            tickets = Ticket.query.filter(
-                Ticket.tenant_id == tenant_id,
-                Ticket.created_at >= start_date,
-                Ticket.created_at <= end_date
-            ).all()
+            # Per-status totals for tickets in date range
+            by_status = AnalyticsRollupService.aggregate(tenant_id, start_date, end_date, 'status')
+            total_tickets = sum(r.ticket_count for r in by_status)
             
-            if not tickets:
+            if not total_tickets:
                 return {
                     'open_tickets': 0,
                     'avg_response_time': 0,
@@ -157,25 +126,23 @@ class AnalyticsService:
                     'resolution_rate': 0
                 }
             
+            counts = {r.key: r.ticket_count for r in by_status}
+            
             # Calculate open tickets
-            open_tickets = len([t for t in tickets if t.status == 'open'])
+            open_tickets = counts.get('open', 0)
             
             # Calculate average response time (in hours)
-            response_times = []
-            for ticket in tickets:
-                if ticket.first_response_at:
-                    response_time = (ticket.first_response_at - ticket.created_at).total_seconds() / 3600
-                    response_times.append(response_time)
-            avg_response_time = round(sum(response_times) / len(response_times)) if response_times else 0
+            response_time_sum = sum(r.response_time_sum for r in by_status)
+            response_count = sum(r.response_count for r in by_status)
+            avg_response_time = round(response_time_sum / response_count / 3600) if response_count else 0
             
             # Calculate SLA compliance
-            total_sla_tickets = len([t for t in tickets if t.sla_response_due_at is not None])
-            sla_met_tickets = len([t for t in tickets if t.sla_response_met and t.sla_resolution_met])
+            total_sla_tickets = sum(r.sla_tracked_count for r in by_status)
+            sla_met_tickets = sum(r.sla_fully_met_count for r in by_status)
             sla_compliance = round((sla_met_tickets / total_sla_tickets * 100) if total_sla_tickets > 0 else 0)
             
             # Calculate resolution rate
-            total_tickets = len(tickets)
-            resolved_tickets = len([t for t in tickets if t.status == 'resolved'])
+            resolved_tickets = counts.get('resolved', 0)
             resolution_rate = round((resolved_tickets / total_tickets * 100) if total_tickets > 0 else 0)
             
             return {
@@ -188,9 +155,16 @@ class AnalyticsService:
             current_app.logger.error(f"Error getting summary metrics: {str(e)}")
             return None
 
-    @staticmethod
-    def get_filtered_tickets(tenant_id, start_date=None, end_date=None, status=None, priority=None, assigned_to=None):
+    @classmethod
+    def get_filtered_tickets(cls, tenant_id, start_date=None, end_date=None, status=None, priority=None, assigned_to=None):
         """Get filtered ticket data"""
+        return cls.filtered_tickets_query(
+            tenant_id, start_date, end_date, status, priority, assigned_to
+        ).order_by(Ticket.created_at.desc()).all()
+
+    @staticmethod
+    def filtered_tickets_query(tenant_id, start_date=None, end_date=None, status=None, priority=None, assigned_to=None):
+        """Build the filtered ticket query, raising ValueError for missing filters"""
         if not start_date or not end_date:
             raise ValueError("Date range is required")
         
@@ -212,4 +186,4 @@ class AnalyticsService:
         if assigned_to:
             query = query.filter(Ticket.assigned_to_id.in_(assigned_to))
         
-        return query.order_by(Ticket.created_at.desc()).all() 
\ No newline at end of file
+        return query 
\ No newline at end of file
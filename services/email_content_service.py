@@ -0,0 +1,146 @@
+import re
+from flask import current_app
+from html2text import HTML2Text
+
+# Lines that start a forwarded block (matched case-sensitively, as before)
+FORWARDING_HEADER_RE = re.compile('|'.join(re.escape(marker) for marker in [
+    'From:',
+    'Sent:',
+    'To:',
+    'Subject:',
+    '---------- Forwarded message ---------',
+    '----- Forwarded Message -----',
+    'Begin forwarded message:'
+]))
+
+# Header, quote and signature lines dropped from the forwarded body
+SKIPPED_LINE_RE = re.compile('|'.join(re.escape(marker) for marker in [
+    'from:', 'to:', 'sent:', 'date:', 'subject:',
+    'cc:', 'bcc:', 'reply-to:', '>', '|',
+    'get outlook', 'thanks & regards',
+    'original message', '________________________________',
+    'forwarded message'
+]))
+
+# Markup that never contributes visible text; removed before the size cap is applied
+INVISIBLE_HTML_RE = re.compile(r'<(head|style|script)\b.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+
+# Markdown that HTML2Text emits and the paragraph fallback drops
+LIST_ITEM_RE = re.compile(r'^\s*[-*+]\s+')
+HEADING_RE = re.compile(r'^#+\s*')
+RULE_RE = re.compile(r'^[-*_ ]{3,}$')
+LINK_RE = re.compile(r'\[([^\]]*)\]\(<?[^)>]*>?\)')
+
+class EmailContentService:
+    @staticmethod
+    def _html_to_text(html_content):
+        h = HTML2Text()
+        h.ignore_links = False
+        h.ignore_images = True
+        h.body_width = 0  # Don't wrap lines
+        h.unicode_snob = True
+        h.protect_links = True
+        h.single_line_break = True
+        h.ul_item_mark = '-'
+        h.br_style = 'css'
+
+        max_chars = current_app.config.get('INBOUND_EMAIL_MAX_HTML_CHARS', 200000)
+        html_content = INVISIBLE_HTML_RE.sub('', html_content)
+        if len(html_content) > max_chars:
+            html_content = html_content[:max_chars]
+        return h.handle(html_content)
+
+    @staticmethod
+    def _forwarded_body(main_content):
+        """The body below the forwarded headers, or [] if fewer than three header lines were seen"""
+        content_lines = []
+        header_count = 0
+        last_line_empty = False
+        paragraph_break = False
+
+        for line in main_content.split('\n'):
+            line = line.rstrip()
+
+            if FORWARDING_HEADER_RE.search(line):
+                header_count += 1
+                continue
+
+            if header_count < 3 or SKIPPED_LINE_RE.search(line.lower()):
+                continue
+
+            if not line:
+                if not last_line_empty:
+                    content_lines.append('<br>')
+                    last_line_empty = True
+                    paragraph_break = True
+            else:
+                if paragraph_break:
+                    content_lines.append('<p>')
+                    paragraph_break = False
+                content_lines.append(line)
+                last_line_empty = False
+
+        if not content_lines:
+            return content_lines
+
+        while content_lines and content_lines[-1] in ('<br>', '<p>'):
+            content_lines.pop()
+        if not paragraph_break:
+            content_lines.append('</p>')
+        return content_lines
+
+    @staticmethod
+    def _blocks(text):
+        """Paragraph and list markup built from already-converted text, so HTML is parsed only once"""
+        blocks = []
+        in_list = False
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line or RULE_RE.match(line):
+                continue
+            line = LINK_RE.sub(r'\1', HEADING_RE.sub('', line)).replace('**', '')
+            if LIST_ITEM_RE.match(line):
+                if not in_list:
+                    blocks.append('<ul>')
+                    in_list = True
+                blocks.append(f"<li>{LIST_ITEM_RE.sub('', line)}</li>")
+                continue
+            if in_list:
+                blocks.append('</ul>')
+                in_list = False
+            blocks.append(f'<p>{line}</p>')
+        if in_list:
+            blocks.append('</ul>')
+        return '\n'.join(blocks)
+
+    @classmethod
+    def extract(cls, text_content, html_content):
+        """
+        Clean ticket description from an inbound email.
+
+        The plain-text part is used whenever there is one; otherwise the HTML part
+        (stripped of head/style/script and capped at INBOUND_EMAIL_MAX_HTML_CHARS)
+        is converted once and reused for both the forwarded-block scan and the
+        paragraph fallback.
+        """
+        try:
+            from_html = False
+            if text_content and text_content.strip():
+                main_content = text_content
+            elif html_content:
+                main_content = cls._html_to_text(html_content)
+                from_html = True
+            else:
+                return text_content or ''
+
+            content_lines = cls._forwarded_body(main_content)
+            if content_lines:
+                return '\n'.join(content_lines)
+
+            if from_html:
+                return cls._blocks(main_content)
+            return main_content
+
+        except Exception as e:
+            current_app.logger.error(f"Error extracting email content: {e}")
+            return text_content
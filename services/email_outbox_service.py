@@ -0,0 +1,233 @@
+import json
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from models import db, EmailOutbox
+from services.mailersend_service import MailerSendService
+from services.metrics_service import MetricsService
+
+# MailerSend accepts at most 500 messages per /bulk-email request
+BULK_MAX_MESSAGES = 500
+
+class TokenBucket:
+    """Allow `rate` tokens per minute with bursts of up to `capacity` (per worker process)"""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate / 60.0
+        self.capacity = capacity or rate
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, count=1):
+        """Take up to `count` tokens; returns how many were granted"""
+        with self.lock:
+            self._refill()
+            granted = min(count, int(self.tokens))
+            self.tokens -= granted
+            return granted
+
+    def wait_seconds(self):
+        """Seconds until the next token is available"""
+        with self.lock:
+            self._refill()
+            return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+class EmailOutboxService:
+    _tenant_buckets = {}
+    _api_bucket = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def enqueue(cls, kind, message, tenant_id=None):
+        """
+        Store a rendered mail body and hand it to the outbox worker, so the request that
+        created it never waits on MailerSend. With EMAIL_OUTBOX_ASYNC disabled the outbox
+        is drained inline instead.
+        """
+        return cls.enqueue_many(kind, [(message, tenant_id)])[0]
+
+    @classmethod
+    def enqueue_many(cls, kind, messages):
+        """Store many (message, tenant_id) pairs in one commit and wake the worker once"""
+        outbox = [EmailOutbox(kind=kind, message=message, tenant_id=tenant_id) for message, tenant_id in messages]
+        db.session.add_all(outbox)
+        db.session.commit()
+
+        if not current_app.config.get('EMAIL_OUTBOX_ASYNC'):
+            cls.drain()
+            return outbox
+
+        try:
+            from tasks import drain_email_outbox
+            drain_email_outbox.apply_async(retry=False)
+        except Exception as e:
+            # The row stays pending and is sent by the periodic drain
+            current_app.logger.error(f"Could not queue email outbox drain: {str(e)}")
+        return outbox
+
+    @classmethod
+    def queue_ticket_confirmation(cls, ticket):
+        return cls.enqueue('ticket_confirmation', MailerSendService.ticket_confirmation_message(ticket), ticket.tenant_id)
+
+    @classmethod
+    def queue_ticket_notification(cls, ticket, comment):
+        return cls.enqueue('ticket_notification', MailerSendService.ticket_notification_message(ticket, comment), ticket.tenant_id)
+
+    @classmethod
+    def queue_ticket_notifications(cls, pairs):
+        """Queue notifications for many (ticket, comment) pairs, rendered in bulk"""
+        messages = MailerSendService.ticket_notification_messages(pairs)
+        return cls.enqueue_many('ticket_notification', [
+            (message, ticket.tenant_id) for message, (ticket, _) in zip(messages, pairs)
+        ])
+
+    @classmethod
+    def _buckets(cls, tenant_id):
+        config = current_app.config
+        with cls._lock:
+            if cls._api_bucket is None:
+                cls._api_bucket = TokenBucket(config.get('EMAIL_OUTBOX_REQUESTS_PER_MINUTE', 60))
+            if tenant_id not in cls._tenant_buckets:
+                cls._tenant_buckets[tenant_id] = TokenBucket(config.get('EMAIL_OUTBOX_TENANT_MESSAGES_PER_MINUTE', 120))
+            return cls._api_bucket, cls._tenant_buckets[tenant_id]
+
+    @staticmethod
+    def claim(limit, stale_after=timedelta(minutes=10)):
+        """Mark up to `limit` due messages as sending and return them, oldest first"""
+        now = datetime.utcnow()
+        # Messages left in 'sending' by a worker that died are retried
+        db.session.execute(
+            update(EmailOutbox).where(
+                EmailOutbox.status == 'sending',
+                EmailOutbox.locked_at < now - stale_after
+            ).values(status='pending')
+        )
+        ids = [outbox_id for (outbox_id,) in db.session.query(EmailOutbox.id).filter(
+            EmailOutbox.status == 'pending',
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.id).limit(limit).with_for_update(skip_locked=True)]
+        if not ids:
+            db.session.commit()
+            return []
+
+        db.session.execute(
+            update(EmailOutbox).where(
+                EmailOutbox.id.in_(ids),
+                EmailOutbox.status == 'pending'
+            ).values(status='sending', locked_at=now, attempts=EmailOutbox.attempts + 1)
+        )
+        db.session.commit()
+        return EmailOutbox.query.filter(
+            EmailOutbox.id.in_(ids),
+            EmailOutbox.status == 'sending',
+            EmailOutbox.locked_at == now
+        ).order_by(EmailOutbox.id).all()
+
+    @staticmethod
+    def _defer(rows, seconds, error=None, count_attempt=False):
+        """Put claimed messages back as pending, due again in `seconds`"""
+        due = datetime.utcnow() + timedelta(seconds=seconds)
+        for row in rows:
+            row.status = 'pending'
+            row.next_attempt_at = due
+            row.locked_at = None
+            if error is not None:
+                row.last_error = error
+            if not count_attempt:
+                row.attempts -= 1
+
+    @classmethod
+    def _retry_or_fail(cls, rows, error):
+        """Exponential backoff per message; give up after EMAIL_OUTBOX_MAX_ATTEMPTS"""
+        max_attempts = current_app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 8)
+        for row in rows:
+            if row.attempts >= max_attempts:
+                row.status = 'failed'
+                row.last_error = error
+                row.locked_at = None
+            else:
+                cls._defer([row], min(30 * 2 ** (row.attempts - 1), 3600), error, count_attempt=True)
+
+    @classmethod
+    def drain(cls, limit=None):
+        """
+        Send one batch of due messages: grouped per tenant, each tenant limited by its own
+        token bucket and every /bulk-email request by a shared one. Returns the number of
+        messages claimed, so the caller can keep draining while batches come back full.
+        """
+        limit = limit or current_app.config.get('EMAIL_OUTBOX_BATCH_SIZE', 500)
+        rows = cls.claim(limit)
+        if not rows:
+            return 0
+
+        by_tenant = defaultdict(list)
+        for row in rows:
+            by_tenant[row.tenant_id].append(row)
+
+        mailer = MailerSendService()
+        for tenant_id, tenant_rows in by_tenant.items():
+            api_bucket, tenant_bucket = cls._buckets(tenant_id)
+
+            allowed = tenant_bucket.take(len(tenant_rows))
+            if allowed < len(tenant_rows):
+                cls._defer(tenant_rows[allowed:], tenant_bucket.wait_seconds())
+                tenant_rows = tenant_rows[:allowed]
+
+            for start in range(0, len(tenant_rows), BULK_MAX_MESSAGES):
+                chunk = tenant_rows[start:start + BULK_MAX_MESSAGES]
+                if not api_bucket.take():
+                    cls._defer(chunk, api_bucket.wait_seconds())
+                    continue
+                cls._send(mailer, chunk)
+
+        db.session.commit()
+        return len(rows)
+
+    @classmethod
+    def _send(cls, mailer, rows):
+        started = time.perf_counter()
+        try:
+            status, body = mailer.send_bulk([row.message for row in rows])
+        except Exception as e:
+            MetricsService.observe_email_send(time.perf_counter() - started, 'error')
+            current_app.logger.error(f"Error sending {len(rows)} outbox emails: {str(e)}")
+            cls._retry_or_fail(rows, str(e))
+            return
+        elapsed = time.perf_counter() - started
+
+        if status is not None and 200 <= status < 300:
+            MetricsService.observe_email_send(elapsed, 'sent')
+            provider_id = None
+            try:
+                provider_id = json.loads(body).get('bulk_email_id')
+            except (ValueError, AttributeError):
+                pass
+            now = datetime.utcnow()
+            for row in rows:
+                row.status = 'sent'
+                row.sent_at = now
+                row.locked_at = None
+                row.provider_id = provider_id
+                row.last_error = None
+                if row.created_at:
+                    MetricsService.observe_email_delivery((now - row.created_at).total_seconds())
+        elif status == 429 or status is None or status >= 500:
+            MetricsService.observe_email_send(elapsed, 'retry')
+            current_app.logger.warning(f"MailerSend bulk send deferred ({status}): {body[:200]}")
+            cls._retry_or_fail(rows, f"{status}: {body[:500]}")
+        else:
+            # Rejected request (e.g. 422 validation error): retrying will not help
+            MetricsService.observe_email_send(elapsed, 'rejected')
+            current_app.logger.error(f"MailerSend rejected {len(rows)} outbox emails ({status}): {body[:200]}")
+            for row in rows:
+                row.status = 'failed'
+                row.locked_at = None
+                row.last_error = f"{status}: {body[:500]}"
@@ -0,0 +1,128 @@
+import threading
+from flask import current_app, request, has_request_context, url_for
+from jinja2 import Environment
+
+# Subject lines are plain text: compiled without HTML autoescaping
+_subject_env = Environment(autoescape=False)
+
+# Message type -> (subject, HTML template, text template)
+EMAIL_TEMPLATES = {
+    'ticket_confirmation': (
+        'Ticket #{{ ticket.ticket_number }} Created - {{ ticket.title }}',
+        'emails/ticket_confirmation.html',
+        None
+    ),
+    'ticket_notification': (
+        'Re: [{{ ticket.ticket_number }}] {{ ticket.title }}',
+        'emails/ticket_notification.html',
+        'emails/ticket_notification.txt'
+    ),
+    'password_change_otp': (
+        'Easy-Tix: Password Change Verification Code',
+        'emails/password_change_otp.html',
+        'emails/password_change_otp.txt'
+    ),
+    'password_reset_link': (
+        'Easy-Tix: Password Reset Request',
+        'emails/password_reset_link.html',
+        'emails/password_reset_link.txt'
+    ),
+    'email_verification_otp': (
+        'Easy-Tix: Verify Your Email',
+        'emails/email_verification_otp.html',
+        'emails/email_verification_otp.txt'
+    ),
+    'password_reset': (
+        'Password Reset Instructions',
+        'emails/password_reset.html',
+        None
+    ),
+}
+
+_URL_PLACEHOLDER = '__easytix_url_value__'
+
+class UrlTemplate:
+    """A url_for() result computed once, with one path or query value filled in per message"""
+    def __init__(self, endpoint, field, **values):
+        url = url_for(endpoint, _external=True, **{field: _URL_PLACEHOLDER}, **values)
+        self.prefix, _, self.suffix = url.partition(_URL_PLACEHOLDER)
+
+    def __call__(self, value):
+        return f'{self.prefix}{value}{self.suffix}'
+
+class PreparedEmail:
+    """Compiled templates for one message type plus the values shared by every message of a tenant"""
+    def __init__(self, kind, shared):
+        subject, html, text = EMAIL_TEMPLATES[kind]
+        env = current_app.jinja_env
+        self.subject = _subject_env.from_string(subject)
+        self.html = env.get_template(html)
+        self.text = env.get_template(text) if text else None
+        self.shared = shared
+
+    def render(self, **context):
+        """subject/html/text for one message; per-message context overrides the shared values"""
+        context = {**self.shared, **context}
+        rendered = {
+            'subject': self.subject.render(context),
+            'html': self.html.render(context)
+        }
+        if self.text:
+            rendered['text'] = self.text.render(context)
+        return rendered
+
+    def render_bulk(self, contexts):
+        return [self.render(**context) for context in contexts]
+
+class EmailTemplateService:
+    _prepared = {}  # (tenant_id, kind) -> (fingerprint, PreparedEmail)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _fingerprint(tenant):
+        # Branding and links change with the tenant's name, addresses and the host serving the request
+        host = request.host_url if has_request_context() else None
+        if tenant is None:
+            return (host,)
+        return (tenant.name, tenant.support_email, tenant.portal_key, host)
+
+    @staticmethod
+    def _shared(tenant):
+        """Values computed once per tenant: senders, reply-to and the ticket tracking URL"""
+        if tenant is None:
+            return {'reset_url_for': UrlTemplate('auth.reset_password', 'token')}
+        from_email = current_app.config['MAILERSEND_FROM_EMAIL']
+        return {
+            'confirmation_sender': {"email": from_email, "name": f"Easy-Tix-{tenant.name}"},
+            'notification_sender': {"email": from_email, "name": f"{tenant.name} Support"},
+            'reply_to': {
+                "email": tenant.support_email,
+                "name": f"{tenant.name} Support"
+            } if tenant.support_email else None,
+            'ticket_url': UrlTemplate('public.track_ticket', 'ticket_id', portal_key=tenant.portal_key)
+        }
+
+    @classmethod
+    def prepared(cls, kind, tenant=None):
+        """The cached PreparedEmail for a message type and tenant (None for account emails)"""
+        key = (tenant.id if tenant is not None else None, kind)
+        fingerprint = cls._fingerprint(tenant)
+        with cls._lock:
+            cached = cls._prepared.get(key)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+        prepared = PreparedEmail(kind, cls._shared(tenant))
+        with cls._lock:
+            cls._prepared[key] = (fingerprint, prepared)
+        return prepared
+
+    @classmethod
+    def render_bulk(cls, kind, tenant, contexts):
+        """Render many messages of one type for one tenant with a single template lookup"""
+        return cls.prepared(kind, tenant).render_bulk(contexts)
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._prepared.clear()
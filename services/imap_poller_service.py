@@ -0,0 +1,119 @@
+import imaplib
+import re
+import threading
+from datetime import datetime
+from sqlalchemy import update
+from models import db, EmailConfig
+
+FETCH_UID_RE = re.compile(rb'UID (\d+)')
+
+class ImapPoller:
+    """
+    IMAP side of the mailbox sweep. Connections are kept per EmailConfig for the life
+    of the worker process and reused across sweeps; fetch_new() touches no database
+    state, so it can run in a thread pool while the caller records results.
+    """
+    _connections = {}  # EmailConfig.id -> (settings, IMAP4_SSL)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def settings(config):
+        """Connection settings of an EmailConfig as a plain tuple (safe to hand to another thread)"""
+        return (config.imap_server, config.imap_port or 993, config.imap_username, config.imap_password)
+
+    @classmethod
+    def _connection(cls, config_id, settings, timeout):
+        with cls._lock:
+            cached = cls._connections.get(config_id)
+        if cached and cached[0] == settings:
+            try:
+                cached[1].noop()
+                return cached[1]
+            except (imaplib.IMAP4.error, OSError):
+                cls.drop(config_id)
+        elif cached:
+            cls.drop(config_id)
+
+        server, port, username, password = settings
+        mail = imaplib.IMAP4_SSL(server, port, timeout=timeout)
+        mail.login(username, password)
+        with cls._lock:
+            cls._connections[config_id] = (settings, mail)
+        return mail
+
+    @classmethod
+    def drop(cls, config_id):
+        """Forget (and try to log out) a connection after an error or a settings change"""
+        with cls._lock:
+            cached = cls._connections.pop(config_id, None)
+        if cached:
+            try:
+                cached[1].logout()
+            except Exception:
+                pass
+
+    @classmethod
+    def fetch_new(cls, config_id, settings, last_uid, uid_validity, batch_size=50, limit=500, timeout=30):
+        """
+        Return (uid_validity, [(uid, raw_message), ...], covered_uid) for messages after
+        last_uid, oldest first; covered_uid is the UID the mailbox has been read up to.
+
+        Bodies are fetched with UID FETCH ... (BODY.PEEK[]) in batches of batch_size, so
+        nothing is marked as read. A mailbox seen for the first time (or whose
+        UIDVALIDITY changed) starts from its unread messages, as the old poller did.
+        At most `limit` messages are returned; the rest are picked up by the next sweep.
+        """
+        mail = cls._connection(config_id, settings, timeout)
+        mail.select('INBOX', readonly=True)
+        validity = cls._response_number(mail, 'UIDVALIDITY')
+        uid_next = cls._response_number(mail, 'UIDNEXT')
+
+        if last_uid is None or validity != uid_validity:
+            _, data = mail.uid('SEARCH', None, 'UNSEEN')
+            uids = sorted(int(uid) for uid in data[0].split())
+            covered_uid = max(uids + [uid_next - 1 if uid_next else 0])
+        else:
+            # n:* always matches the newest message, even when its UID is below n
+            _, data = mail.uid('SEARCH', None, f'UID {last_uid + 1}:*')
+            uids = sorted(uid for uid in (int(uid) for uid in data[0].split()) if uid > last_uid)
+            covered_uid = max(uids + [last_uid])
+        if len(uids) > limit:
+            uids = uids[:limit]
+            covered_uid = uids[-1]
+
+        messages = []
+        for start in range(0, len(uids), batch_size):
+            batch = ','.join(str(uid) for uid in uids[start:start + batch_size])
+            _, data = mail.uid('FETCH', batch, '(UID BODY.PEEK[])')
+            for part in data:
+                if not isinstance(part, tuple):
+                    continue
+                match = FETCH_UID_RE.search(part[0])
+                if match:
+                    messages.append((int(match.group(1)), part[1]))
+        messages.sort(key=lambda message: message[0])
+        return validity, messages, covered_uid
+
+    @staticmethod
+    def _response_number(mail, code):
+        """A numeric response code from the last SELECT, e.g. [UIDVALIDITY 3857529045]"""
+        _, data = mail.response(code)
+        return int(data[-1]) if data and data[-1] else None
+
+    @staticmethod
+    def advance(config_id, expected_uid, uid, uid_validity):
+        """
+        Move EmailConfig.last_uid from expected_uid to uid in the caller's transaction.
+        False if another sweep already moved it, in which case the caller must roll back.
+        """
+        result = db.session.execute(
+            update(EmailConfig).where(
+                EmailConfig.id == config_id,
+                EmailConfig.last_uid.is_(None) if expected_uid is None else EmailConfig.last_uid == expected_uid
+            ).values(
+                last_uid=uid,
+                uid_validity=uid_validity,
+                last_check=datetime.utcnow()
+            )
+        )
+        return result.rowcount == 1
@@ -0,0 +1,284 @@
+import hashlib
+import re
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_, update
+from sqlalchemy.exc import IntegrityError
+from models import db, InboundEmail, Tenant, Ticket
+from services.email_outbox_service import EmailOutboxService
+from services.tenant_resolver_service import TenantResolver
+
+class InboundEmailRejected(ValueError):
+    """The payload can never become a ticket (unknown tenant, no sender); do not retry"""
+
+# A replayed payload in one of these states is acknowledged without running again
+FINISHED_STATUSES = ('processed', 'rejected')
+
+class InboundEmailService:
+    @classmethod
+    def enqueue(cls, source, payload):
+        """
+        Persist a webhook payload and hand it to the worker queue.
+        Returns (inbound_email, created). created is False only for a replay of a payload
+        that was already processed or rejected; a replay of a pending or failed one runs
+        (or is queued) again, so a webhook retry after an error is not lost.
+
+        With INBOUND_EMAIL_ASYNC disabled the payload is processed inline instead,
+        which keeps single-process deployments working without a Celery worker.
+        """
+        dedup_key = cls.dedup_key(source, payload)
+        inbound = InboundEmail.query.filter_by(dedup_key=dedup_key).first()
+        if inbound is None:
+            inbound = InboundEmail(source=source, dedup_key=dedup_key, payload=payload)
+            db.session.add(inbound)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # A concurrent retry of the same message won the insert
+                db.session.rollback()
+                inbound = InboundEmail.query.filter_by(dedup_key=dedup_key).one()
+
+        if inbound.status in FINISHED_STATUSES:
+            return inbound, False
+        # claim() turns a second run of a payload already being processed into a no-op
+
+        if not current_app.config.get('INBOUND_EMAIL_ASYNC'):
+            try:
+                cls.process(inbound.id)
+            except InboundEmailRejected:
+                pass
+            return inbound, True
+
+        try:
+            from tasks import process_inbound_email
+            # No publish retries: if the broker is down, ack now and let the sweep queue it later
+            process_inbound_email.apply_async(args=[inbound.id], retry=False)
+        except Exception as e:
+            # The row stays pending and is picked up by requeue_stale()
+            current_app.logger.error(f"Could not queue inbound email {inbound.id}: {str(e)}")
+        return inbound, True
+
+    @staticmethod
+    def dedup_key(source, payload):
+        """
+        Identity of an inbound message: its Message-ID plus recipient, or when there is
+        no Message-ID, a hash of envelope, subject and body.
+        """
+        headers = payload.get('headers') or {}
+        if source == 'cloudmailin':
+            envelope = payload.get('envelope') or {}
+            sender, recipient = envelope.get('from'), envelope.get('to')
+            body = payload.get('body') or {}
+            plain, html = body.get('plain'), body.get('html')
+        else:
+            sender, recipient = headers.get('from'), headers.get('to')
+            plain, html = payload.get('plain'), payload.get('html')
+
+        message_id = next((headers[name] for name in ('message_id', 'Message-ID', 'Message-Id', 'message-id')
+                           if headers.get(name)), None)
+        if message_id:
+            parts = ['message-id', message_id.strip().strip('<>').lower(), (recipient or '').lower()]
+        else:
+            parts = ['content', sender or '', recipient or '', headers.get('subject') or '', plain or '', html or '']
+        return hashlib.sha256('\x00'.join(parts).encode('utf-8', 'replace')).hexdigest()
+
+    @classmethod
+    def claim(cls, inbound_id):
+        """Atomically mark a pending or failed payload as processing; False if another worker has it"""
+        result = db.session.execute(
+            update(InboundEmail).where(
+                InboundEmail.id == inbound_id,
+                InboundEmail.status.in_(['pending', 'failed'])
+            ).values(
+                status='processing',
+                attempts=InboundEmail.attempts + 1,
+                locked_at=datetime.utcnow()
+            )
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    @classmethod
+    def process(cls, inbound_id):
+        """Turn a stored payload into a ticket. Returns the ticket, or None if it was not claimed."""
+        if not cls.claim(inbound_id):
+            return None
+        inbound = db.session.get(InboundEmail, inbound_id)
+
+        try:
+            handler = {
+                'cloudmailin': cls._ticket_from_cloudmailin,
+                'forward': cls._ticket_from_forward
+            }[inbound.source]
+            ticket = handler(inbound.payload)
+            db.session.add(ticket)
+            db.session.flush()
+            ticket.calculate_sla_deadlines()
+
+            inbound.status = 'processed'
+            inbound.tenant_id = ticket.tenant_id
+            inbound.ticket_id = ticket.id
+            inbound.processed_at = datetime.utcnow()
+            inbound.last_error = None
+            db.session.commit()
+        except InboundEmailRejected as e:
+            db.session.rollback()
+            cls._mark(inbound_id, 'rejected', str(e))
+            current_app.logger.error(f"Rejected inbound email {inbound_id}: {str(e)}")
+            raise
+        except Exception as e:
+            db.session.rollback()
+            cls._mark(inbound_id, 'failed', str(e))
+            raise
+
+        # Send confirmation email
+        try:
+            EmailOutboxService.queue_ticket_confirmation(ticket)
+        except Exception as e:
+            current_app.logger.error(f"Error sending confirmation: {str(e)}")
+
+        return ticket
+
+    @staticmethod
+    def _mark(inbound_id, status, error):
+        db.session.execute(
+            update(InboundEmail).where(InboundEmail.id == inbound_id).values(
+                status=status,
+                last_error=error,
+                processed_at=datetime.utcnow() if status == 'rejected' else None
+            )
+        )
+        db.session.commit()
+
+    @staticmethod
+    def requeue_stale(older_than=timedelta(minutes=10)):
+        """
+        Return ids of payloads that were never queued, whose worker died mid-way, or
+        whose last attempt failed, resetting abandoned 'processing' rows to pending.
+        Failed payloads are retried until INBOUND_EMAIL_MAX_ATTEMPTS attempts.
+        """
+        cutoff = datetime.utcnow() - older_than
+        max_attempts = current_app.config.get('INBOUND_EMAIL_MAX_ATTEMPTS', 10)
+        db.session.execute(
+            update(InboundEmail).where(
+                InboundEmail.status == 'processing',
+                InboundEmail.locked_at < cutoff
+            ).values(status='pending')
+        )
+        db.session.commit()
+        return [inbound_id for (inbound_id,) in db.session.query(InboundEmail.id).filter(or_(
+            and_(InboundEmail.status == 'pending', InboundEmail.received_at < cutoff),
+            and_(
+                InboundEmail.status == 'failed',
+                InboundEmail.attempts < max_attempts,
+                InboundEmail.locked_at < cutoff
+            )
+        )).order_by(InboundEmail.received_at)]
+
+    @staticmethod
+    def find_tenant(address):
+        """Find the tenant an inbound address belongs to"""
+        tenant_id = TenantResolver.resolve(address)
+        return db.session.get(Tenant, tenant_id) if tenant_id is not None else None
+
+    @classmethod
+    def _ticket_from_cloudmailin(cls, data):
+        """Build a ticket from a CloudMailin payload posted to /api/email/incoming"""
+        from routes.webhook import extract_email_content, extract_original_sender
+
+        # Get envelope data (SMTP level information)
+        envelope = data.get('envelope', {})
+        envelope_from = envelope.get('from')
+        envelope_to = envelope.get('to')
+
+        # Get header information
+        headers = data.get('headers', {})
+        subject = headers.get('subject', 'No Subject')
+
+        # Get message body
+        body = data.get('body', {})
+        html_content = body.get('html')
+        text_content = body.get('plain')
+
+        current_app.logger.info(f"Processing email from {envelope_from} to {envelope_to}")
+        current_app.logger.info(f"Subject: {subject}")
+
+        # Extract sender information
+        sender_info = extract_original_sender(
+            text_content,
+            html_content,
+            envelope_from,
+            envelope_to
+        )
+
+        # Find tenant based on forwarding email
+        tenant = cls.find_tenant(sender_info['tenant_email'])
+        if not tenant:
+            raise InboundEmailRejected(f"No tenant found for email: {sender_info['tenant_email']}")
+
+        return Ticket(
+            title=subject,
+            description=extract_email_content(text_content, html_content),
+            status='open',
+            tenant_id=tenant.id,
+            contact_email=sender_info['original_sender'],
+            source='email',
+            ticket_number=Ticket.generate_ticket_number(tenant.id)
+        )
+
+    @classmethod
+    def _ticket_from_forward(cls, data):
+        """Build a ticket from a forwarded-mail payload posted to /email"""
+        html_body = data.get('html', '')
+        text_body = data.get('plain', '')
+        headers = data.get('headers', {})
+
+        # Get sender information - try multiple possible header fields
+        from_email = None
+        possible_headers = ['from', 'From', 'Reply-To', 'reply-to', 'Return-Path', 'return-path']
+
+        for header in possible_headers:
+            if header in headers:
+                from_header = headers[header]
+                # Extract email from various formats:
+                # "John Doe <john@example.com>" or just "john@example.com"
+                email_match = re.search(r'[\w\.-]+@[\w\.-]+\.\w+', from_header)
+                if email_match:
+                    from_email = email_match.group(0)
+                    break
+
+        if not from_email:
+            # Try to find email in the forwarded message
+            email_pattern = r'From:.*?<([\w\.-]+@[\w\.-]+\.\w+)>'
+            forwarded_match = re.search(email_pattern, html_body, re.IGNORECASE | re.DOTALL)
+            if forwarded_match:
+                from_email = forwarded_match.group(1)
+
+        if not from_email:
+            current_app.logger.error(f"Could not find original sender. Headers: {headers}")
+            raise InboundEmailRejected('Could not determine sender')
+
+        # Extract subject
+        subject = headers.get('subject', '').strip()
+        if not subject:
+            # Try to extract subject from forwarded message
+            subject_match = re.search(r'Subject: (.*?)\n', html_body, re.IGNORECASE)
+            if subject_match:
+                subject = subject_match.group(1).strip()
+            else:
+                subject = "Email Ticket"
+
+        # Get the tenant based on the support email
+        to_email = headers.get('to', '').lower()
+        tenant = cls.find_tenant(to_email)
+        if not tenant:
+            raise InboundEmailRejected(f"No tenant found for support email: {to_email}")
+
+        return Ticket(
+            title=subject,
+            description=html_body or text_body,
+            tenant_id=tenant.id,
+            contact_email=from_email,
+            source='email',
+            ticket_number=Ticket.generate_ticket_number(tenant.id)
+        )
@@ -0,0 +1,269 @@
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.pool import Pool, QueuePool
+
+# Latency buckets in seconds, shared by every histogram
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help). Labels are bounded sets (endpoints, statuses, queues, outcomes):
+# never a tenant, user or ticket id.
+METRICS = {
+    'easytix_http_requests_total': ('counter', 'HTTP requests by blueprint, endpoint, method and status class'),
+    'easytix_http_request_duration_seconds': ('histogram', 'HTTP request latency by blueprint and endpoint'),
+    'easytix_http_request_db_seconds': ('histogram', 'Database time per HTTP request by blueprint and endpoint'),
+    'easytix_db_pool_checkouts_total': ('counter', 'Connections checked out of the SQLAlchemy pool'),
+    'easytix_db_pool_wait_seconds': ('histogram', 'Time spent waiting for a pooled connection'),
+    'easytix_db_pool_checked_out': ('gauge', 'Connections currently checked out'),
+    'easytix_db_pool_overflow': ('gauge', 'Connections open beyond pool_size'),
+    'easytix_db_pool_size': ('gauge', 'Configured pool_size'),
+    'easytix_celery_queue_depth': ('gauge', 'Messages waiting in a Celery queue'),
+    'easytix_email_send_seconds': ('histogram', 'MailerSend bulk request latency by outcome'),
+    'easytix_email_delivery_delay_seconds': ('histogram', 'Time from outbox enqueue to accepted by MailerSend'),
+}
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms. With METRICS_DIR set every process also
+    writes its values to METRICS_DIR/metrics-<pid>.json (at most every
+    METRICS_FLUSH_INTERVAL seconds), and collect() sums the files of all processes, so
+    any gunicorn worker answering /metrics reports the whole server.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}  # (name, labels) -> float, or [bucket counts..., sum, count] for histograms
+        self._flushed_at = 0.0
+        self.directory = None
+        self.flush_interval = 5.0
+        self.stale_after = 300.0
+        self.pools = weakref.WeakSet()
+
+    def configure(self, directory=None, flush_interval=5.0, stale_after=300.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.stale_after = stale_after
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _key(name, labels):
+        return (name, tuple(sorted((labels or {}).items())))
+
+    def inc(self, name, labels=None, amount=1.0):
+        key = self._key(name, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+        self._maybe_flush()
+
+    def observe(self, name, value, labels=None):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = [0] * len(BUCKETS) + [0.0, 0]
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    histogram[i] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+        self._maybe_flush()
+
+    def _gauges(self):
+        """Per-process gauges, read when a snapshot is taken"""
+        gauges = {}
+        for pool in list(self.pools):
+            for name, value in (
+                ('easytix_db_pool_checked_out', pool.checkedout()),
+                ('easytix_db_pool_overflow', max(pool.overflow(), 0)),
+                ('easytix_db_pool_size', pool.size())
+            ):
+                key = self._key(name, None)
+                gauges[key] = gauges.get(key, 0) + value
+        return gauges
+
+    def snapshot(self):
+        with self._lock:
+            values = {key: list(value) if isinstance(value, list) else value for key, value in self._values.items()}
+        return values, self._gauges()
+
+    def _maybe_flush(self, force=False):
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < self.flush_interval:
+            return
+        self._flushed_at = now
+        values, gauges = self.snapshot()
+        path = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        try:
+            with open(f'{path}.tmp', 'w') as f:
+                json.dump({
+                    'values': [[name, labels, value] for (name, labels), value in values.items()],
+                    'gauges': [[name, labels, value] for (name, labels), value in gauges.items()]
+                }, f)
+            os.replace(f'{path}.tmp', path)
+        except OSError:
+            pass
+
+    def collect(self):
+        """(values, gauges) of this process plus, with METRICS_DIR, every other process"""
+        values, gauges = self.snapshot()
+        if not self.directory:
+            return values, gauges
+
+        self._maybe_flush(force=True)
+        own = os.path.join(self.directory, f'metrics-{os.getpid()}.json')
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                live = time.time() - os.path.getmtime(path) < self.stale_after
+            except (OSError, ValueError):
+                continue
+            # Counters of exited workers still count; their gauges do not
+            for name, labels, value in data.get('values', []):
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if isinstance(value, list):
+                    current = values.setdefault(key, [0] * len(value))
+                    values[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    values[key] = values.get(key, 0.0) + value
+            if live:
+                for name, labels, value in data.get('gauges', []):
+                    key = (name, tuple(tuple(pair) for pair in labels))
+                    gauges[key] = gauges.get(key, 0) + value
+        return values, gauges
+
+METRICS_REGISTRY = MetricsRegistry()
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long checkouts wait for a free connection"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        METRICS_REGISTRY.pools.add(self)
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            METRICS_REGISTRY.observe('easytix_db_pool_wait_seconds', time.perf_counter() - started)
+
+@event.listens_for(Pool, 'checkout')
+def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+    METRICS_REGISTRY.inc('easytix_db_pool_checkouts_total')
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + list(extra or [])
+    if not pairs:
+        return ''
+    escaped = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for key, value in pairs
+    )
+    return '{' + escaped + '}'
+
+class MetricsService:
+    @staticmethod
+    def init_app(app):
+        """
+        Record request metrics and, for pooled databases, use TimedQueuePool. Call before
+        db.init_app() so the engine is created with it.
+        """
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        METRICS_REGISTRY.configure(
+            directory=app.config.get('METRICS_DIR'),
+            flush_interval=app.config.get('METRICS_FLUSH_INTERVAL', 5),
+            stale_after=app.config.get('METRICS_STALE_AFTER', 300)
+        )
+        if not app.config.get('SQLALCHEMY_DATABASE_URI', '').startswith('sqlite'):
+            options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+            options.setdefault('poolclass', TimedQueuePool)
+            app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+        app.before_request(MetricsService._start)
+        app.after_request(MetricsService._finish)
+
+    @staticmethod
+    def _start():
+        g.metrics_started = time.perf_counter()
+
+    @staticmethod
+    def _finish(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        # Unmatched URLs share one label so scanners cannot inflate the series count
+        labels = {'blueprint': request.blueprint or '', 'endpoint': request.endpoint or 'unmatched'}
+        METRICS_REGISTRY.observe('easytix_http_request_duration_seconds', time.perf_counter() - started, labels)
+        METRICS_REGISTRY.inc('easytix_http_requests_total', {
+            **labels,
+            'method': request.method,
+            'status': f'{response.status_code // 100}xx'
+        })
+
+        from services.sql_instrumentation_service import SQLInstrumentation
+        stats = SQLInstrumentation.current()
+        if stats is not None:
+            METRICS_REGISTRY.observe('easytix_http_request_db_seconds', stats.db_time, labels)
+        return response
+
+    @staticmethod
+    def observe_email_send(seconds, outcome):
+        """outcome: sent, retry, rejected or error"""
+        METRICS_REGISTRY.observe('easytix_email_send_seconds', seconds, {'outcome': outcome})
+
+    @staticmethod
+    def observe_email_delivery(seconds):
+        METRICS_REGISTRY.observe('easytix_email_delivery_delay_seconds', seconds)
+
+    @staticmethod
+    def _queue_depths():
+        """{queue: length} from the Celery broker (Redis lists), empty if it cannot be reached"""
+        try:
+            import redis
+            from tasks import celery
+            queues = {'celery'} | {route['queue'] for route in (celery.conf.task_routes or {}).values()}
+            client = redis.Redis.from_url(celery.conf.broker_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+            pipeline = client.pipeline()
+            for queue in sorted(queues):
+                pipeline.llen(queue)
+            return dict(zip(sorted(queues), pipeline.execute()))
+        except Exception as e:
+            current_app.logger.warning(f"Could not read Celery queue depths: {str(e)}")
+            return {}
+
+    @classmethod
+    def render(cls):
+        """All metrics in the Prometheus text exposition format"""
+        values, gauges = METRICS_REGISTRY.collect()
+        for queue, depth in cls._queue_depths().items():
+            gauges[('easytix_celery_queue_depth', (('queue', queue),))] = depth
+
+        series = {}
+        for (name, labels), value in list(values.items()) + list(gauges.items()):
+            series.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in sorted(series.get(name, [])):
+                if kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(labels)} {value}')
+                    continue
+                # Bucket counts are stored cumulatively
+                for bound, count in zip(BUCKETS, value):
+                    lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {count}')
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {value[-1]}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {value[-2]}')
+                lines.append(f'{name}_count{_format_labels(labels)} {value[-1]}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import insert, tuple_, update
+from models import db, Ticket, SLABreach, JobWatermark
+from services.analytics_cache_service import AnalyticsCache
+from services.analytics_rollup_service import AnalyticsRollupService
+
+WATERMARK_NAME = 'sla_breach_scan'
+
+# Re-read deadlines slightly before the watermark to catch tickets committed late
+# by a transaction that started before the last scan
+WATERMARK_SLACK = timedelta(minutes=5)
+
+# kind -> (deadline, met flag, column that stops the clock)
+BREACH_KINDS = {
+    'response': (Ticket.sla_response_due_at, Ticket.sla_response_met, Ticket.first_response_at),
+    'resolution': (Ticket.sla_resolution_due_at, Ticket.sla_resolution_met, Ticket.resolved_at),
+}
+
+class SLABreachService:
+    @classmethod
+    def scan(cls, now=None, batch_size=None):
+        """
+        Record every deadline that passed since the last scan on a ticket still waiting
+        for it, and mark the matching sla_*_met flag False. Candidates come from the
+        ix_ticket_open_*_due partial indexes, which only hold open, not yet judged
+        deadlines, so a scan reads roughly the tickets that newly breached. They are read
+        in keyset pages of batch_size on (deadline, id), one commit per page.
+        Returns the number of breaches recorded.
+        """
+        now = now or datetime.utcnow()
+        batch_size = batch_size or current_app.config.get('SLA_BREACH_SCAN_BATCH_SIZE', 1000)
+        watermark = db.session.get(JobWatermark, WATERMARK_NAME)
+        since = watermark.value - WATERMARK_SLACK if watermark and watermark.value else None
+
+        breached = 0
+        touched_days = {}  # tenant_id -> days (by created_at) whose rollup rows changed
+        for kind, (due_at, met, stopped_at) in BREACH_KINDS.items():
+            candidates = db.session.query(Ticket.id, Ticket.tenant_id, due_at, Ticket.created_at).filter(
+                stopped_at.is_(None),
+                met.is_(None),
+                due_at <= now
+            )
+            if since is not None:
+                candidates = candidates.filter(due_at > since)
+
+            after = None
+            while True:
+                page = candidates
+                if after is not None:
+                    page = page.filter(tuple_(due_at, Ticket.id) > after)
+                batch = page.order_by(due_at, Ticket.id).limit(batch_size).all()
+                if not batch:
+                    break
+                breached += cls._record(kind, met, batch, now)
+                for _, tenant_id, _, created_at in batch:
+                    touched_days.setdefault(tenant_id, set()).add(created_at.date())
+                db.session.commit()
+                after = (batch[-1][2], batch[-1][0])
+
+        if not watermark:
+            watermark = JobWatermark(name=WATERMARK_NAME)
+            db.session.add(watermark)
+        watermark.value = now
+        db.session.commit()
+
+        # Bulk UPDATEs bypass the session events that normally invalidate analytics, and
+        # keep updated_at, so the rollup days of the flagged tickets are rebuilt here
+        for tenant_id, days in touched_days.items():
+            AnalyticsRollupService.refresh_days(tenant_id, days)
+            AnalyticsCache.bump(tenant_id)
+        return breached
+
+    @staticmethod
+    def _record(kind, met, rows, now):
+        """Insert breach events for (ticket_id, tenant_id, due_at, created_at) rows and flag the tickets"""
+        ids = [ticket_id for ticket_id, *_ in rows]
+        # A reopened ticket may breach a deadline that was already recorded
+        recorded = set(db.session.query(SLABreach.ticket_id, SLABreach.due_at).filter(
+            SLABreach.kind == kind,
+            tuple_(SLABreach.ticket_id, SLABreach.due_at).in_([(ticket_id, due) for ticket_id, _, due, _ in rows])
+        ))
+        events = [
+            {'tenant_id': tenant_id, 'ticket_id': ticket_id, 'kind': kind, 'due_at': due, 'detected_at': now}
+            for ticket_id, tenant_id, due, _ in rows
+            if (ticket_id, due) not in recorded
+        ]
+        if events:
+            db.session.execute(insert(SLABreach), events)
+
+        # A breach is not an edit: keep updated_at (and its onupdate default) as it is
+        db.session.execute(
+            update(Ticket).where(
+                Ticket.id.in_(ids),
+                met.is_(None)
+            ).values({met: False, Ticket.updated_at: Ticket.updated_at}).execution_options(synchronize_session=False)
+        )
+        return len(events)
+
+    @staticmethod
+    def mark_stale():
+        """Make the next scan look at every open deadline, for writes that move deadlines into the past"""
+        watermark = db.session.get(JobWatermark, WATERMARK_NAME)
+        if watermark:
+            watermark.value = None
+            db.session.commit()
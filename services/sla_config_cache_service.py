@@ -0,0 +1,57 @@
+import threading
+import time
+from flask import current_app
+from models import db, SLAConfig, DEFAULT_SLA_MINUTES
+
+class SLAConfigCache:
+    """
+    Process-level map of tenant_id -> {priority: (response, resolution)} in minutes, so
+    computing SLA deadlines needs no query. Entries expire after SLA_CONFIG_CACHE_TTL
+    seconds so edits made in another process are picked up.
+    """
+    _tables = {}
+    _lock = threading.Lock()
+    hits = 0
+    misses = 0
+
+    @staticmethod
+    def load(tenant_id):
+        """Read the tenant's SLAConfig rows over the defaults, bypassing the cache"""
+        minutes = dict(DEFAULT_SLA_MINUTES)
+        for priority, response_time, resolution_time in db.session.query(
+            SLAConfig.priority,
+            SLAConfig.response_time,
+            SLAConfig.resolution_time
+        ).filter(SLAConfig.tenant_id == tenant_id):
+            minutes[priority] = (response_time, resolution_time)
+        return minutes
+
+    @classmethod
+    def table(cls, tenant_id):
+        now = time.monotonic()
+        with cls._lock:
+            cached = cls._tables.get(tenant_id)
+            if cached and cached[0] > now:
+                cls.hits += 1
+                return cached[1]
+            cls.misses += 1
+
+        minutes = cls.load(tenant_id)
+        ttl = current_app.config.get('SLA_CONFIG_CACHE_TTL', 300)
+        with cls._lock:
+            cls._tables[tenant_id] = (now + ttl, minutes)
+        return minutes
+
+    @classmethod
+    def invalidate(cls, tenant_id=None):
+        """Drop one tenant's table, or every table"""
+        with cls._lock:
+            if tenant_id is None:
+                cls._tables.clear()
+            else:
+                cls._tables.pop(tenant_id, None)
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            return {'hits': cls.hits, 'misses': cls.misses, 'tenants': len(cls._tables)}
@@ -0,0 +1,172 @@
+from datetime import timedelta
+from sqlalchemy import and_, case, func, or_, update
+from models import db, Ticket, Tenant, DEFAULT_SLA_FALLBACK
+from services.analytics_cache_service import AnalyticsCache
+from services.analytics_rollup_service import AnalyticsRollupService
+from services.sla_config_cache_service import SLAConfigCache
+from services.sla_breach_service import SLABreachService
+
+# Ticket id range covered by each UPDATE statement and commit
+SLA_CHUNK_SIZE = 10000
+
+class SLARecalculationService:
+    @classmethod
+    def recalculate(cls, tenant_id=None, force=False, chunk_size=SLA_CHUNK_SIZE, progress=None):
+        """
+        Recalculate SLA deadlines for one tenant (or all). Returns (tenants, tickets updated).
+
+        Without force only missing deadlines are filled in, as calculate_sla_deadlines()
+        does. With force every deadline is recomputed from the current SLA configs and the
+        met flags of responded/resolved tickets are re-evaluated against it.
+        progress(tenant_id, ids_done, ids_total, updated) is called after each chunk commit.
+        """
+        if tenant_id is not None:
+            tenant_ids = [tenant_id]
+        else:
+            tenant_ids = [tid for (tid,) in db.session.query(Tenant.id).order_by(Tenant.id)]
+
+        updated = 0
+        for tid in tenant_ids:
+            updated += cls.recalculate_tenant(tid, force=force, chunk_size=chunk_size, progress=progress)
+        return len(tenant_ids), updated
+
+    @classmethod
+    def recalculate_tenant(cls, tenant_id, force=False, chunk_size=SLA_CHUNK_SIZE, progress=None):
+        # Read fresh: a recalculation usually follows an SLA config change
+        minutes = SLAConfigCache.load(tenant_id)
+        dialect = db.session.get_bind().dialect.name
+        low, high = db.session.query(func.min(Ticket.id), func.max(Ticket.id)).filter(
+            Ticket.tenant_id == tenant_id
+        ).one()
+        if low is None:
+            return 0
+
+        updated = 0
+        for start in range(low, high + 1, chunk_size):
+            chunk = and_(
+                Ticket.tenant_id == tenant_id,
+                Ticket.id >= start,
+                Ticket.id < start + chunk_size
+            )
+            if dialect == 'postgresql':
+                updated += cls._update_in_database(chunk, minutes, force)
+            else:
+                updated += cls._update_in_python(chunk, minutes, force)
+            db.session.commit()
+            if progress:
+                progress(tenant_id, min(start + chunk_size, high + 1) - low, high + 1 - low, updated)
+
+        # Bulk UPDATEs bypass the session events that normally invalidate analytics
+        AnalyticsCache.bump(tenant_id)
+        if force and updated:
+            # Met flags may have changed without touching updated_at
+            AnalyticsRollupService.mark_stale(tenant_id)
+        if updated:
+            # New deadlines can lie before the breach scanner's watermark
+            SLABreachService.mark_stale()
+        return updated
+
+    @staticmethod
+    def _minutes(minutes, index):
+        """CASE ticket.priority WHEN ... THEN <minutes> END for response (0) or resolution (1)"""
+        return case(
+            {priority: values[index] for priority, values in minutes.items()},
+            value=Ticket.priority,
+            else_=DEFAULT_SLA_FALLBACK[index]
+        )
+
+    @staticmethod
+    def _plus_minutes(column, minutes):
+        return column + func.make_interval(0, 0, 0, 0, 0, minutes)
+
+    @classmethod
+    def _update_in_database(cls, chunk, minutes, force):
+        """PostgreSQL: one UPDATE for the chunk, with deadlines computed by the database"""
+        response_due = cls._plus_minutes(Ticket.created_at, cls._minutes(minutes, 0))
+        resolution_due = cls._plus_minutes(Ticket.created_at, cls._minutes(minutes, 1))
+
+        statement = update(Ticket).where(chunk)
+        if force:
+            values = {
+                'sla_response_due_at': response_due,
+                'sla_resolution_due_at': resolution_due,
+                'sla_response_met': case(
+                    (Ticket.first_response_at.is_(None), Ticket.sla_response_met),
+                    else_=Ticket.first_response_at <= response_due
+                ),
+                'sla_resolution_met': case(
+                    (Ticket.resolved_at.is_(None), Ticket.sla_resolution_met),
+                    else_=Ticket.resolved_at <= resolution_due
+                )
+            }
+        else:
+            statement = statement.where(or_(
+                Ticket.sla_response_due_at.is_(None),
+                Ticket.sla_resolution_due_at.is_(None)
+            ))
+            values = {
+                'sla_response_due_at': func.coalesce(Ticket.sla_response_due_at, response_due),
+                'sla_resolution_due_at': func.coalesce(Ticket.sla_resolution_due_at, resolution_due)
+            }
+        # A recalculation is not an edit: keep updated_at (and its onupdate default) as it is
+        values['updated_at'] = Ticket.updated_at
+
+        result = db.session.execute(
+            statement.values(**values).execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    @staticmethod
+    def _update_in_python(chunk, minutes, force):
+        """
+        Other databases: compute deadlines here and write them with one executemany. SQLite
+        takes this path too, because its datetime() drops microseconds and stores text in a
+        different format from SQLAlchemy's DateTime, which breaks comparisons at the deadline.
+        """
+        rows = db.session.query(
+            Ticket.id,
+            Ticket.priority,
+            Ticket.created_at,
+            Ticket.sla_response_due_at,
+            Ticket.sla_resolution_due_at,
+            Ticket.first_response_at,
+            Ticket.resolved_at,
+            Ticket.sla_response_met,
+            Ticket.sla_resolution_met,
+            Ticket.updated_at
+        ).filter(chunk)
+        if not force:
+            rows = rows.filter(or_(
+                Ticket.sla_response_due_at.is_(None),
+                Ticket.sla_resolution_due_at.is_(None)
+            ))
+
+        params = []
+        for (ticket_id, priority, created_at, response_due_at, resolution_due_at, first_response_at,
+             resolved_at, response_met, resolution_met, updated_at) in rows.all():
+            if created_at is None:
+                continue
+            response_time, resolution_time = minutes.get(priority, DEFAULT_SLA_FALLBACK)
+            response_due = created_at + timedelta(minutes=response_time)
+            resolution_due = created_at + timedelta(minutes=resolution_time)
+            if force:
+                response_due_at, resolution_due_at = response_due, resolution_due
+                if first_response_at is not None:
+                    response_met = first_response_at <= response_due
+                if resolved_at is not None:
+                    resolution_met = resolved_at <= resolution_due
+            else:
+                response_due_at = response_due_at or response_due
+                resolution_due_at = resolution_due_at or resolution_due
+            params.append({
+                'id': ticket_id,
+                'sla_response_due_at': response_due_at,
+                'sla_resolution_due_at': resolution_due_at,
+                'sla_response_met': response_met,
+                'sla_resolution_met': resolution_met,
+                'updated_at': updated_at
+            })
+
+        if params:
+            db.session.execute(update(Ticket), params)
+        return len(params)
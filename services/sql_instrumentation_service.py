@@ -0,0 +1,111 @@
+import heapq
+import itertools
+import time
+from flask import current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_sequence = itertools.count()
+
+class RequestQueryStats:
+    """SQL statements issued while handling one request"""
+    def __init__(self, keep):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.db_time = 0.0
+        self.keep = keep
+        self.slowest = []  # min-heap of (seconds, sequence, statement), at most `keep` long
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.db_time += seconds
+        entry = (seconds, next(_sequence), statement)
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, entry)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def slowest_statements(self):
+        """[(milliseconds, statement)] slowest first"""
+        return [(seconds * 1000, statement) for seconds, _, statement in sorted(self.slowest, reverse=True)]
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get('query_started')
+    if not started:
+        return
+    seconds = time.perf_counter() - started.pop()
+    if has_request_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            stats.record(statement, seconds)
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    # The failed statement never reaches after_cursor_execute
+    started = context.connection.info.get('query_started') if context.connection is not None else None
+    if started:
+        started.pop()
+
+class SQLInstrumentation:
+    """
+    Per-request query count, database time and slowest statements, tagged with the
+    blueprint and endpoint. Requests over SLOW_REQUEST_MS or SLOW_REQUEST_QUERIES are
+    logged. With SERVER_TIMING_HEADER set, responses to signed-in staff also carry the
+    numbers in a Server-Timing header; anonymous and customer requests never do.
+    """
+
+    STAFF_ROLES = ('agent', 'admin', 'superadmin')
+
+    @classmethod
+    def init_app(cls, app):
+        if not app.config.get('SQL_INSTRUMENTATION_ENABLED', True):
+            return
+        app.before_request(cls._start)
+        app.after_request(cls._finish)
+
+    @staticmethod
+    def current():
+        """Statistics of the request being handled, or None outside an instrumented request"""
+        return g.get('query_stats') if has_request_context() else None
+
+    @staticmethod
+    def _start():
+        g.query_stats = RequestQueryStats(current_app.config.get('SLOW_REQUEST_STATEMENTS', 5))
+
+    @classmethod
+    def _is_staff(cls):
+        return current_user.is_authenticated and current_user.role in cls.STAFF_ROLES
+
+    @classmethod
+    def _finish(cls, response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+        config = current_app.config
+        total_ms = (time.perf_counter() - stats.started) * 1000
+        db_ms = stats.db_time * 1000
+
+        if config.get('SERVER_TIMING_HEADER') and cls._is_staff():
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={db_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+            )
+
+        if total_ms >= config.get('SLOW_REQUEST_MS', 1000) or stats.count >= config.get('SLOW_REQUEST_QUERIES', 50):
+            slowest = '; '.join(
+                f'{ms:.1f}ms {" ".join(statement.split())[:200]}'
+                for ms, statement in stats.slowest_statements()
+            )
+            current_app.logger.warning(
+                f"Slow request {request.method} {request.path} "
+                f"[blueprint={request.blueprint} endpoint={request.endpoint}] "
+                f"status={response.status_code} total={total_ms:.1f}ms "
+                f"db={db_ms:.1f}ms queries={stats.count} slowest: {slowest}"
+            )
+        return response
@@ -0,0 +1,189 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, text
+from models import db, TenantDeletion
+from services.tenant_resolver_service import TenantResolver
+
+# (step, table, rows of the tenant, batched by id). Steps are idempotent and run in this
+# order on every attempt, so a crashed job resumes by simply running again; finished
+# steps cost one empty SELECT. Tables a background job may refill while tickets are
+# being deleted (rollups, counters, breach events) are cleared after the tickets.
+DELETION_STEPS = [
+    ('email_config', 'email_config', 'tenant_id = :tenant_id', False),
+    ('sla_config', 'sla_config', 'tenant_id = :tenant_id', False),
+    ('subscription_payments', 'subscription_payments', 'tenant_id = :tenant_id', True),
+    ('analytics_dashboard', 'analytics_dashboard', 'tenant_id = :tenant_id', True),
+    ('dashboard_report', 'dashboard_report',
+     'dashboard_id IN (SELECT id FROM dashboard WHERE tenant_id = :tenant_id) '
+     'OR report_id IN (SELECT id FROM report_config WHERE tenant_id = :tenant_id)', True),
+    ('dashboard', 'dashboard', 'tenant_id = :tenant_id', True),
+    ('report_config', 'report_config', 'tenant_id = :tenant_id', True),
+    ('inbound_email', 'inbound_email', 'tenant_id = :tenant_id', True),
+    ('email_outbox', 'email_outbox', 'tenant_id = :tenant_id', True),
+    ('ticket', 'ticket', 'tenant_id = :tenant_id', True),
+    ('user', '"user"', 'tenant_id = :tenant_id', True),
+    ('sla_breach', 'sla_breach', 'tenant_id = :tenant_id', True),
+    ('ticket_daily_rollup', 'ticket_daily_rollup', 'tenant_id = :tenant_id', False),
+    ('job_watermark', 'job_watermark', 'name = :watermark', False),
+    ('tenant_directory_snapshot', 'tenant_directory_snapshot', 'tenant_id = :tenant_id', False),
+    ('ticket_sequence', 'ticket_sequence', 'tenant_id = :tenant_id', False),
+    ('tenant', 'tenant', 'id = :tenant_id', False),
+]
+
+# Rows referencing a ticket, deleted together with each range of tickets
+TICKET_CHILDREN = ['ticket_activity', 'ticket_comment', 'sla_breach', 'inbound_email']
+
+class TenantDeletionService:
+    @staticmethod
+    def request(tenant):
+        """
+        Disable the tenant at once and queue the deletion of its data. Logins, the
+        public portal, inbound email and mailbox polling ignore a tenant with deleted_at
+        set, so its traffic stops before any row is deleted.
+        """
+        deletion = TenantDeletion.query.filter(
+            TenantDeletion.tenant_id == tenant.id,
+            TenantDeletion.status.in_(['pending', 'running'])
+        ).first()
+        if not deletion:
+            deletion = TenantDeletion(tenant_id=tenant.id, tenant_name=tenant.name)
+            db.session.add(deletion)
+        tenant.deleted_at = tenant.deleted_at or datetime.utcnow()
+        db.session.commit()
+        TenantResolver.invalidate()
+
+        if not current_app.config.get('TENANT_DELETION_ASYNC'):
+            TenantDeletionService.run(deletion.id)
+            return deletion
+
+        try:
+            from tasks import delete_tenant_data
+            delete_tenant_data.apply_async(args=[deletion.id], retry=False)
+        except Exception as e:
+            # Picked up by the periodic resume sweep
+            current_app.logger.error(f"Could not queue deletion of tenant {tenant.id}: {str(e)}")
+        return deletion
+
+    @classmethod
+    def run(cls, deletion_id, batch_size=None):
+        """Delete the tenant's rows step by step, committing after every batch"""
+        batch_size = batch_size or current_app.config.get('TENANT_DELETION_BATCH_SIZE', 1000)
+        deletion = db.session.get(TenantDeletion, deletion_id)
+        if not deletion or deletion.status == 'done':
+            return deletion
+
+        deletion.status = 'running'
+        deletion.locked_at = datetime.utcnow()
+        db.session.commit()
+
+        params = {
+            'tenant_id': deletion.tenant_id,
+            'watermark': f'ticket_daily_rollup:{deletion.tenant_id}'
+        }
+        try:
+            for step, table, condition, batched in DELETION_STEPS:
+                deletion.step = step
+                if step == 'ticket':
+                    cls._delete_tickets(deletion, params, batch_size)
+                elif batched:
+                    cls._delete_batches(deletion, table, condition, params, batch_size)
+                else:
+                    result = db.session.execute(text(f'DELETE FROM {table} WHERE {condition}'), params)
+                    cls._progress(deletion, result.rowcount)
+        except Exception as e:
+            db.session.rollback()
+            deletion = db.session.get(TenantDeletion, deletion_id)
+            deletion.last_error = str(e)[:2000]
+            db.session.commit()
+            raise
+
+        deletion.status = 'done'
+        deletion.step = None
+        deletion.last_error = None
+        deletion.finished_at = datetime.utcnow()
+        db.session.commit()
+        TenantResolver.invalidate()
+        current_app.logger.info(
+            f"Deleted tenant {deletion.tenant_id} ({deletion.tenant_name}): {deletion.rows_deleted} rows"
+        )
+        return deletion
+
+    @staticmethod
+    def _progress(deletion, rows):
+        deletion.rows_deleted += max(rows, 0)
+        deletion.locked_at = datetime.utcnow()
+        db.session.commit()
+
+    @classmethod
+    def _delete_batches(cls, deletion, table, condition, params, batch_size):
+        """Delete matching rows in id ranges of at most batch_size rows, one commit each"""
+        while True:
+            ids = [row[0] for row in db.session.execute(
+                text(f'SELECT id FROM {table} WHERE {condition} ORDER BY id LIMIT :limit'),
+                {**params, 'limit': batch_size}
+            )]
+            if not ids:
+                return
+            result = db.session.execute(
+                text(f'DELETE FROM {table} WHERE ({condition}) AND id BETWEEN :low AND :high'),
+                {**params, 'low': ids[0], 'high': ids[-1]}
+            )
+            cls._progress(deletion, result.rowcount)
+
+    @classmethod
+    def _delete_tickets(cls, deletion, params, batch_size):
+        """Tickets in id ranges, each range together with the rows referencing it"""
+        while True:
+            ids = [row[0] for row in db.session.execute(
+                text('SELECT id FROM ticket WHERE tenant_id = :tenant_id ORDER BY id LIMIT :limit'),
+                {**params, 'limit': batch_size}
+            )]
+            if not ids:
+                return
+            batch = {**params, 'low': ids[0], 'high': ids[-1]}
+            rows = 0
+            for child in TICKET_CHILDREN:
+                rows += db.session.execute(text(
+                    f'DELETE FROM {child} WHERE ticket_id IN '
+                    '(SELECT id FROM ticket WHERE tenant_id = :tenant_id AND id BETWEEN :low AND :high)'
+                ), batch).rowcount
+            rows += db.session.execute(
+                text('DELETE FROM ticket WHERE tenant_id = :tenant_id AND id BETWEEN :low AND :high'),
+                batch
+            ).rowcount
+            cls._progress(deletion, rows)
+
+    @staticmethod
+    def resume_stale(stale_after=timedelta(minutes=10)):
+        """Ids of deletions that were never started or whose worker stopped committing batches"""
+        cutoff = datetime.utcnow() - stale_after
+        ids = [deletion_id for (deletion_id,) in db.session.query(TenantDeletion.id).filter(
+            TenantDeletion.status.in_(['pending', 'running']),
+            or_(
+                TenantDeletion.locked_at < cutoff,
+                TenantDeletion.locked_at.is_(None) & (TenantDeletion.requested_at < cutoff)
+            )
+        )]
+        db.session.commit()
+        return ids
+
+    @staticmethod
+    def progress(tenant_id):
+        """The latest deletion of a tenant as a dict, or None"""
+        deletion = TenantDeletion.query.filter_by(tenant_id=tenant_id).order_by(TenantDeletion.id.desc()).first()
+        if not deletion:
+            return None
+        return {
+            'id': deletion.id,
+            'tenant_id': deletion.tenant_id,
+            'status': deletion.status,
+            'step': deletion.step,
+            'steps_total': len(DELETION_STEPS),
+            'step_number': next(
+                (i + 1 for i, (step, *_) in enumerate(DELETION_STEPS) if step == deletion.step), None
+            ),
+            'rows_deleted': deletion.rows_deleted,
+            'last_error': deletion.last_error,
+            'requested_at': deletion.requested_at.isoformat() if deletion.requested_at else None,
+            'finished_at': deletion.finished_at.isoformat() if deletion.finished_at else None
+        }
@@ -0,0 +1,104 @@
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import func, insert, delete
+from models import db, Tenant, Ticket, User, TenantDirectorySnapshot
+
+# Columns the superadmin tenant list can be sorted on
+SORT_KEYS = ('name', 'plan', 'users', 'tickets', 'created')
+
+class TenantDirectoryService:
+    """Tenant list for the superadmin index: one grouped query per page instead of a COUNT per tenant"""
+
+    @staticmethod
+    def _live_counts():
+        """(user_count, ticket_count) columns from per-tenant GROUP BY subqueries"""
+        users = db.session.query(
+            User.tenant_id.label('tenant_id'),
+            func.count(User.id).label('user_count')
+        ).group_by(User.tenant_id).subquery()
+        tickets = db.session.query(
+            Ticket.tenant_id.label('tenant_id'),
+            func.count(Ticket.id).label('ticket_count')
+        ).group_by(Ticket.tenant_id).subquery()
+        return (
+            [(users, users.c.tenant_id == Tenant.id), (tickets, tickets.c.tenant_id == Tenant.id)],
+            func.coalesce(users.c.user_count, 0),
+            func.coalesce(tickets.c.ticket_count, 0)
+        )
+
+    @staticmethod
+    def _snapshot_counts():
+        snapshot = TenantDirectorySnapshot
+        return (
+            [(snapshot, snapshot.tenant_id == Tenant.id)],
+            func.coalesce(snapshot.user_count, 0),
+            func.coalesce(snapshot.ticket_count, 0)
+        )
+
+    @classmethod
+    def page(cls, sort='created', direction='desc', page=1, per_page=50, use_snapshot=None):
+        """
+        One page of (tenant, user_count, ticket_count) rows sorted by `sort`. With
+        use_snapshot (default SUPERADMIN_DIRECTORY_SNAPSHOT) counts come from
+        tenant_directory_snapshot instead of being aggregated on the fly.
+        """
+        if use_snapshot is None:
+            use_snapshot = current_app.config.get('SUPERADMIN_DIRECTORY_SNAPSHOT', False)
+        joins, user_count, ticket_count = cls._snapshot_counts() if use_snapshot else cls._live_counts()
+
+        sort = sort if sort in SORT_KEYS else 'created'
+        column = {
+            'name': Tenant.name,
+            'plan': Tenant.subscription_plan,
+            'users': user_count,
+            'tickets': ticket_count,
+            'created': Tenant.created_at
+        }[sort]
+        order = column.asc() if direction == 'asc' else column.desc()
+
+        query = db.session.query(
+            Tenant,
+            user_count.label('user_count'),
+            ticket_count.label('ticket_count')
+        )
+        for target, onclause in joins:
+            query = query.outerjoin(target, onclause)
+
+        total = db.session.query(func.count(Tenant.id)).scalar()
+        page = max(1, page)
+        rows = query.order_by(order, Tenant.id).offset((page - 1) * per_page).limit(per_page).all()
+
+        refreshed_at = None
+        if use_snapshot:
+            refreshed_at = db.session.query(func.min(TenantDirectorySnapshot.refreshed_at)).scalar()
+        return {
+            'items': rows,
+            'total': total,
+            'page': page,
+            'pages': max(1, -(-total // per_page)),
+            'per_page': per_page,
+            'sort': sort,
+            'direction': 'asc' if direction == 'asc' else 'desc',
+            'refreshed_at': refreshed_at
+        }
+
+    @classmethod
+    def refresh_snapshot(cls):
+        """Rebuild tenant_directory_snapshot from one grouped query; returns the number of tenants"""
+        joins, user_count, ticket_count = cls._live_counts()
+        # Tenants being deleted get no row: it would block the final DELETE FROM tenant
+        query = db.session.query(Tenant.id, user_count, ticket_count).filter(Tenant.deleted_at.is_(None))
+        for target, onclause in joins:
+            query = query.outerjoin(target, onclause)
+
+        now = datetime.utcnow()
+        rows = [
+            {'tenant_id': tenant_id, 'user_count': users, 'ticket_count': tickets, 'refreshed_at': now}
+            for tenant_id, users, tickets in query
+        ]
+        # Replaced in one transaction, so readers never see a half-built snapshot
+        db.session.execute(delete(TenantDirectorySnapshot))
+        if rows:
+            db.session.execute(insert(TenantDirectorySnapshot), rows)
+        db.session.commit()
+        return len(rows)
@@ -0,0 +1,79 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func, or_
+from models import db, Tenant
+
+class TenantResolver:
+    """
+    In-memory map of every tenant inbound address (support email, support alias,
+    CloudMailin address) to its tenant id, loaded in one query and reloaded after
+    TENANT_RESOLVER_TTL seconds or when an address changes in this process.
+    """
+    _addresses = {}
+    _expires = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def normalize(address):
+        return (address or '').strip().lower()
+
+    @classmethod
+    def _load(cls):
+        addresses = {}
+        for tenant_id, *columns in db.session.query(
+            Tenant.id,
+            Tenant.support_email,
+            Tenant.support_alias,
+            Tenant.cloudmailin_address
+        ).filter(Tenant.deleted_at.is_(None)):
+            for address in columns:
+                if address:
+                    addresses[cls.normalize(address)] = tenant_id
+        ttl = current_app.config.get('TENANT_RESOLVER_TTL', 300)
+        with cls._lock:
+            cls._addresses = addresses
+            cls._expires = time.monotonic() + ttl
+        return addresses
+
+    @classmethod
+    def _current(cls):
+        with cls._lock:
+            if cls._expires > time.monotonic():
+                return cls._addresses
+        return cls._load()
+
+    @classmethod
+    def resolve(cls, address):
+        """Return the tenant id an inbound address belongs to, or None"""
+        address = cls.normalize(address)
+        if not address:
+            return None
+        tenant_id = cls._current().get(address)
+        if tenant_id is not None:
+            return tenant_id
+
+        # Addresses added by another process since the last load: one probe of the lower() indexes
+        tenant_id = db.session.query(Tenant.id).filter(or_(
+            func.lower(Tenant.support_email) == address,
+            func.lower(Tenant.support_alias) == address,
+            func.lower(Tenant.cloudmailin_address) == address
+        ), Tenant.deleted_at.is_(None)).order_by(Tenant.id).limit(1).scalar()
+        if tenant_id is not None:
+            with cls._lock:
+                cls._addresses[address] = tenant_id
+        return tenant_id
+
+    @classmethod
+    def is_tenant_address(cls, address):
+        """
+        True if the address is a known tenant inbound address (no database probe); used to
+        keep tenant addresses from being taken for the customer in forwarded mail
+        """
+        return cls.normalize(address) in cls._current()
+
+    @classmethod
+    def invalidate(cls):
+        """Force a reload on the next lookup"""
+        with cls._lock:
+            cls._expires = 0
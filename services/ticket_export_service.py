@@ -0,0 +1,106 @@
+import csv
+from models import Ticket, User
+from sqlalchemy import and_
+
+# Rows fetched per server-side cursor batch and written per response chunk
+EXPORT_BATCH_SIZE = 1000
+
+RAW_EXPORT_HEADER = [
+    'Ticket Number',
+    'Title',
+    'Status',
+    'Priority',
+    'Created At',
+    'Updated At',
+    'Assigned To',
+    'Contact Name',
+    'Contact Email',
+    'First Response At',
+    'Resolved At',
+    'SLA Response Met',
+    'SLA Resolution Met'
+]
+
+FILTERED_EXPORT_HEADER = ['ID', 'Title', 'Status', 'Priority', 'Created At', 'Resolved At']
+
+class _LineBuffer:
+    """File-like object that hands back whatever csv.writer writes to it"""
+    def write(self, value):
+        return value
+
+def _format(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+class TicketExportService:
+    @staticmethod
+    def stream_csv(header, rows, bom=False):
+        """Yield CSV text in chunks of EXPORT_BATCH_SIZE rows without buffering the whole file"""
+        writer = csv.writer(_LineBuffer())
+        # Send the header before the first query batch so the download starts at once
+        yield ('\ufeff' if bom else '') + writer.writerow(header)
+        chunk = []
+        for row in rows:
+            chunk.append(writer.writerow(row))
+            if len(chunk) >= EXPORT_BATCH_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+        if chunk:
+            yield ''.join(chunk)
+
+    @staticmethod
+    def raw_export_rows(query):
+        """Rows for /analytics/raw-export, with the assignee email joined instead of lazy-loaded"""
+        rows = query.outerjoin(
+            User,
+            and_(User.id == Ticket.assigned_to_id, User.tenant_id == Ticket.tenant_id)
+        ).with_entities(
+            Ticket.ticket_number,
+            Ticket.title,
+            Ticket.status,
+            Ticket.priority,
+            Ticket.created_at,
+            Ticket.updated_at,
+            User.email,
+            Ticket.contact_name,
+            Ticket.contact_email,
+            Ticket.first_response_at,
+            Ticket.resolved_at,
+            Ticket.sla_response_met,
+            Ticket.sla_resolution_met
+        ).order_by(
+            Ticket.created_at.desc()
+        ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        for (ticket_number, title, status, priority, created_at, updated_at, assignee,
+             contact_name, contact_email, first_response_at, resolved_at,
+             sla_response_met, sla_resolution_met) in rows:
+            yield [
+                ticket_number,
+                title,
+                status,
+                priority,
+                _format(created_at),
+                _format(updated_at),
+                assignee or '',
+                contact_name,
+                contact_email,
+                _format(first_response_at),
+                _format(resolved_at),
+                'Yes' if sla_response_met else 'No',
+                'Yes' if sla_resolution_met else 'No'
+            ]
+
+    @staticmethod
+    def filtered_export_rows(query):
+        """Rows for POST /analytics/export"""
+        rows = query.with_entities(
+            Ticket.id,
+            Ticket.title,
+            Ticket.status,
+            Ticket.priority,
+            Ticket.created_at,
+            Ticket.resolved_at
+        ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+        for ticket_id, title, status, priority, created_at, resolved_at in rows:
+            yield [ticket_id, title, status, priority, _format(created_at), _format(resolved_at)]
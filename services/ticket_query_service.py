@@ -0,0 +1,66 @@
+import base64
+from datetime import datetime
+from sqlalchemy import tuple_
+from sqlalchemy.orm import joinedload
+from models import Ticket
+
+
+class TicketQueryService:
+    @staticmethod
+    def list_options():
+        """Loader options for ticket listings: assignee, creator and tenant in the same round-trip"""
+        return (
+            joinedload(Ticket.assigned_to),
+            joinedload(Ticket.created_by),
+            joinedload(Ticket.tenant)
+        )
+
+    @staticmethod
+    def encode_cursor(ticket):
+        """Encode a ticket's (created_at, id) position as an opaque cursor"""
+        raw = f"{ticket.created_at.isoformat()}|{ticket.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """Decode a cursor back into a (created_at, id) tuple"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            created_at, ticket_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+            return datetime.fromisoformat(created_at), int(ticket_id)
+        except (ValueError, UnicodeDecodeError):
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def paginate(query, after=None, before=None, per_page=50):
+        """
+        Keyset-paginate a ticket query on (created_at, id), newest first.
+        `after` moves to older tickets, `before` moves back to newer ones.
+        Returns a dict with the page items and the cursors around it.
+        """
+        position = (Ticket.created_at, Ticket.id)
+
+        if before:
+            cursor = TicketQueryService.decode_cursor(before)
+            items = query.filter(tuple_(*position) > cursor).order_by(
+                Ticket.created_at.asc(), Ticket.id.asc()
+            ).limit(per_page + 1).all()
+            has_newer = len(items) > per_page
+            items = list(reversed(items[:per_page]))
+            has_older = True
+        else:
+            if after:
+                query = query.filter(tuple_(*position) < TicketQueryService.decode_cursor(after))
+            items = query.order_by(
+                Ticket.created_at.desc(), Ticket.id.desc()
+            ).limit(per_page + 1).all()
+            has_older = len(items) > per_page
+            items = items[:per_page]
+            has_newer = bool(after)
+
+        return {
+            'items': items,
+            'next_cursor': TicketQueryService.encode_cursor(items[-1]) if items and has_older else None,
+            'prev_cursor': TicketQueryService.encode_cursor(items[0]) if items and has_newer else None,
+            'per_page': per_page
+        }
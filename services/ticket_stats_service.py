@@ -0,0 +1,65 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+from models import db, Ticket
+
+TICKET_STATUSES = ['open', 'in_progress', 'on_hold', 'resolved', 'closed']
+
+class TicketStats:
+    """Per-tenant ticket counts computed with one grouped query, with an optional short-TTL cache"""
+    _cache = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def status_counts(cls, tenant_id, use_cache=True):
+        """Return {status: count} for every status, including zero counts"""
+        ttl = current_app.config.get('TICKET_STATS_CACHE_TTL', 0)
+        now = time.monotonic()
+
+        if use_cache and ttl:
+            with cls._lock:
+                cached = cls._cache.get(tenant_id)
+            if cached and cached[0] > now:
+                return dict(cached[1])
+
+        rows = db.session.query(
+            Ticket.status,
+            func.count(Ticket.id)
+        ).filter(
+            Ticket.tenant_id == tenant_id
+        ).group_by(Ticket.status).all()
+
+        counts = {status: 0 for status in TICKET_STATUSES}
+        counts.update({status: count for status, count in rows if status})
+
+        if ttl:
+            with cls._lock:
+                cls._cache[tenant_id] = (now + ttl, counts)
+        return dict(counts)
+
+    @classmethod
+    def invalidate(cls, tenant_id):
+        """Drop the cached counts for a tenant"""
+        with cls._lock:
+            cls._cache.pop(tenant_id, None)
+
+@event.listens_for(Session, 'before_flush')
+def _track_status_changes(session, flush_context, instances):
+    """Remember tenants whose ticket counts change in this transaction"""
+    changed = session.info.setdefault('ticket_stats_tenants', set())
+    for obj in session.new:
+        if isinstance(obj, Ticket):
+            changed.add(obj.tenant_id)
+    for obj in session.deleted:
+        if isinstance(obj, Ticket):
+            changed.add(obj.tenant_id)
+    for obj in session.dirty:
+        if isinstance(obj, Ticket) and inspect(obj).attrs.status.history.has_changes():
+            changed.add(obj.tenant_id)
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_tenants(session):
+    for tenant_id in session.info.pop('ticket_stats_tenants', ()):
+        TicketStats.invalidate(tenant_id)
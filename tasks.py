@@ -1,49 +1,186 @@
-from celery import Celery
-from models import EmailConfig, Ticket, TicketComment
-import imaplib
+from celery import Celery, Task
+from flask import current_app, has_app_context
+from models import db, EmailConfig, Tenant, TenantDeletion, Ticket, TicketComment
+from services.inbound_email_service import InboundEmailService, InboundEmailRejected
+from services.imap_poller_service import ImapPoller
+from services.email_outbox_service import EmailOutboxService
+from services.sla_breach_service import SLABreachService
+from services.analytics_rollup_service import AnalyticsRollupService
+from services.tenant_directory_service import TenantDirectoryService
+from services.tenant_deletion_service import TenantDeletionService
+from services.email_content_service import EmailContentService
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import email
+from email import policy
 from email.utils import parseaddr
+import importlib.util
+import logging
+import os
 import re
+import sys
 
-celery = Celery('tasks', broker='redis://localhost:6379/0')
+logger = logging.getLogger(__name__)
 
-@celery.task
+_flask_app = None
+
+def get_flask_app():
+    """Load the deployed Flask app from app.py (the app/ package shadows it on a plain import)"""
+    global _flask_app
+    if _flask_app is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+        spec = importlib.util.spec_from_file_location('easytix_app', path)
+        module = importlib.util.module_from_spec(spec)
+        # Flask finds templates and static files through the module registered under its name
+        sys.modules['easytix_app'] = module
+        spec.loader.exec_module(module)
+        _flask_app = module.app
+    return _flask_app
+
+class FlaskTask(Task):
+    """Run tasks inside a request context so db sessions and url_for(_external=True) work"""
+    def __call__(self, *args, **kwargs):
+        if has_app_context():
+            return self.run(*args, **kwargs)
+        app = get_flask_app()
+        with app.test_request_context(base_url=app.config.get('APP_BASE_URL')):
+            try:
+                return self.run(*args, **kwargs)
+            finally:
+                db.session.remove()
+
+celery = Celery('tasks', broker='redis://localhost:6379/0', task_cls=FlaskTask)
+celery.config_from_object('celeryconfig')
+
+@celery.task(bind=True, max_retries=5, acks_late=True, ignore_result=True)
+def process_inbound_email(self, inbound_id):
+    """Create a ticket from a stored inbound email, retrying transient failures with backoff"""
+    try:
+        InboundEmailService.process(inbound_id)
+    except InboundEmailRejected:
+        # Permanent: recorded on the row, nothing to retry
+        return
+    except Exception as e:
+        logger.error(f"Error processing inbound email {inbound_id}: {e}")
+        raise self.retry(exc=e, countdown=min(30 * 2 ** self.request.retries, 3600))
+
+@celery.task(ignore_result=True)
+def requeue_stale_inbound_emails():
+    """Queue payloads that were stored but never queued, or abandoned by a dead worker"""
+    for inbound_id in InboundEmailService.requeue_stale():
+        process_inbound_email.delay(inbound_id)
+
+@celery.task(ignore_result=True)
+def drain_email_outbox():
+    """Send due outbound emails, batch after batch until the outbox is drained"""
+    batch_size = current_app.config.get('EMAIL_OUTBOX_BATCH_SIZE', 500)
+    while EmailOutboxService.drain(batch_size) >= batch_size:
+        pass
+
+@celery.task(ignore_result=True)
+def scan_sla_breaches():
+    """Record SLA deadlines that passed since the last scan and flag the tickets as breached"""
+    breached = SLABreachService.scan()
+    if breached:
+        logger.info(f"Recorded {breached} SLA breaches")
+
+@celery.task(ignore_result=True)
+def refresh_analytics_rollup():
+    """Rebuild the ticket_daily_rollup days touched since each tenant's last refresh"""
+    AnalyticsRollupService.refresh_all()
+
+@celery.task(ignore_result=True)
+def refresh_tenant_directory_snapshot():
+    """Recount users and tickets per tenant for the superadmin tenant list"""
+    if current_app.config.get('SUPERADMIN_DIRECTORY_SNAPSHOT'):
+        TenantDirectoryService.refresh_snapshot()
+
+@celery.task(bind=True, max_retries=5, acks_late=True, ignore_result=True)
+def delete_tenant_data(self, deletion_id):
+    """Delete a disabled tenant's rows in batches; a retry resumes where the last attempt stopped"""
+    try:
+        TenantDeletionService.run(deletion_id)
+    except Exception as e:
+        logger.error(f"Error deleting tenant data (deletion {deletion_id}): {e}")
+        if self.request.retries >= self.max_retries:
+            deletion = db.session.get(TenantDeletion, deletion_id)
+            deletion.status = 'failed'
+            db.session.commit()
+            return
+        raise self.retry(exc=e, countdown=min(60 * 2 ** self.request.retries, 3600))
+
+@celery.task(ignore_result=True)
+def resume_tenant_deletions():
+    """Requeue tenant deletions that were never started or whose worker died"""
+    for deletion_id in TenantDeletionService.resume_stale():
+        delete_tenant_data.delay(deletion_id)
+
+@celery.task(ignore_result=True)
 def check_new_emails():
-    """Check for new emails for all tenants"""
-    configs = EmailConfig.query.filter_by(enabled=True).all()
-    
-    for config in configs:
+    """
+    Check for new emails for all tenants. Mailboxes are fetched by a bounded thread
+    pool (IMAP_POLL_CONCURRENCY) so one slow server does not stall the sweep; tickets
+    are written here as each mailbox's fetch completes.
+    """
+    config = current_app.config
+    configs = EmailConfig.query.join(Tenant, EmailConfig.tenant_id == Tenant.id).filter(
+        EmailConfig.enabled.is_(True),
+        Tenant.deleted_at.is_(None)
+    ).all()
+    jobs = {
+        email_config.id: (email_config.tenant_id, ImapPoller.settings(email_config),
+                          email_config.last_uid, email_config.uid_validity)
+        for email_config in configs
+    }
+    db.session.rollback()  # do not hold a transaction open while waiting on IMAP servers
+
+    with ThreadPoolExecutor(max_workers=config.get('IMAP_POLL_CONCURRENCY', 8)) as pool:
+        futures = {
+            pool.submit(
+                ImapPoller.fetch_new, config_id, settings, last_uid, uid_validity,
+                batch_size=config.get('IMAP_FETCH_BATCH_SIZE', 50),
+                limit=config.get('IMAP_MAX_MESSAGES_PER_SWEEP', 500),
+                timeout=config.get('IMAP_TIMEOUT', 30)
+            ): config_id
+            for config_id, (tenant_id, settings, last_uid, uid_validity) in jobs.items()
+        }
+        for future in as_completed(futures):
+            config_id = futures[future]
+            tenant_id, _, last_uid, _ = jobs[config_id]
+            try:
+                uid_validity, messages, covered_uid = future.result()
+                process_tenant_emails(config_id, tenant_id, last_uid, uid_validity, messages, covered_uid)
+            except Exception as e:
+                db.session.rollback()
+                ImapPoller.drop(config_id)
+                logger.error(f"Error processing emails for tenant {tenant_id}: {e}")
+
+def process_tenant_emails(config_id, tenant_id, last_uid, uid_validity, messages, covered_uid):
+    """
+    Turn fetched messages into tickets, committing each together with the mailbox's last
+    UID. A message that cannot be processed is logged and skipped, so it is not fetched
+    again on every sweep and does not hold back the messages after it.
+    """
+    tenant = db.session.get(Tenant, tenant_id)
+    for uid, raw in messages:
         try:
-            process_tenant_emails(config)
+            with db.session.begin_nested():
+                process_email(email.message_from_bytes(raw, policy=policy.default), tenant)
         except Exception as e:
-            logger.error(f"Error processing emails for tenant {config.tenant_id}: {e}")
+            logger.error(f"Skipping email UID {uid} for tenant {tenant_id}: {e}")
+        if not ImapPoller.advance(config_id, last_uid, uid, uid_validity):
+            # Another sweep already recorded this message
+            db.session.rollback()
+            return
+        db.session.commit()
+        last_uid = uid
 
-def process_tenant_emails(config):
-    """Process emails for a specific tenant"""
-    mail = imaplib.IMAP4_SSL(config.imap_server)
-    mail.login(config.imap_username, config.imap_password)
-    mail.select('INBOX')
-    
-    # Search for unread emails
-    _, messages = mail.search(None, 'UNSEEN')
-    
-    for num in messages[0].split():
-        _, msg = mail.fetch(num, '(RFC822)')
-        email_body = msg[0][1]
-        email_message = email.message_from_bytes(email_body)
-        
-        # Process the email
-        process_email(email_message, config.tenant)
-        
-        # Mark as read
-        mail.store(num, '+FLAGS', '\\Seen')
-    
-    mail.close()
-    mail.logout()
+    if covered_uid is not None and covered_uid != last_uid:
+        ImapPoller.advance(config_id, last_uid, covered_uid, uid_validity)
+    db.session.commit()
 
 def process_email(email_message, tenant):
-    """Process a single email"""
-    subject = email_message['subject']
+    """Add a single email to the session: a comment on the ticket it replies to, or a new ticket"""
+    subject = email_message['subject'] or 'No Subject'
     from_email = parseaddr(email_message['from'])[1]
     
     # Check if this is a reply to an existing ticket
@@ -65,8 +202,26 @@ def process_email(email_message, tenant):
             status='open',
             tenant_id=tenant.id,
             contact_email=from_email,
-            source='email'
+            source='email',
+            ticket_number=Ticket.generate_ticket_number(tenant.id)
         )
         db.session.add(ticket)
-    
-    db.session.commit() 
\ No newline at end of file
+        db.session.flush()
+        ticket.calculate_sla_deadlines()
+
+def find_ticket_from_email(email_message, tenant):
+    """The tenant's ticket whose number appears in the subject, e.g. 'Re: [AC1-042] Printer'"""
+    prefix = f"{tenant.name[:2].upper()}{tenant.id}-"
+    match = re.search(re.escape(prefix) + r'\d+', email_message['subject'] or '')
+    if not match:
+        return None
+    return Ticket.query.filter_by(tenant_id=tenant.id, ticket_number=match.group(0)).first()
+
+def get_email_content(email_message):
+    """Ticket text from the plain-text part, falling back to the HTML part"""
+    plain = email_message.get_body(preferencelist=('plain',))
+    html = email_message.get_body(preferencelist=('html',))
+    return EmailContentService.extract(
+        plain.get_content() if plain else '',
+        html.get_content() if html else None
+    )